@@ -2,44 +2,212 @@ import streamlit as st
 import pandas as pd
 import requests
 import os # Import the 'os' module
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 # --- Configuration ---
 st.set_page_config(page_title="Intelligent Portfolio Optimizer", layout="wide")
 
 # This makes our app flexible for both local (Docker Compose) and cloud deployment.
-# We provide a default value for when we run it locally.
-API_URL = os.getenv("API_URL", "http://api:8000/predict") 
+# We provide a default value for when we run it locally. The other endpoints
+# live next to /predict.
+API_URL = os.getenv("API_URL", "http://api:8000/predict")
+API_BASE_URL = os.getenv("API_BASE_URL", API_URL.rsplit('/predict', 1)[0])
+
+REQUEST_TIMEOUT = (3.05, 30)  # (connect, read) seconds
+VERSION_TTL = 15              # Seconds between two checks of the API's snapshot version
+# Responses are cached per snapshot version, so a new snapshot is picked up
+# at the next version check; the TTL only evicts data of old versions
+DATA_TTL = 3600
+PAGE_SIZES = [25, 50, 100, 250]
+CHART_POINTS = 500            # Points per equity curve, downsampled by the API
+WEIGHT_METHODS = ['mean_variance', 'hrp']
+SORT_COLUMNS = ['confidence', 'Ticker', 'Close', 'Date']
+TOP_FEATURES = 8              # Features shown per explanation
+
+
+# --- API Client ---
+@st.cache_resource
+def http_session():
+    """
+    One pooled HTTP session per dashboard process, shared by every user and
+    rerun, so connections to the API are reused. Idempotent calls are
+    retried on connection errors and gateway errors.
+    """
+    session = requests.Session()
+    retries = Retry(total=3, backoff_factor=0.3, status_forcelist=[502, 503, 504],
+                    allowed_methods=['GET', 'POST'])
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=retries)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def api_request(method, path, **kwargs):
+    response = http_session().request(method, f"{API_BASE_URL}{path}", timeout=REQUEST_TIMEOUT, **kwargs)
+    response.raise_for_status()  # Raise an exception for bad status codes
+    return response.json()
+
+
+@st.cache_data(ttl=VERSION_TTL, show_spinner=False)
+def snapshot_version():
+    return api_request('GET', '/version')
+
+
+# Every loader below takes the snapshot version as its first argument: reruns
+# and other users hit the cache until the API serves a new snapshot.
+@st.cache_data(ttl=DATA_TTL, max_entries=4, show_spinner="Loading predictions...")
+def load_predictions(version):
+    results_df = pd.DataFrame(api_request('POST', '/predict')['predictions'])
+    results_df['Date'] = pd.to_datetime(results_df['Date']).dt.date
+    results_df['signal'] = results_df['prediction'].map({1: "UP 📈", 0: "DOWN 📉"})
+    return results_df[['Ticker', 'signal', 'confidence', 'Close', 'Date']]
+
+
+@st.cache_data(ttl=DATA_TTL, max_entries=8, show_spinner="Loading target weights...")
+def load_weights(version, method):
+    payload = api_request('GET', '/weights', params={'method': method})
+    weights = pd.DataFrame({'Ticker': list(payload['weights']), 'weight': list(payload['weights'].values())})
+    weights = weights[weights['weight'] > 0].sort_values('weight', ascending=False)
+    return weights, payload['cash'], payload['risk'] or {}
+
+
+@st.cache_data(ttl=DATA_TTL, max_entries=32, show_spinner="Loading equity curves...")
+def load_curves(version, path, points=CHART_POINTS):
+    payload = api_request('GET', path, params={'points': points})
+    return pd.DataFrame(payload['series'], index=pd.to_datetime(payload['dates']))
+
+
+@st.cache_data(ttl=DATA_TTL, max_entries=256, show_spinner=False)
+def load_explanation(version, ticker, k=TOP_FEATURES):
+    return api_request('GET', f"/explain/{ticker}", params={'k': k})
+
+
+# --- Tables ---
+def paginate(df, key, page_size):
+    """
+    Shows a page selector and returns the rows of the selected page, so
+    only one page of a large universe is sent to the browser.
+    """
+    n_pages = max(1, -(-len(df) // page_size))
+    # Filters may have shrunk the table since the page was picked
+    st.session_state[key] = min(st.session_state.get(key, 1), n_pages)
+    page = st.number_input("Page", min_value=1, max_value=n_pages, step=1, key=key)
+    start = (page - 1) * page_size
+    st.caption(f"Rows {min(start + 1, len(df))}–{min(start + page_size, len(df))} of {len(df)} "
+               f"(page {page} of {n_pages})")
+    return df.iloc[start:start + page_size]
+
+
+def filter_predictions(results_df, query, signal, min_confidence, sort_by, descending):
+    mask = results_df['confidence'] >= min_confidence
+    if query:
+        mask &= results_df['Ticker'].str.contains(query, case=False, regex=False)
+    if signal != 'All':
+        mask &= results_df['signal'].str.startswith(signal)
+    return results_df[mask].sort_values(sort_by, ascending=not descending, kind='stable')
+
 
 # --- UI Layout ---
 st.title("🤖 Intelligent Stock Portfolio Optimizer")
 st.write("""
-This dashboard uses a trained XGBoost model to predict the 5-day price movement 
+This dashboard uses a trained XGBoost model to predict the 5-day price movement
 for a pre-selected portfolio of Indian stocks. The predictions are served from a separate FastAPI backend.
 """)
 
-st.header("Latest Predictions", divider='rainbow')
-
-if st.button("Run Prediction for Today", type="primary"):
-    with st.spinner("Sending request to the model API..."):
-        try:
-            response = requests.post(API_URL)
-            response.raise_for_status()  # Raise an exception for bad status codes
-            
-            results = response.json()['predictions']
-            results_df = pd.DataFrame(results)
-            
-            # Display results in cards
-            cols = st.columns(len(results_df))
-            for i, row in enumerate(results_df.itertuples()):
-                with cols[i]:
-                    st.metric(label=f"**{row.Ticker}**", 
-                              value="UP 📈" if row.prediction == 1 else "DOWN 📉",
-                              delta=f"Confidence: {row.confidence:.2%}")
-                    st.write(f"Last Close: ₹{row.Close:.2f}")
-                    st.write(f"Date: {pd.to_datetime(row.Date).date()}")
-
-        except requests.exceptions.RequestException as e:
-            st.error(f"Could not connect to the API. Make sure the backend is running. Error: {e}")
-
-else:
-    st.info("Click the button to get the latest 5-day price predictions.")
\ No newline at end of file
+try:
+    version = snapshot_version()
+except requests.exceptions.RequestException as e:
+    st.error(f"Could not connect to the API. Make sure the backend is running. Error: {e}")
+    st.stop()
+
+info, refresh = st.columns([5, 1])
+info.caption(f"Snapshot {version['version']} built at {version['built_at']} "
+             f"(model {version['model_version']}, data {version['data_version']}) · {version['tickers']} tickers")
+if refresh.button("Refresh data"):
+    st.cache_data.clear()
+    st.rerun()
+
+predictions_tab, explain_tab, weights_tab, equity_tab = st.tabs(
+    ["Latest Predictions", "Why?", "Target Weights", "Equity Curves"])
+
+with predictions_tab:
+    try:
+        results_df = load_predictions(version['version'])
+    except requests.exceptions.RequestException as e:
+        st.error(f"Could not load the predictions. Error: {e}")
+        st.stop()
+
+    up = results_df['signal'].str.startswith('UP')
+    total, ups, confidence = st.columns(3)
+    total.metric("Tickers", len(results_df))
+    ups.metric("Predicted UP", int(up.sum()), delta=f"{up.mean():.0%} of tickers", delta_color="off")
+    confidence.metric("Average confidence", f"{results_df['confidence'].mean():.2%}")
+
+    query_col, signal_col, confidence_col, sort_col, order_col, size_col = st.columns([3, 1, 2, 1, 1, 1])
+    query = query_col.text_input("Ticker contains", key='query')
+    signal = signal_col.selectbox("Signal", ['All', 'UP', 'DOWN'], key='signal')
+    min_confidence = confidence_col.slider("Minimum confidence", 0.0, 1.0, 0.0, 0.01, key='min_confidence')
+    sort_by = sort_col.selectbox("Sort by", SORT_COLUMNS, key='sort_by')
+    descending = order_col.toggle("Descending", value=True, key='descending')
+    page_size = size_col.selectbox("Rows per page", PAGE_SIZES, key='page_size')
+
+    filtered = filter_predictions(results_df, query, signal, min_confidence, sort_by, descending)
+    st.dataframe(
+        paginate(filtered, 'predictions_page', page_size), hide_index=True, width='stretch',
+        column_config={
+            'signal': st.column_config.TextColumn("Prediction"),
+            'confidence': st.column_config.ProgressColumn("Confidence", min_value=0.0, max_value=1.0,
+                                                          format="%.2f"),
+            'Close': st.column_config.NumberColumn("Last Close (₹)", format="%.2f"),
+        })
+
+with explain_tab:
+    ticker = st.selectbox("Ticker", sorted(results_df['Ticker']), key='explain_ticker')
+    try:
+        explanation = load_explanation(version['version'], ticker)
+    except requests.exceptions.RequestException as e:
+        st.error(f"Could not load the explanation of {ticker}. Error: {e}")
+    else:
+        signal = "UP 📈" if explanation['prediction'] == 1 else "DOWN 📉"
+        st.write(f"**{ticker}** is predicted **{signal}** on {explanation['date']} "
+                 f"(P(UP) = {explanation['probability_up']:.2%}).")
+        contributions = pd.DataFrame(explanation['contributions'])
+        contributions.loc[len(contributions)] = ['other features', float('nan'), explanation['other']]
+        st.bar_chart(contributions, x='feature', y='contribution', horizontal=True)
+        st.caption("Contributions are in log-odds of UP: positive values push the prediction towards UP. "
+                   f"They add up, with the base value of {explanation['base_value']:.3f}, to the model's output.")
+        st.dataframe(contributions, hide_index=True, width='stretch',
+                     column_config={'value': st.column_config.NumberColumn("Feature value", format="%.4f"),
+                                    'contribution': st.column_config.NumberColumn("Contribution", format="%+.4f")})
+
+with weights_tab:
+    method = st.selectbox("Allocation method", WEIGHT_METHODS, key='weight_method')
+    try:
+        weights, cash, risk = load_weights(version['version'], method)
+    except requests.exceptions.RequestException as e:
+        st.error(f"Could not load the target weights. Error: {e}")
+    else:
+        held, cash_col, volatility, var = st.columns(4)
+        held.metric("Positions", len(weights))
+        cash_col.metric("Cash", f"{cash:.1%}")
+        volatility.metric("Ex-ante volatility (annual)", f"{risk.get('volatility', float('nan')):.1%}")
+        var.metric("Daily VaR (95%)", f"{risk.get('var_95', float('nan')):.2%}")
+        st.dataframe(
+            paginate(weights, 'weights_page', PAGE_SIZES[0]), hide_index=True, width='stretch',
+            column_config={'weight': st.column_config.ProgressColumn("Weight", min_value=0.0,
+                                                                      max_value=1.0, format="%.3f")})
+
+with equity_tab:
+    st.subheader("Backtest strategies vs. buy & hold (test period)")
+    try:
+        st.line_chart(load_curves(version['version'], '/equity'))
+    except requests.exceptions.RequestException as e:
+        st.error(f"Could not load the equity curves. Error: {e}")
+
+    st.subheader("Single ticker (buy & hold, full history)")
+    ticker = st.selectbox("Ticker", sorted(results_df['Ticker']), key='equity_ticker')
+    try:
+        st.line_chart(load_curves(version['version'], f"/equity/{ticker}"))
+    except requests.exceptions.RequestException as e:
+        st.error(f"Could not load the history of {ticker}. Error: {e}")
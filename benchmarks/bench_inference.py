@@ -0,0 +1,70 @@
+import argparse
+import time
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from src.inference.predictor import Predictor, feature_columns
+from src.storage.parquet_store import read_dataset
+
+# --- File Paths ---
+BASE_DIR = Path(__file__).parent.parent
+LABELED_DATA_PATH = BASE_DIR / "data/processed/labeled_features"
+MODEL_PATH = BASE_DIR / "models/xgb_model.joblib"
+
+
+def best_of(func, repeats):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def bench_inference(rows=1_000_000, repeats=3):
+    """
+    Compares rows/sec of the old scoring path (drop columns, then
+    model.predict and model.predict_proba) with the shared Predictor
+    (float32 matrix, one inplace_predict pass), on the labeled data tiled
+    up to `rows` rows.
+    """
+    model = joblib.load(MODEL_PATH)
+    predictor = Predictor(model)
+    df = read_dataset(LABELED_DATA_PATH)
+    df = pd.concat([df] * int(np.ceil(rows / len(df))), ignore_index=True).iloc[:rows]
+    # Keys, labels (of every horizon) and raw prices the model was not trained on
+    to_drop = [col for col in df.columns if col not in feature_columns(df.columns)]
+
+    def double_call():
+        X = df.drop(columns=to_drop)
+        model.predict(X)
+        model.predict_proba(X)
+
+    def single_pass():
+        predictor.predict(df)
+
+    # Both paths must agree before their speed means anything
+    classes, _, confidence = predictor.predict(df.iloc[:10_000])
+    X = df.iloc[:10_000].drop(columns=to_drop)
+    assert np.array_equal(classes, model.predict(X))
+    assert np.array_equal(confidence, model.predict_proba(X).max(axis=1))
+
+    results = {}
+    for name, func in [('predict + predict_proba', double_call), ('Predictor', single_pass)]:
+        seconds = best_of(func, repeats)
+        results[name] = rows / seconds
+        print(f"{name:<25} {seconds:8.3f} s  {rows / seconds:14,.0f} rows/sec")
+    print(f"Speed-up: {results['Predictor'] / results['predict + predict_proba']:.2f}x")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark model scoring throughput.")
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args()
+
+    bench_inference(rows=args.rows, repeats=args.repeats)
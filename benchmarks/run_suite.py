@@ -0,0 +1,266 @@
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import platform
+import shutil
+import subprocess
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from benchmarks.synthetic import SEED, build_universe, train_stand_in_model
+from src.pipeline.profiling import RUN_LOG_ENV, peak_rss_mb
+
+# --- File Paths ---
+BASE_DIR = Path(__file__).parent.parent
+RESULTS_DIR = BASE_DIR / "benchmarks/results"
+HISTORY_PATH = RESULTS_DIR / "history.json"
+BASELINE_PATH = RESULTS_DIR / "baseline.json"
+
+# --- Suite Configuration ---
+SCALES = [5, 100, 500, 2000]    # Tickers in the synthetic universe
+N_DAYS = 504                    # Business days of history (about two years)
+PREDICT_REQUESTS = 200          # /predict calls timed per scale
+# A stage regresses when it is this much slower (or bigger) than the baseline,
+# and by more than the absolute floors, which keep tiny stages from flapping
+TOLERANCE = 0.25
+MIN_SECONDS_DELTA = 0.05
+MIN_RSS_DELTA_MB = 25
+
+
+# --- Stages ---
+# Each runs in a fresh process and returns the number of rows it processed.
+# Imports happen inside, so a stage's peak RSS only includes what it loads.
+
+def stage_generate_features(paths):
+    from src.features.build_features import generate_features
+    from src.storage.parquet_store import open_dataset
+    generate_features(paths['raw'], paths['tech'], state_path=paths['feature_state'])
+    return {'rows': open_dataset(paths['tech']).count_rows()}
+
+
+def stage_combine_features(paths):
+    from src.features.combine_features import combine_features
+    from src.storage.parquet_store import open_dataset
+    combine_features(paths['tech'], paths['sentiment'], paths['final'])
+    return {'rows': open_dataset(paths['final']).count_rows()}
+
+
+def stage_generate_labels(paths):
+    from src.features.create_labels import HORIZON_DAYS, generate_labels
+    from src.storage.parquet_store import open_dataset
+    generate_labels(paths['final'], paths['labeled'], HORIZON_DAYS)
+    return {'rows': open_dataset(paths['labeled']).count_rows()}
+
+
+def stage_backtest(paths):
+    from src.backtest.run_backtest import run_backtest
+    result = run_backtest(paths['labeled'], paths['model'], paths['plots'] / 'backtest.png')
+    return {'rows': result.weights.size}
+
+
+def stage_advanced_backtest(paths):
+    from src.backtest.run_advanced_backtest import run_advanced_backtest
+    result = run_advanced_backtest(paths['labeled'], paths['model'], paths['plots'] / 'advanced_backtest.png')
+    return {'rows': result.weights.size}
+
+
+def stage_snapshot(paths):
+    from src.api.snapshot import build_snapshot
+    snapshot = build_snapshot(paths['labeled'], paths['model'], paths['snapshot'])
+    return {'rows': len(snapshot.frame)}
+
+
+def stage_predict(paths, requests=PREDICT_REQUESTS):
+    from fastapi.testclient import TestClient
+
+    import src.api.main as api
+    from src.api.snapshot import SnapshotManager
+
+    # Serve the synthetic universe's snapshot instead of the repo's data
+    api.snapshots = SnapshotManager(paths['labeled'], paths['model'], paths['snapshot'], poll_interval=0)
+    latencies = []
+    with TestClient(api.app) as client:
+        client.post('/predict')
+        for _ in range(requests):
+            start = time.perf_counter()
+            response = client.post('/predict')
+            latencies.append(time.perf_counter() - start)
+            response.raise_for_status()
+    latencies.sort()
+    return {
+        'rows': requests,
+        'wall_seconds': sum(latencies),
+        'p50_ms': latencies[len(latencies) // 2] * 1000,
+        'p99_ms': latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000,
+    }
+
+
+STAGES = {
+    'generate_features': stage_generate_features,
+    'combine_features': stage_combine_features,
+    'generate_labels': stage_generate_labels,
+    'backtest': stage_backtest,
+    'advanced_backtest': stage_advanced_backtest,
+    'snapshot': stage_snapshot,
+    'predict': stage_predict,
+}
+
+
+def _measure(stage, paths):
+    # Runs in the child process; the stages' run log records stay with the synthetic data
+    os.environ[RUN_LOG_ENV] = str(paths['run_log'])
+    cpu_start, wall_start = time.process_time(), time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = STAGES[stage](paths)
+    measured = {
+        'wall_seconds': time.perf_counter() - wall_start,
+        'cpu_seconds': time.process_time() - cpu_start,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+    measured.update(result)
+    measured['rows_per_sec'] = measured['rows'] / measured['wall_seconds'] if measured['wall_seconds'] else None
+    return measured
+
+
+def measure_stage(stage, paths):
+    """
+    Runs one stage in a freshly spawned process, so its peak RSS is its own.
+    """
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as pool:
+        return pool.submit(_measure, stage, paths).result()
+
+
+def run_scale(n_tickers, n_days=N_DAYS, stages=None, keep_dir=None):
+    """
+    Generates a synthetic universe of `n_tickers` x `n_days` and times
+    every stage on it, in pipeline order. With `stages`, the stages they
+    depend on still run but are not recorded.
+    """
+    stages = stages or list(STAGES)
+    last = max(list(STAGES).index(stage) for stage in stages)
+    root = Path(keep_dir) / f"universe-{n_tickers}" if keep_dir else Path(tempfile.mkdtemp(prefix='bench-'))
+    try:
+        start = time.perf_counter()
+        paths = build_universe(root, n_tickers, n_days)
+        print(f"\n{n_tickers} tickers x {n_days} days: universe generated in {time.perf_counter() - start:.2f} s")
+
+        results = []
+        for stage in list(STAGES)[:last + 1]:
+            if stage == 'backtest':
+                # The backtests and the API need a model trained on this universe
+                train_stand_in_model(paths['labeled'], paths['model'])
+            measured = measure_stage(stage, paths)
+            if stage not in stages:
+                continue
+            results.append({'scale': n_tickers, 'days': n_days, 'stage': stage, **measured})
+            print(f"  {stage:<18} {measured['wall_seconds']:9.3f} s  {measured['peak_rss_mb']:8.1f} MB  "
+                  f"{measured['rows_per_sec'] or 0:14,.0f} rows/s")
+        return results
+    finally:
+        if not keep_dir:
+            shutil.rmtree(root, ignore_errors=True)
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BASE_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_json(path, default):
+    if Path(path).exists():
+        with open(path, 'r') as f:
+            return json.load(f)
+    return default
+
+
+def save_json(data, path):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=2)
+
+
+def find_regressions(results, baseline, tolerance=TOLERANCE):
+    """
+    Compares wall time and peak RSS of every (scale, stage) against the
+    baseline run. Returns a list of human-readable regressions.
+    """
+    reference = {(row['scale'], row['days'], row['stage']): row for row in baseline.get('results', [])}
+    regressions = []
+    for row in results:
+        base = reference.get((row['scale'], row['days'], row['stage']))
+        if base is None:
+            continue
+        for key, floor, unit in [('wall_seconds', MIN_SECONDS_DELTA, 's'), ('peak_rss_mb', MIN_RSS_DELTA_MB, 'MB')]:
+            delta = row[key] - base[key]
+            if delta > floor and row[key] > base[key] * (1 + tolerance):
+                regressions.append(f"{row['stage']} @ {row['scale']} tickers: {key} {base[key]:.2f} -> "
+                                   f"{row[key]:.2f} {unit} (+{delta / base[key] * 100:.0f}%)")
+    return regressions
+
+
+def run_suite(scales=SCALES, n_days=N_DAYS, stages=None, history_path=HISTORY_PATH, baseline_path=BASELINE_PATH,
+              save_baseline=False, tolerance=TOLERANCE, keep_dir=None):
+    """
+    Runs every stage at every scale, appends the run to the JSON history and
+    reports regressions against the stored baseline.
+    """
+    results = []
+    for n_tickers in scales:
+        results.extend(run_scale(n_tickers, n_days, stages, keep_dir))
+
+    run = {
+        'run_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'seed': SEED,
+        'results': results,
+    }
+    history = load_json(history_path, [])
+    history.append(run)
+    save_json(history, history_path)
+    print(f"\nRun appended to {history_path} ({len(history)} runs).")
+
+    baseline = load_json(baseline_path, None)
+    regressions = []
+    if baseline is None:
+        print(f"No baseline at {baseline_path}; run with --save-baseline to store one.")
+    else:
+        regressions = find_regressions(results, baseline, tolerance)
+        print(f"\n--- Regressions vs. baseline {baseline.get('commit')} ({baseline.get('run_at')}) ---")
+        print("\n".join(regressions) if regressions else "None.")
+    if save_baseline:
+        save_json(run, baseline_path)
+        print(f"Baseline saved to {baseline_path}")
+    return run, regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark every pipeline stage on synthetic universes.")
+    parser.add_argument('--scales', type=int, nargs='+', default=SCALES, help="universe sizes in tickers")
+    parser.add_argument('--days', type=int, default=N_DAYS)
+    parser.add_argument('--stages', nargs='+', choices=list(STAGES), default=None,
+                        help="only record these stages (the ones before them still run)")
+    parser.add_argument('--history', type=Path, default=HISTORY_PATH, help="JSON file the run is appended to")
+    parser.add_argument('--baseline', type=Path, default=BASELINE_PATH)
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE, help="allowed slowdown vs. the baseline")
+    parser.add_argument('--save-baseline', action='store_true', help="store this run as the new baseline")
+    parser.add_argument('--fail-on-regression', action='store_true', help="exit non-zero on regressions")
+    parser.add_argument('--keep-dir', type=Path, default=None, help="keep the generated data under this directory")
+    args = parser.parse_args()
+
+    _, found = run_suite(scales=args.scales, n_days=args.days, stages=args.stages, history_path=args.history,
+                         baseline_path=args.baseline, save_baseline=args.save_baseline,
+                         tolerance=args.tolerance, keep_dir=args.keep_dir)
+    if found and args.fail_on_regression:
+        raise SystemExit(1)
@@ -0,0 +1,151 @@
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+
+from src.inference.predictor import feature_columns
+from src.ingestion.price_ingest import PRICE_PARTITION_COLS
+from src.storage.parquet_store import append_dataset, read_dataset, write_dataset
+
+# --- Synthetic Universe ---
+# Ends after the backtests' TEST_START, so they always have a test period
+END_DATE = '2025-09-30'
+SEED = 42
+LATE_LISTING_FRACTION = 0.1   # Tickers whose history starts part-way through
+HEADLINES_PER_DAY = 0.3       # Mean headlines per ticker and calendar day
+
+# Headlines are built from a template and scored with this lexicon, standing
+# in for FinBERT (which would need a download and is too slow for a benchmark)
+POSITIVE_WORDS = ['surge', 'beat estimates', 'upgraded', 'record profit', 'win contract']
+NEGATIVE_WORDS = ['slump', 'miss estimates', 'downgraded', 'profit warning', 'face probe']
+NEUTRAL_WORDS = ['hold AGM', 'announce dividend date', 'appoint director', 'trade flat']
+
+# A small stand-in for the served model: same features, far fewer trees
+STAND_IN_PARAMS = {
+    'objective': 'binary:logistic',
+    'n_estimators': 20,
+    'max_depth': 3,
+    'tree_method': 'hist',
+    'random_state': SEED,
+}
+
+
+def ticker_names(n_tickers):
+    return [f"SYN{i:04d}.NS" for i in range(n_tickers)]
+
+
+def make_prices(n_tickers, n_days, seed=SEED, end=END_DATE):
+    """
+    Long (Date, Ticker, OHLCV) rows of a geometric random walk universe over
+    the last `n_days` business days up to `end`. A fraction of the tickers
+    lists late, so histories have different lengths.
+    """
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range(end=end, periods=n_days)
+    tickers = np.asarray(ticker_names(n_tickers))
+
+    volatility = rng.uniform(0.01, 0.03, n_tickers)
+    drift = rng.normal(0.0003, 0.0005, n_tickers)
+    log_returns = rng.normal(drift, volatility, (n_days, n_tickers))
+    close = rng.uniform(50, 500, n_tickers) * np.exp(np.cumsum(log_returns, axis=0))
+    open_ = close * np.exp(rng.normal(0.0, volatility / 3, (n_days, n_tickers)))
+    wick = np.abs(rng.normal(0.0, volatility / 2, (n_days, n_tickers)))
+    high = np.maximum(open_, close) * (1 + wick)
+    low = np.minimum(open_, close) * (1 - wick)
+    volume = rng.lognormal(13, 1, (n_days, n_tickers)).astype(np.int64)
+
+    first_day = np.zeros(n_tickers, dtype=int)
+    late = rng.random(n_tickers) < LATE_LISTING_FRACTION
+    first_day[late] = rng.integers(0, n_days // 2, late.sum())
+    rows, cols = np.nonzero(np.arange(n_days)[:, None] >= first_day[None, :])
+
+    return pd.DataFrame({
+        'Date': dates[rows], 'Ticker': tickers[cols],
+        'Open': open_[rows, cols], 'High': high[rows, cols], 'Low': low[rows, cols],
+        'Close': close[rows, cols], 'Adj Close': close[rows, cols], 'Volume': volume[rows, cols],
+    })
+
+
+def make_headlines(tickers, start, end=END_DATE, seed=SEED, rate=HEADLINES_PER_DAY):
+    """
+    Fake news: on average `rate` headlines per ticker and calendar day
+    (weekends included, as with real news), with a publication time.
+    """
+    rng = np.random.default_rng(seed + 1)
+    days = pd.date_range(start, end, freq='D')
+    counts = rng.poisson(rate, (len(days), len(tickers)))
+    day_idx, ticker_idx = np.nonzero(counts)
+    per_cell = counts[day_idx, ticker_idx]
+    day_idx, ticker_idx = np.repeat(day_idx, per_cell), np.repeat(ticker_idx, per_cell)
+
+    words = np.asarray(POSITIVE_WORDS + NEGATIVE_WORDS + NEUTRAL_WORDS, dtype=object)
+    picked = words[rng.integers(0, len(words), len(day_idx))]
+    tickers = np.asarray(tickers, dtype=object)
+    published = days[day_idx] + pd.to_timedelta(rng.integers(0, 24 * 3600, len(day_idx)), unit='s')
+    return pd.DataFrame({
+        'Ticker': tickers[ticker_idx],
+        'publishedAt': published,
+        'title': tickers[ticker_idx] + ' shares ' + picked,
+        'confidence': rng.uniform(0.5, 1.0, len(day_idx)),
+    })
+
+
+def score_headlines(headlines):
+    """
+    Lexicon sentiment of the fake headlines, aggregated per ticker and day
+    like build_sentiment_features: the mean of label (+1/0/-1) x confidence.
+    """
+    label = np.zeros(len(headlines))
+    for word in POSITIVE_WORDS:
+        label[headlines['title'].str.endswith(word).to_numpy()] = 1
+    for word in NEGATIVE_WORDS:
+        label[headlines['title'].str.endswith(word).to_numpy()] = -1
+    scored = pd.DataFrame({
+        'Ticker': headlines['Ticker'],
+        'Date': headlines['publishedAt'].dt.normalize(),
+        'sentiment_score': label * headlines['confidence'].to_numpy(),
+    })
+    return scored.groupby(['Ticker', 'Date'], as_index=False)['sentiment_score'].mean()
+
+
+def build_universe(root, n_tickers, n_days, seed=SEED):
+    """
+    Writes the raw price store and the sentiment features of a synthetic
+    universe under `root` and returns the paths every stage reads or writes.
+    """
+    root = Path(root)
+    paths = {
+        'raw': root / 'raw/prices',
+        'tech': root / 'processed/technical_features',
+        'feature_state': root / 'processed/technical_features_state.json',
+        'sentiment': root / 'processed/sentiment_features',
+        'final': root / 'processed/final_features',
+        'labeled': root / 'processed/labeled_features',
+        'model': root / 'models/xgb_model.joblib',
+        'snapshot': root / 'processed/latest_snapshot.arrow',
+        'plots': root / 'plots',
+        'run_log': root / 'run_log.jsonl',
+    }
+    prices = make_prices(n_tickers, n_days, seed)
+    append_dataset(prices, paths['raw'], PRICE_PARTITION_COLS, compact=False)
+
+    headlines = make_headlines(ticker_names(n_tickers), prices['Date'].min(), seed=seed)
+    write_dataset(score_headlines(headlines), paths['sentiment'])
+    paths['plots'].mkdir(parents=True, exist_ok=True)
+    return paths
+
+
+def train_stand_in_model(labeled_path, model_path, params=STAND_IN_PARAMS):
+    """
+    Fits the small stand-in model on the labeled synthetic data, so the
+    backtests and the API have a model with the real feature schema.
+    """
+    df = read_dataset(labeled_path)
+    features = feature_columns(df.columns)
+    model = xgb.XGBClassifier(**params)
+    model.fit(df[features], df['target'])
+    Path(model_path).parent.mkdir(parents=True, exist_ok=True)
+    joblib.dump(model, model_path)
+    return model
@@ -0,0 +1,13 @@
+import numpy as np
+
+# Dates past any stored row, used for "latest" lookups
+LATEST = np.iinfo(np.int64).max
+EARLIEST = np.iinfo(np.int64).min
+
+
+def to_ns(date):
+    """
+    A date (datetime.date, string or Timestamp) as int64 nanoseconds since
+    the epoch, the representation of the in-memory date arrays.
+    """
+    return np.datetime64(date, 'ns').astype(np.int64)
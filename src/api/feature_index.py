@@ -0,0 +1,156 @@
+import time
+
+import numpy as np
+import orjson
+
+from src.api.dates import EARLIEST, LATEST, to_ns
+from src.api.metrics import observe_stage, stage_timer
+from src.inference.predictor import Predictor
+from src.storage.parquet_store import read_dataset
+
+# Rows serialised per chunk of a streamed NDJSON response
+STREAM_CHUNK_ROWS = 1000
+# Path the prediction stages are timed under (see src.api.metrics)
+METRICS_PATH = '/predict/batch'
+
+
+class FeatureIndex:
+    """
+    In-memory (Ticker, Date) index over the labeled feature history.
+
+    Rows are kept sorted by ticker, then date, as contiguous NumPy arrays.
+    Every ticker owns one slice of them, so an as-of lookup is a binary
+    search (np.searchsorted) inside that slice.
+    """
+
+    def __init__(self, df, predictor):
+        self.predictor = predictor
+
+        df = df.sort_values(['Ticker', 'Date'], kind='stable')
+        tickers = df['Ticker'].astype(str).to_numpy()
+        self.dates = df['Date'].to_numpy(dtype='datetime64[ns]').view(np.int64)
+        self.close = df['Close'].to_numpy(dtype=np.float64)
+        self.X = predictor.matrix(df)
+
+        names, starts = np.unique(tickers, return_index=True)
+        ends = np.append(starts[1:], len(tickers))
+        self.slices = {name: (start, end) for name, start, end in zip(names, starts, ends)}
+
+    @classmethod
+    def from_dataset(cls, data_path, model_path):
+        predictor = Predictor.from_path(model_path)
+        columns = list(dict.fromkeys(['Close'] + predictor.features))
+        return cls(read_dataset(data_path, columns=columns), predictor)
+
+    def as_of(self, ticker, dates):
+        """
+        Row numbers of the last row of `ticker` on or before each of `dates`
+        (int64 ns). -1 where the ticker has no such row.
+        """
+        dates = np.asarray(dates, dtype=np.int64)
+        if ticker not in self.slices:
+            return np.full(len(dates), -1, dtype=np.int64)
+        start, end = self.slices[ticker]
+        rows = start + np.searchsorted(self.dates[start:end], dates, side='right') - 1
+        return np.where(rows >= start, rows, -1)
+
+    def between(self, ticker, start_date, end_date):
+        """
+        Row numbers of every row of `ticker` with start_date <= Date <= end_date.
+        """
+        if ticker not in self.slices:
+            return np.empty(0, dtype=np.int64)
+        start, end = self.slices[ticker]
+        dates = self.dates[start:end]
+        lo = np.searchsorted(dates, start_date, side='left')
+        hi = np.searchsorted(dates, end_date, side='right')
+        return np.arange(start + lo, start + hi)
+
+    def lookup(self, queries):
+        """
+        Resolves a list of queries to rows. A query is a dict with 'ticker'
+        and either 'date' (as-of lookup; None for the latest row) or
+        'start'/'end' (every row in the range). Returns, per result line, the
+        ticker, the requested as-of date and the row number (-1 if missing).
+        """
+        tickers, as_of, rows = [], [], []
+
+        # As-of queries are grouped per ticker: one binary search call each
+        point_queries = {}
+        for i, query in enumerate(queries):
+            if query.get('start') is None and query.get('end') is None:
+                date = LATEST if query.get('date') is None else to_ns(query['date'])
+                point_queries.setdefault(query['ticker'], []).append((i, date))
+        point_rows = {}
+        for ticker, items in point_queries.items():
+            found = self.as_of(ticker, [date for _, date in items])
+            for (i, date), row in zip(items, found):
+                point_rows[i] = (date, row)
+
+        for i, query in enumerate(queries):
+            if i in point_rows:
+                date, row = point_rows[i]
+                tickers.append(query['ticker'])
+                as_of.append(None if date == LATEST else date)
+                rows.append(row)
+            else:
+                start = EARLIEST if query.get('start') is None else to_ns(query['start'])
+                end = LATEST if query.get('end') is None else to_ns(query['end'])
+                found = self.between(query['ticker'], start, end)
+                if not len(found):
+                    found = [-1]
+                tickers.extend([query['ticker']] * len(found))
+                as_of.extend([None] * len(found))
+                rows.extend(found)
+        return tickers, as_of, np.asarray(rows, dtype=np.int64)
+
+    def predict_rows(self, rows, metrics_path=METRICS_PATH):
+        """
+        Predicts every distinct row in `rows` in one pass.
+        Returns predictions and confidences aligned with `rows` (-1 rows get
+        class -1 and NaN confidence).
+        """
+        valid = rows >= 0
+        unique_rows, inverse = np.unique(rows[valid], return_inverse=True)
+        predictions = np.full(len(rows), -1, dtype=np.int64)
+        confidence = np.full(len(rows), np.nan)
+        if len(unique_rows):
+            with stage_timer(metrics_path, 'feature_matrix'):
+                X = self.X[unique_rows]
+            with stage_timer(metrics_path, 'inference'):
+                classes, _, best = self.predictor.predict_matrix(X)
+            predictions[valid] = classes[inverse]
+            confidence[valid] = best[inverse]
+        return predictions, confidence
+
+    def stream_predictions(self, queries, chunk_rows=STREAM_CHUNK_ROWS, metrics_path=METRICS_PATH):
+        """
+        Yields the predictions for `queries` as NDJSON, one line per result,
+        in chunks of `chunk_rows` lines. The serialization time of all
+        chunks is recorded as one observation once the stream is done.
+        """
+        with stage_timer(metrics_path, 'lookup'):
+            tickers, as_of, rows = self.lookup(queries)
+        predictions, confidence = self.predict_rows(rows, metrics_path)
+        safe_rows = np.maximum(rows, 0)
+        dates = np.datetime_as_string(self.dates[safe_rows].view('datetime64[ns]'), unit='s')
+        as_of_dates = [None if date is None else str(np.datetime64(int(date), 'ns').astype('datetime64[s]'))
+                       for date in as_of]
+        close = self.close[safe_rows]
+
+        serialization_seconds = 0.0
+        for chunk_start in range(0, len(rows), chunk_rows):
+            started = time.perf_counter()
+            lines = []
+            for i in range(chunk_start, min(chunk_start + chunk_rows, len(rows))):
+                if rows[i] < 0:
+                    record = {'Ticker': tickers[i], 'as_of': as_of_dates[i], 'error': 'no data'}
+                else:
+                    record = {'Ticker': tickers[i], 'as_of': as_of_dates[i], 'Date': dates[i],
+                              'Close': float(close[i]), 'prediction': int(predictions[i]),
+                              'confidence': float(confidence[i])}
+                lines.append(orjson.dumps(record))
+            chunk = b'\n'.join(lines) + b'\n'
+            serialization_seconds += time.perf_counter() - started
+            yield chunk
+        observe_stage(metrics_path, 'serialization', serialization_seconds)
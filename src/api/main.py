@@ -1,45 +1,165 @@
-from fastapi import FastAPI
-import pandas as pd
-from pathlib import Path
-import joblib
+import os
+from contextlib import asynccontextmanager
+from datetime import date as Date
+from typing import List, Optional
 
-# --- Initialize FastAPI app ---
-app = FastAPI(title="Portfolio Optimizer API")
+from fastapi import FastAPI, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+from src.api.metrics import (CONTENT_TYPE_LATEST, RequestMetricsMiddleware, register_snapshot_collector, render,
+                             stage_timer)
+from src.api.snapshot import POLL_INTERVAL, WEIGHT_METHODS, SnapshotManager
+from src.api.timeseries import DEFAULT_POINTS, MAX_POINTS, ticker_payload
+from src.inference.explain import MAX_K, TOP_K
 
 # --- Load Model and Data ---
-# These are loaded once when the API starts up for efficiency
-BASE_DIR = Path(__file__).parent.parent.parent
-MODEL_PATH = BASE_DIR / "models/xgb_model.joblib"
-DATA_PATH = BASE_DIR / "data/processed/labeled_features.csv"
+# The latest-row snapshot and its predictions are built offline
+# (python -m src.api.snapshot) and only loaded here. A background watcher
+# rebuilds them when the feature store or the model changes.
+snapshots = SnapshotManager(poll_interval=float(os.getenv("SNAPSHOT_POLL_INTERVAL", POLL_INTERVAL)))
+# Scraped from whichever snapshot is being served at the time
+register_snapshot_collector(lambda: snapshots.current)
+
+
+@asynccontextmanager
+async def lifespan(app):
+    snapshots.load()
+    snapshots.start_watcher()
+    yield
+    snapshots.stop_watcher()
+
+
+class BatchQuery(BaseModel):
+    ticker: str
+    # As-of date: the last row on or before it (the latest row if omitted)
+    date: Optional[Date] = None
+    # Date range: every row between start and end, both inclusive
+    start: Optional[Date] = None
+    end: Optional[Date] = None
+
+
+class BatchRequest(BaseModel):
+    queries: List[BatchQuery]
+
+
+# --- Initialize FastAPI app ---
+app = FastAPI(title="Portfolio Optimizer API", lifespan=lifespan)
+app.add_middleware(RequestMetricsMiddleware)
 
-model = joblib.load(MODEL_PATH)
-df = pd.read_csv(DATA_PATH, parse_dates=['Date'])
 
 # --- API Endpoint ---
 @app.post("/predict")
-def predict_stocks():
-    """
-    Loads the latest data for all tickers, makes a prediction, 
-    and returns the results as JSON.
-    """
-    latest_data = df.loc[df.groupby('Ticker')['Date'].idxmax()]
-    
-    features_to_drop = ['Date', 'Ticker', 'future_return', 'target', 
-                        'Open', 'High', 'Low', 'Adj Close', 'Volume']
-    X_predict = latest_data.drop(columns=features_to_drop)
-    
-    # Get predictions and probabilities
-    predictions = model.predict(X_predict)
-    probabilities = model.predict_proba(X_predict)
-    
-    # Format the results
-    latest_data['prediction'] = predictions
-    latest_data['confidence'] = probabilities.max(axis=1)
-    
-    results = latest_data[['Ticker', 'Date', 'Close', 'prediction', 'confidence']].to_dict('records')
-    
-    return {"predictions": results}
+async def predict_stocks():
+    """
+    Returns the prediction for the latest data of every ticker. The response
+    is rendered when the snapshot is built, so this is a plain lookup.
+    """
+    # The bytes were rendered at build time (timed under snapshot_build), so
+    # there is no serialization stage to time here
+    with stage_timer('/predict', 'lookup'):
+        payload = snapshots.current.payload
+    return Response(content=payload, media_type="application/json")
+
+
+@app.post("/predict/batch")
+def predict_batch(request: BatchRequest):
+    """
+    Predicts arbitrary (ticker, as-of date) pairs and date ranges against the
+    full feature history. All rows of a request are predicted in one call and
+    streamed back as NDJSON, one line per result.
+    """
+    index = snapshots.index()
+    queries = [query.model_dump() for query in request.queries]
+    return StreamingResponse(index.stream_predictions(queries), media_type="application/x-ndjson")
+
+
+@app.get("/weights")
+async def portfolio_weights(method: str = 'mean_variance'):
+    """
+    Returns the target portfolio weights for the next session, from the
+    latest predictions and recent returns. Like /predict, the response is
+    rendered when the snapshot is built.
+    """
+    payload = snapshots.current.weights_payloads.get(method)
+    if payload is None:
+        raise HTTPException(status_code=404, detail=f"Unknown method '{method}', expected one of {WEIGHT_METHODS}")
+    return Response(content=payload, media_type="application/json")
+
+
+@app.get("/version")
+def snapshot_version():
+    """
+    Version of the served snapshot, for clients that cache responses per
+    version (e.g. the dashboard).
+    """
+    snapshot = snapshots.current
+    return {"version": snapshot.version, "built_at": snapshot.built_at, "model_version": snapshot.model_version,
+            "data_version": snapshot.data_version, "tickers": len(snapshot.frame)}
+
+
+@app.get("/equity")
+def equity_curves(points: int = Query(DEFAULT_POINTS, ge=2, le=MAX_POINTS), start: Optional[Date] = None,
+                  end: Optional[Date] = None):
+    """
+    Equity curves of the backtest strategies and buy & hold over the test
+    period, rebased to 1 and downsampled to at most `points` dates.
+    """
+    version = snapshots.current.version
+    return Response(content=snapshots.equity().payload(version, points, start, end), media_type="application/json")
+
+
+@app.get("/equity/{ticker}")
+def ticker_equity(ticker: str, points: int = Query(DEFAULT_POINTS, ge=2, le=MAX_POINTS),
+                  start: Optional[Date] = None, end: Optional[Date] = None):
+    """
+    Buy & hold equity curve of one ticker over its full history, rebased
+    to 1 and downsampled to at most `points` dates.
+    """
+    payload = ticker_payload(snapshots.index(), ticker, snapshots.current.version, points, start, end)
+    if payload is None:
+        raise HTTPException(status_code=404, detail=f"Unknown ticker '{ticker}'")
+    return Response(content=payload, media_type="application/json")
+
+
+@app.get("/explain/{ticker}")
+async def explain_ticker(ticker: str, k: int = Query(TOP_K, ge=1, le=MAX_K)):
+    """
+    Why the latest prediction of `ticker` came out as it did: the `k`
+    features with the largest contributions (TreeSHAP, in log-odds of the
+    UP class). The contributions of every ticker are computed in one batch
+    when the snapshot is built, so this only ranks one row.
+    """
+    explanations = snapshots.current.explanations
+    with stage_timer('/explain', 'lookup'):
+        explanation = explanations.explain(ticker, k)
+    if explanation is None:
+        raise HTTPException(status_code=404, detail=f"Unknown ticker '{ticker}'")
+    with stage_timer('/explain', 'serialization'):
+        payload = explanations.render(explanation)
+    return Response(content=payload, media_type="application/json")
+
+
+@app.post("/admin/reload")
+def reload_snapshot(force: bool = False):
+    """
+    Rebuilds the snapshot now if the feature store or model changed
+    (or unconditionally with `force=true`).
+    """
+    reloaded = snapshots.refresh(force=force)
+    snapshot = snapshots.current
+    return {"reloaded": reloaded, "version": snapshot.version, "built_at": snapshot.built_at}
+
+
+@app.get("/metrics")
+def metrics():
+    """
+    Prometheus metrics: request and per-stage prediction latencies, cache
+    hit ratios and the versions and age of the served snapshot.
+    """
+    return Response(content=render(), media_type=CONTENT_TYPE_LATEST)
+
 
 @app.get("/")
 def read_root():
-    return {"message": "Welcome to the Portfolio Optimizer API"}
\ No newline at end of file
+    return {"message": "Welcome to the Portfolio Optimizer API"}
@@ -0,0 +1,124 @@
+import time
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, Counter, Histogram, generate_latest
+from prometheus_client.core import GaugeMetricFamily, InfoMetricFamily
+
+# --- Metrics Configuration ---
+# From 100 us (a pre-rendered /predict lookup) to 10 s (a large batch request)
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0,
+                   2.5, 5.0, 10.0)
+# Stages of a prediction. /predict only looks up the snapshot's pre-rendered
+# bytes live (its only stage is 'lookup'); the feature matrix, inference,
+# contributions (for /explain) and JSON rendering are paid once per snapshot
+# build and recorded under path="snapshot_build".
+PREDICT_STAGES = ['lookup', 'feature_matrix', 'inference', 'explanation', 'serialization']
+
+REQUEST_SECONDS = Histogram('api_request_duration_seconds', "HTTP request latency until the response headers",
+                            ['method', 'route', 'status'], buckets=LATENCY_BUCKETS)
+PREDICT_STAGE_SECONDS = Histogram('predict_stage_duration_seconds', "Latency of each prediction stage",
+                                  ['path', 'stage'], buckets=LATENCY_BUCKETS)
+CACHE_REQUESTS = Counter('cache_requests', "Cache lookups by cache and result (hit or miss)", ['cache', 'result'])
+
+
+def stage_timer(path, stage):
+    """
+    Context manager timing one prediction stage of `path` (an endpoint or
+    'snapshot_build').
+    """
+    return PREDICT_STAGE_SECONDS.labels(path=path, stage=stage).time()
+
+
+def observe_stage(path, stage, seconds):
+    PREDICT_STAGE_SECONDS.labels(path=path, stage=stage).observe(seconds)
+
+
+def record_cache(cache, hit):
+    CACHE_REQUESTS.labels(cache=cache, result='hit' if hit else 'miss').inc()
+
+
+def cache_hit_ratios():
+    """
+    Lifetime hit ratio of every cache, from the cache_requests counters.
+    """
+    counts = {}
+    for metric in CACHE_REQUESTS.collect():
+        for sample in metric.samples:
+            if sample.name.endswith('_total'):
+                cache = counts.setdefault(sample.labels['cache'], {'hit': 0.0, 'miss': 0.0})
+                cache[sample.labels['result']] += sample.value
+    return {name: c['hit'] / (c['hit'] + c['miss']) for name, c in counts.items() if c['hit'] + c['miss']}
+
+
+class SnapshotCollector:
+    """
+    Prometheus collector describing the served snapshot at scrape time:
+    its model and data versions, its age and size, and the cache hit ratios.
+    `current` returns the snapshot being served (or None).
+    """
+
+    def __init__(self, current):
+        self.current = current
+
+    def collect(self):
+        ratios = GaugeMetricFamily('cache_hit_ratio', "Lifetime hit ratio of each cache", labels=['cache'])
+        for cache, ratio in sorted(cache_hit_ratios().items()):
+            ratios.add_metric([cache], ratio)
+        yield ratios
+
+        snapshot = self.current()
+        if snapshot is None:
+            return
+        yield InfoMetricFamily('snapshot', "Versions of the served snapshot", value={
+            'version': str(snapshot.version),
+            'model_version': str(snapshot.model_version),
+            'data_version': str(snapshot.data_version),
+            'built_at': str(snapshot.built_at),
+            'as_of': snapshot.frame['Date'].max().isoformat() if len(snapshot.frame) else '',
+        })
+        if snapshot.built_at:
+            built_at = time.mktime(time.strptime(snapshot.built_at, '%Y-%m-%dT%H:%M:%S'))
+            yield GaugeMetricFamily('snapshot_age_seconds', "Seconds since the served snapshot was built",
+                                    value=time.time() - built_at)
+        yield GaugeMetricFamily('snapshot_tickers', "Tickers in the served snapshot", value=len(snapshot.frame))
+
+
+class RequestMetricsMiddleware:
+    """
+    ASGI middleware recording the latency of every HTTP request until its
+    response headers, by method, route template and status. (Plain ASGI:
+    the decorator-based HTTP middleware costs more than a /predict lookup.)
+    Streamed responses are only timed until their headers; /predict/batch
+    records its serialization separately.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+
+        async def send_and_record(message):
+            if message['type'] == 'http.response.start':
+                # The router has stored the matched route in the scope by now
+                route = getattr(scope.get('route'), 'path', 'unmatched')
+                REQUEST_SECONDS.labels(method=scope['method'], route=route,
+                                       status=message['status']).observe(time.perf_counter() - start)
+            await send(message)
+
+        await self.app(scope, receive, send_and_record)
+
+
+def register_snapshot_collector(current, registry=REGISTRY):
+    collector = SnapshotCollector(current)
+    registry.register(collector)
+    return collector
+
+
+def render(registry=REGISTRY):
+    """
+    The metrics of `registry` in the Prometheus text format.
+    """
+    return generate_latest(registry)
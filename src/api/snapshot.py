@@ -0,0 +1,297 @@
+import hashlib
+import json
+import threading
+import time
+from pathlib import Path
+
+import pyarrow as pa
+
+from src.api.feature_index import FeatureIndex
+from src.api.metrics import record_cache, stage_timer
+from src.api.timeseries import EquityCurves
+from src.inference.explain import BASE_VALUE_COLUMN, Explanations, contribution_columns, contribution_frame
+from src.inference.predictor import Predictor
+from src.pipeline.profiling import profiled, record_rows
+from src.portfolio.optimizer import LOOKBACK_DAYS, target_weights
+from src.portfolio.risk import TRADING_DAYS, VAR_LEVEL, EWMACovariance, parametric_risk
+from src.storage.parquet_store import read_dataset
+
+# --- File Paths ---
+BASE_DIR = Path(__file__).parent.parent.parent
+MODEL_PATH = BASE_DIR / "models/xgb_model.joblib"
+DATA_PATH = BASE_DIR / "data/processed/labeled_features"
+SNAPSHOT_PATH = BASE_DIR / "data/processed/latest_snapshot.arrow"
+
+# Seconds between two checks of the feature store and model for changes
+POLL_INTERVAL = 30
+
+SNAPSHOT_COLUMNS = ['Ticker', 'Date', 'Close', 'prediction', 'confidence']
+# Allocation methods whose next-session target weights are stored in the snapshot
+WEIGHT_METHODS = ['mean_variance', 'hrp']
+# Bumped whenever the artifact's columns change, so older artifacts get rebuilt
+SNAPSHOT_FORMAT = '5'
+
+
+def _data_files(data_path):
+    data_path = Path(data_path)
+    return [(path, path.relative_to(data_path)) for path in sorted(data_path.rglob('*.parquet'))]
+
+
+def _model_files(model_path):
+    return [(Path(model_path), Path(model_path).name)]
+
+
+def _fingerprint(files):
+    digest = hashlib.sha256()
+    # Relative names, so an artifact built elsewhere (e.g. in the image build) still matches
+    for path, name in files:
+        stat = path.stat()
+        digest.update(f"{name}\0{stat.st_size}\0{stat.st_mtime_ns}\n".encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+
+def source_fingerprint(data_path=DATA_PATH, model_path=MODEL_PATH):
+    """
+    Fingerprint of the feature store and the model file, built from the
+    path, size and mtime of every file. Any rewrite or append changes it.
+    """
+    return _fingerprint(_data_files(data_path) + _model_files(model_path))
+
+
+def data_fingerprint(data_path=DATA_PATH):
+    return _fingerprint(_data_files(data_path))
+
+
+def model_fingerprint(model_path=MODEL_PATH):
+    return _fingerprint(_model_files(model_path))
+
+
+class Snapshot:
+    """
+    Latest feature row and prediction of every ticker, plus the /predict
+    response rendered once as JSON bytes. `version` covers both sources;
+    `model_version` and `data_version` fingerprint each one separately.
+    The frame also carries the feature contributions of every row, which
+    back /explain.
+    """
+
+    def __init__(self, frame, version, built_at, risk=None, model_version=None, data_version=None):
+        self.frame = frame
+        self.version = version
+        self.built_at = built_at
+        self.risk = risk or {}
+        self.model_version = model_version
+        self.data_version = data_version
+        self.explanations = Explanations.from_frame(frame, version)
+
+        records = [
+            {'Ticker': row.Ticker, 'Date': row.Date.isoformat(), 'Close': float(row.Close),
+             'prediction': int(row.prediction), 'confidence': float(row.confidence)}
+            for row in frame.itertuples(index=False)
+        ]
+        self.payload = json.dumps({'predictions': records}).encode('utf-8')
+
+        as_of = frame['Date'].max().isoformat()
+        self.weights_payloads = {}
+        for method in WEIGHT_METHODS:
+            weights = {row.Ticker: float(getattr(row, f'weight_{method}')) for row in frame.itertuples(index=False)}
+            self.weights_payloads[method] = json.dumps({
+                'version': version, 'method': method, 'as_of': as_of,
+                'weights': weights, 'cash': max(0.0, 1.0 - sum(weights.values())),
+                'risk': self.risk.get(method),
+            }).encode('utf-8')
+
+
+def snapshot_weights(df, proba, tickers, lookback=LOOKBACK_DAYS):
+    """
+    Next-session target weights of every allocation method, from the last
+    `lookback` daily returns of `df` and the latest UP probabilities
+    (one per ticker, in the order of `tickers`), and the ex-ante risk of
+    each weight vector under the EWMA covariance of the full history.
+    """
+    close = df.pivot(index='Date', columns='Ticker', values='Close').reindex(columns=tickers)
+    returns = (close / close.ffill().shift(1) - 1).iloc[1:].to_numpy()
+    weights = {method: target_weights(returns[-lookback:], proba, method, lookback=lookback)
+               for method in WEIGHT_METHODS}
+
+    covariance = EWMACovariance(len(tickers))
+    covariance.update_many(returns)
+    risk = {}
+    for method, w in weights.items():
+        volatility, var = parametric_risk(covariance.cov, w)
+        risk[method] = {'volatility': volatility * TRADING_DAYS ** 0.5, f'var_{int(VAR_LEVEL * 100)}': var}
+    return weights, risk
+
+
+@profiled()
+def build_snapshot(data_path=DATA_PATH, model_path=MODEL_PATH, snapshot_path=SNAPSHOT_PATH):
+    """
+    Builds the snapshot offline: takes the latest row of every ticker, runs
+    the model once and writes the result as a small Arrow IPC file, so the
+    API never has to parse the full feature history. The feature
+    contributions of every ticker are computed in the same batch. The
+    prediction stages are timed under path="snapshot_build" (see src.api.metrics).
+    """
+    version = source_fingerprint(data_path, model_path)
+    versions = {'model_version': model_fingerprint(model_path), 'data_version': data_fingerprint(data_path)}
+    predictor = Predictor.from_path(model_path)
+    df = read_dataset(data_path, columns=list(dict.fromkeys(['Close'] + predictor.features)))
+    record_rows(len(df))
+    with stage_timer('snapshot_build', 'lookup'):
+        latest_data = df.loc[df.groupby('Ticker', observed=True)['Date'].idxmax()].reset_index(drop=True)
+
+    with stage_timer('snapshot_build', 'feature_matrix'):
+        X = predictor.matrix(latest_data)
+    with stage_timer('snapshot_build', 'inference'):
+        latest_data['prediction'], proba, latest_data['confidence'] = predictor.predict_matrix(X)
+    with stage_timer('snapshot_build', 'explanation'):
+        contributions = contribution_frame(latest_data, predictor, X)
+
+    frame = latest_data[list(dict.fromkeys(SNAPSHOT_COLUMNS + predictor.features))].copy()
+    for column in contribution_columns(predictor.features) + [BASE_VALUE_COLUMN]:
+        frame[column] = contributions[column]
+    frame['Ticker'] = frame['Ticker'].astype(str)
+    weights, risk = snapshot_weights(df, proba, latest_data['Ticker'].tolist())
+    for method, w in weights.items():
+        frame[f'weight_{method}'] = w
+    built_at = time.strftime('%Y-%m-%dT%H:%M:%S')
+    write_snapshot(frame, version, built_at, snapshot_path, risk, **versions)
+    print(f"Snapshot {version} built for {len(frame)} tickers and saved to {snapshot_path}.")
+    with stage_timer('snapshot_build', 'serialization'):
+        return Snapshot(frame, version, built_at, risk, **versions)
+
+
+def write_snapshot(frame, version, built_at, snapshot_path=SNAPSHOT_PATH, risk=None, model_version=None,
+                   data_version=None):
+    """
+    Writes the snapshot artifact atomically (write to a temp file, then rename).
+    """
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+    table = table.replace_schema_metadata({'version': version, 'built_at': built_at, 'format': SNAPSHOT_FORMAT,
+                                           'risk': json.dumps(risk or {}), 'model_version': model_version or '',
+                                           'data_version': data_version or ''})
+    snapshot_path = Path(snapshot_path)
+    snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = snapshot_path.with_suffix('.tmp')
+    with pa.OSFile(str(tmp_path), 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    tmp_path.replace(snapshot_path)
+
+
+def read_snapshot(snapshot_path=SNAPSHOT_PATH):
+    """
+    Reads a snapshot artifact, or returns None if there is none or it was
+    written in an older format.
+    """
+    snapshot_path = Path(snapshot_path)
+    if not snapshot_path.exists():
+        return None
+    with pa.memory_map(str(snapshot_path), 'r') as source:
+        table = pa.ipc.open_file(source).read_all()
+    metadata = {key.decode(): value.decode() for key, value in (table.schema.metadata or {}).items()}
+    if metadata.get('format') != SNAPSHOT_FORMAT:
+        return None
+    return Snapshot(table.to_pandas(), metadata.get('version'), metadata.get('built_at'),
+                    json.loads(metadata.get('risk', '{}')), metadata.get('model_version') or None,
+                    metadata.get('data_version') or None)
+
+
+class SnapshotManager:
+    """
+    Holds the snapshot served by the API. `refresh` rebuilds it when the
+    feature store or the model changed and swaps it in with a single
+    reference assignment, so requests see either the old or the new
+    snapshot, never a mix.
+    """
+
+    def __init__(self, data_path=DATA_PATH, model_path=MODEL_PATH, snapshot_path=SNAPSHOT_PATH,
+                 poll_interval=POLL_INTERVAL):
+        self.data_path = data_path
+        self.model_path = model_path
+        self.snapshot_path = snapshot_path
+        self.poll_interval = poll_interval
+        self.current = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._watcher = None
+        # Structures derived from the snapshot's sources: name -> (version, value).
+        # Each has its own lock, so building one (e.g. a full backtest for the
+        # equity curves) does not block callers waiting on another.
+        self._derived = {}
+        self._derived_locks = {}
+        self._locks_lock = threading.Lock()
+
+    def load(self):
+        """
+        Loads the artifact built offline, rebuilding it if it is missing or stale.
+        """
+        snapshot = read_snapshot(self.snapshot_path)
+        stale = snapshot is None or snapshot.version != source_fingerprint(self.data_path, self.model_path)
+        record_cache('snapshot_artifact', hit=not stale)
+        if stale:
+            snapshot = build_snapshot(self.data_path, self.model_path, self.snapshot_path)
+        self.current = snapshot
+        return snapshot
+
+    def refresh(self, force=False):
+        """
+        Rebuilds and swaps the snapshot if the sources changed (or if `force`).
+        Returns True if a new snapshot was swapped in.
+        """
+        with self._lock:
+            version = source_fingerprint(self.data_path, self.model_path)
+            up_to_date = self.current is not None and self.current.version == version
+            record_cache('snapshot', hit=up_to_date)
+            if not force and up_to_date:
+                return False
+            self.current = build_snapshot(self.data_path, self.model_path, self.snapshot_path)
+            return True
+
+    def _per_version(self, name, build):
+        # Built on first use and again whenever the snapshot version changes
+        version = self.current.version
+        with self._locks_lock:
+            lock = self._derived_locks.setdefault(name, threading.Lock())
+        with lock:
+            cached = self._derived.get(name)
+            hit = cached is not None and cached[0] == version
+            record_cache(name, hit=hit)
+            if not hit:
+                cached = (version, build())
+                self._derived[name] = cached
+            return cached[1]
+
+    def index(self):
+        """
+        FeatureIndex over the full history, for the batch and time-series endpoints.
+        """
+        return self._per_version('feature_index', lambda: FeatureIndex.from_dataset(self.data_path, self.model_path))
+
+    def equity(self):
+        """
+        Backtest equity curves over the test period, for the time-series endpoint.
+        """
+        return self._per_version('equity_curves', lambda: EquityCurves.from_dataset(self.data_path, self.model_path))
+
+    def _watch(self):
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                # Keep serving the previous snapshot, e.g. while a write is in progress
+                print(f"Snapshot refresh failed: {e}")
+
+    def start_watcher(self):
+        if self.poll_interval and self._watcher is None:
+            self._watcher = threading.Thread(target=self._watch, name='snapshot-watcher', daemon=True)
+            self._watcher.start()
+
+    def stop_watcher(self):
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join()
+            self._watcher = None
+
+
+if __name__ == "__main__":
+    build_snapshot()
@@ -0,0 +1,107 @@
+import numpy as np
+import orjson
+
+from src.api.dates import to_ns
+from src.backtest.engine import load_backtest_data, run_backtest
+from src.backtest.run_backtest import TRANSACTION_COST_BPS
+
+# --- Time Series Configuration ---
+DEFAULT_POINTS = 500      # Points per response; about one per pixel of a chart
+MAX_POINTS = 5000
+# The strategies of the two backtest scripts, with their cost settings
+EQUITY_STRATEGIES = {'signal_equal': TRANSACTION_COST_BPS, 'confidence': 0.0}
+BENCHMARK_NAME = 'buy_and_hold'
+
+
+def downsample(values, points):
+    """
+    Indices of at most `points` samples of a (time x series) array that keep
+    its shape for plotting: the first and last sample plus the minimum and
+    maximum of every series in each of a set of equal-width time buckets.
+    Peaks and drawdowns survive, unlike with plain striding.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if values.ndim == 1:
+        values = values[:, None]
+    n, n_series = values.shape
+    if n <= points:
+        return np.arange(n)
+
+    # Two samples per series and bucket, plus both ends
+    buckets = (points - 2) // (2 * n_series)
+    if buckets < 1:
+        # Too few points for a bucket per series: evenly strided samples instead
+        return np.unique(np.linspace(0, n - 1, points).astype(int))
+    edges = np.linspace(1, n - 1, buckets + 1).astype(int)
+    keep = [0, n - 1]
+    for lo, hi in zip(edges[:-1], edges[1:]):
+        if hi > lo:
+            segment = values[lo:hi]
+            keep.extend(lo + np.nanargmin(segment, axis=0))
+            keep.extend(lo + np.nanargmax(segment, axis=0))
+    return np.unique(keep)
+
+
+def _window(dates, start=None, end=None):
+    """
+    Slice of the sorted int64 (ns) `dates` between `start` and `end` (inclusive).
+    """
+    lo = 0 if start is None else np.searchsorted(dates, to_ns(start), side='left')
+    hi = len(dates) if end is None else np.searchsorted(dates, to_ns(end), side='right')
+    return slice(lo, hi)
+
+
+def render_series(dates, series, points, **fields):
+    """
+    JSON payload of the named series on the shared int64 (ns) `dates`,
+    downsampled to at most `points` dates. Values are rebased to start at 1.
+    """
+    names = list(series)
+    values = np.column_stack([series[name] for name in names]) if names else np.empty((len(dates), 0))
+    if len(values):
+        values = values / values[0]
+    keep = downsample(values, points) if names else np.arange(len(dates))
+    return orjson.dumps({
+        **fields,
+        'points': len(keep),
+        'dates': np.datetime_as_string(dates[keep].view('datetime64[ns]'), unit='D').tolist(),
+        'series': {name: values[keep, i].tolist() for i, name in enumerate(names)},
+    })
+
+
+class EquityCurves:
+    """
+    Daily equity curves of the backtest strategies and the equal-weight
+    buy & hold benchmark over the test period, kept in memory so that each
+    request only slices and downsamples them.
+    """
+
+    def __init__(self, dates, curves):
+        self.dates = np.asarray(dates, dtype='datetime64[ns]').view(np.int64)
+        self.curves = curves
+
+    @classmethod
+    def from_dataset(cls, data_path, model_path, strategies=EQUITY_STRATEGIES):
+        data = load_backtest_data(data_path, model_path)
+        results = [run_backtest(data, weights=name, cost_bps=cost_bps) for name, cost_bps in strategies.items()]
+        curves = {result.name: result.equity_curve().to_numpy() for result in results}
+        curves[BENCHMARK_NAME] = results[0].benchmark_curve().to_numpy()
+        return cls(results[0].dates, curves)
+
+    def payload(self, version, points=DEFAULT_POINTS, start=None, end=None):
+        window = _window(self.dates, start, end)
+        return render_series(self.dates[window], {name: curve[window] for name, curve in self.curves.items()},
+                             points, version=version)
+
+
+def ticker_payload(index, ticker, version, points=DEFAULT_POINTS, start=None, end=None):
+    """
+    Buy & hold equity curve of one ticker (its close, rebased to 1) from the
+    FeatureIndex history, or None if the ticker is unknown.
+    """
+    if ticker not in index.slices:
+        return None
+    lo, hi = index.slices[ticker]
+    dates = index.dates[lo:hi]
+    window = _window(dates, start, end)
+    return render_series(dates[window], {ticker: index.close[lo:hi][window]}, points, version=version)
@@ -0,0 +1,265 @@
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+from src.inference.predictor import Predictor
+from src.portfolio.optimizer import optimized_weights
+from src.portfolio.risk import risk_report
+from src.storage.parquet_store import read_dataset
+
+# --- Backtest Configuration ---
+TEST_START = '2025-01-01'
+TRADING_DAYS = 252
+
+
+@dataclass
+class BacktestData:
+    """
+    Aligned (dates x tickers) matrices the engine runs on. `returns[t]` is
+    the close-to-close return into day t and `proba[t]` the model's
+    probability of an UP move, known at the close of day t. Missing
+    rows are NaN.
+    """
+    dates: pd.DatetimeIndex
+    tickers: list
+    close: np.ndarray
+    returns: np.ndarray
+    proba: np.ndarray
+
+
+@dataclass
+class BacktestResult:
+    """
+    Daily portfolio returns (net of costs), the weights that produced them,
+    their turnover and the equal-weight buy & hold benchmark. `risk` holds
+    the daily streaming risk metrics when the backtest was run with `risk=True`.
+    """
+    name: str
+    dates: pd.DatetimeIndex
+    tickers: list
+    weights: np.ndarray
+    gross_returns: np.ndarray
+    costs: np.ndarray
+    turnover: np.ndarray
+    benchmark_returns: np.ndarray
+    params: dict = field(default_factory=dict)
+    risk: pd.DataFrame = None
+
+    @property
+    def returns(self):
+        return self.gross_returns - self.costs
+
+    def equity_curve(self):
+        return pd.Series(np.cumprod(1 + self.returns), index=self.dates, name=self.name)
+
+    def benchmark_curve(self):
+        return pd.Series(np.cumprod(1 + self.benchmark_returns), index=self.dates, name='Buy and Hold')
+
+    def metrics(self):
+        return performance_metrics(self.returns, self.turnover, self.benchmark_returns)
+
+
+def performance_metrics(returns, turnover=None, benchmark_returns=None):
+    """
+    Total return, annualised Sharpe ratio, max drawdown and average daily
+    turnover of a daily return series.
+    """
+    equity = np.cumprod(1 + returns)
+    std = returns.std(ddof=1) if len(returns) > 1 else np.nan
+    metrics = {
+        'total_return': equity[-1] - 1 if len(equity) else 0.0,
+        'sharpe': returns.mean() / std * np.sqrt(TRADING_DAYS) if std and np.isfinite(std) else np.nan,
+        'max_drawdown': (1 - equity / np.maximum.accumulate(equity)).max() if len(equity) else 0.0,
+    }
+    if turnover is not None:
+        metrics['avg_turnover'] = turnover.mean() if len(turnover) else 0.0
+    if benchmark_returns is not None:
+        metrics['benchmark_total_return'] = np.prod(1 + benchmark_returns) - 1
+    return {key: float(value) for key, value in metrics.items()}
+
+
+def pivot_frame(df, proba):
+    """
+    Pivots the long (Ticker, Date) test frame and the per-row UP
+    probabilities into aligned (dates x tickers) matrices, once.
+    """
+    dates = pd.DatetimeIndex(np.unique(df['Date'].to_numpy()))
+    tickers = sorted(df['Ticker'].astype(str).unique())
+    rows = dates.get_indexer(df['Date'])
+    cols = pd.Index(tickers).get_indexer(df['Ticker'].astype(str))
+
+    def scatter(values):
+        matrix = np.full((len(dates), len(tickers)), np.nan)
+        matrix[rows, cols] = values
+        return matrix
+
+    close = scatter(df['Close'].to_numpy(dtype=np.float64))
+    return BacktestData(dates=dates, tickers=tickers, close=close, returns=pct_change(close),
+                        proba=scatter(np.asarray(proba, dtype=np.float64)))
+
+
+def pct_change(close):
+    """
+    Per-ticker close-to-close returns. Like pandas' groupby pct_change, a
+    ticker's missing days are skipped, so the return spans the gap.
+    """
+    return close / _previous(close) - 1
+
+
+def load_backtest_data(labeled_data_path, model_path, start=TEST_START, end=None):
+    """
+    Reads the test period, scores it with the model once and pivots it.
+    """
+    predictor = Predictor.from_path(model_path)
+    # Only the test period and the model's columns are read
+    test_df = read_dataset(labeled_data_path, columns=list(dict.fromkeys(['Close'] + predictor.features)),
+                           start=start, end=end)
+    print("Generating prediction probabilities for the test period...")
+    # Probability of the "UP" class
+    _, proba, _ = predictor.predict(test_df)
+    return pivot_frame(test_df, proba)
+
+
+def load_predictions_data(predictions_path, start=None, end=None):
+    """
+    Pivots stored out-of-sample predictions (e.g. the walk-forward output,
+    with a 'proba' column) instead of scoring the served model.
+    """
+    predictions = read_dataset(predictions_path, columns=['Close', 'proba'], start=start, end=end)
+    return pivot_frame(predictions, predictions['proba'])
+
+
+# --- Weight Functions ---
+# A weight function maps the data to the (dates x tickers) weights held
+# over each day. Row t may only use what was known at the close of day t-1.
+WEIGHT_FUNCTIONS = {}
+
+
+def register_weights(name):
+    def decorator(func):
+        WEIGHT_FUNCTIONS[name] = func
+        return func
+    return decorator
+
+
+def _previous(matrix):
+    # Last value known before each day, per ticker (skipping the ticker's missing days)
+    return pd.DataFrame(matrix).ffill().shift(1).to_numpy()
+
+
+@register_weights('signal_equal')
+def signal_equal_weights(data, threshold=0.5):
+    """
+    Splits the book equally over the tickers trading on the day and holds
+    those the model predicted UP the day before (probability > threshold).
+    """
+    prev_proba = _previous(data.proba)
+    active = ~np.isnan(prev_proba) & ~np.isnan(data.returns)
+    n_active = active.sum(axis=1, keepdims=True)
+    signal = np.where(active, prev_proba > threshold, False)
+    return np.divide(signal, n_active, out=np.zeros(signal.shape), where=n_active > 0)
+
+
+@register_weights('confidence')
+def confidence_weights(data, threshold=0.0):
+    """
+    Weights every ticker by the previous day's UP probability, normalised
+    so the weights sum to 1. Probabilities at or below `threshold` get no weight.
+    """
+    prev_proba = _previous(data.proba)
+    scores = np.where(np.isnan(prev_proba) | (prev_proba <= threshold), 0.0, prev_proba)
+    total = scores.sum(axis=1, keepdims=True)
+    return np.divide(scores, total, out=np.zeros(scores.shape), where=total > 0)
+
+
+@register_weights('mean_variance')
+def mean_variance_weights(data, **params):
+    """
+    Solves a constrained mean-variance problem every day, with expected
+    returns derived from the previous day's probabilities (see src.portfolio).
+    """
+    return optimized_weights(data.returns, data.proba, method='mean_variance', **params)
+
+
+@register_weights('hrp')
+def hrp_weights(data, **params):
+    """
+    Hierarchical risk parity over the tickers predicted UP the day before.
+    """
+    return optimized_weights(data.returns, data.proba, method='hrp', **params)
+
+
+def run_backtest(data, weights='signal_equal', cost_bps=0.0, risk=False, **params):
+    """
+    Runs one backtest. `weights` is the name of a registered weight function
+    (or the function itself) and `params` are passed to it. Costs are
+    `cost_bps` on the absolute weight traded each day. The first day has no
+    previous signal and is skipped. With `risk=True` the daily returns are
+    also fed through the streaming risk engine (see src.portfolio.risk).
+    """
+    weight_fn = WEIGHT_FUNCTIONS[weights] if isinstance(weights, str) else weights
+    w = weight_fn(data, **params)
+    returns = np.nan_to_num(data.returns)
+
+    turnover = np.abs(np.diff(w, axis=0, prepend=np.zeros((1, w.shape[1])))).sum(axis=1)
+    gross = (w * returns).sum(axis=1)
+    costs = turnover * cost_bps / 10000
+
+    # Equal-weight buy & hold over the tickers trading on the day
+    counts = (~np.isnan(data.returns)).sum(axis=1)
+    benchmark = np.divide(returns.sum(axis=1), counts, out=np.zeros(len(counts)), where=counts > 0)
+
+    days = slice(1, None)
+    result = BacktestResult(name=weights if isinstance(weights, str) else weight_fn.__name__, dates=data.dates[days],
+                            tickers=data.tickers, weights=w[days], gross_returns=gross[days],
+                            costs=costs[days], turnover=turnover[days],
+                            benchmark_returns=benchmark[days],
+                            params={'cost_bps': cost_bps, **params})
+    if risk:
+        result.risk = risk_report(data.returns[days], result.weights, result.returns, result.dates)
+    return result
+
+
+def print_metrics(result, title):
+    metrics = result.metrics()
+    print(f"\n--- {title} ---")
+    print(f"Total Strategy Return: {metrics['total_return'] * 100:.2f}%")
+    print(f"Total Buy & Hold Return: {metrics['benchmark_total_return'] * 100:.2f}%")
+    print(f"Strategy Sharpe Ratio: {metrics['sharpe']:.2f}")
+    print(f"Max Drawdown: {metrics['max_drawdown'] * 100:.2f}%")
+    print(f"Average Daily Turnover: {metrics['avg_turnover']:.3f}")
+    if result.risk is not None and len(result.risk):
+        latest = result.risk.iloc[-1]
+        print(f"Rolling Sharpe Ratio ({result.risk.index[-1].date()}): {latest['rolling_sharpe']:.2f}")
+        print(f"Rolling Volatility: {latest['rolling_volatility'] * 100:.2f}%")
+        print(f"Daily VaR (historical / parametric): {latest['historical_var'] * 100:.2f}% / "
+              f"{latest['parametric_var'] * 100:.2f}%")
+
+
+def plot_result(result, plot_save_path, label, title, show=False):
+    """
+    Plots the strategy against buy & hold and saves the figure. Headless
+    unless `show=True`.
+    """
+    print("\nGenerating performance plot...")
+    if show:
+        import matplotlib.pyplot as plt
+        fig = plt.figure(figsize=(15, 7))
+    else:
+        # A bare Figure keeps out of pyplot's global state, so several
+        # backtests can plot at once (e.g. concurrent pipeline stages)
+        from matplotlib.figure import Figure
+        fig = Figure(figsize=(15, 7))
+    ax = fig.add_subplot()
+    (result.equity_curve() * 100).plot(ax=ax, label=label, legend=True)
+    (result.benchmark_curve() * 100).plot(ax=ax, label='Buy and Hold Benchmark', legend=True)
+    ax.set_title(title)
+    ax.set_xlabel('Date')
+    ax.set_ylabel('Portfolio Value (Started at 100)')
+    ax.grid(True)
+    fig.savefig(plot_save_path)
+    print(f"Plot saved to {plot_save_path}")
+    if show:
+        plt.show()
+        plt.close(fig)
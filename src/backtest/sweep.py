@@ -0,0 +1,194 @@
+import argparse
+import hashlib
+import itertools
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src.backtest.engine import TEST_START, BacktestData, load_backtest_data, run_backtest
+
+# --- File Paths ---
+BASE_DIR = Path(__file__).parent.parent.parent
+LABELED_DATA_PATH = BASE_DIR / "data/processed/labeled_features"
+MODEL_PATH = BASE_DIR / "models/xgb_model.joblib"
+SWEEP_DIR = BASE_DIR / "data/processed/sweeps"
+
+# --- Sweep Configuration ---
+# Every key is swept over its list of values. 'weights', 'cost_bps', 'start'
+# and 'end' configure the backtest; any other key is passed to the weight function.
+DEFAULT_GRID = {
+    'weights': ['signal_equal', 'confidence'],
+    'cost_bps': [0, 5, 10, 20],
+    'threshold': [0.0, 0.4, 0.5, 0.55, 0.6],
+    'start': [TEST_START],
+}
+BACKTEST_KEYS = {'weights', 'cost_bps', 'start', 'end'}
+# Configs sent to a worker per task, to amortise the inter-process round trip
+BATCH_SIZE = 50
+
+# Matrices of the scored history, attached once per worker process
+_SHARED = {}
+
+
+def expand_grid(grid):
+    """
+    Expands a parameter grid (dict of lists) into one config dict per combination.
+    """
+    keys = sorted(grid)
+    return [dict(zip(keys, values)) for values in itertools.product(*(grid[key] for key in keys))]
+
+
+def config_id(config):
+    """
+    Stable id of a config, used to skip configs that were already evaluated.
+    """
+    return hashlib.sha1(json.dumps(config, sort_keys=True, default=str).encode('utf-8')).hexdigest()[:16]
+
+
+def slice_dates(data, start=None, end=None):
+    """
+    Restricts the data to start <= Date <= end without copying the matrices.
+    """
+    lo = 0 if start is None else data.dates.searchsorted(pd.Timestamp(start), side='left')
+    hi = len(data.dates) if end is None else data.dates.searchsorted(pd.Timestamp(end), side='right')
+    return BacktestData(dates=data.dates[lo:hi], tickers=data.tickers, close=data.close[lo:hi],
+                        returns=data.returns[lo:hi], proba=data.proba[lo:hi])
+
+
+def evaluate(data, config):
+    """
+    Runs the backtest of one config and returns its row of the results table.
+    """
+    params = {key: value for key, value in config.items() if key not in BACKTEST_KEYS}
+    window = slice_dates(data, config.get('start'), config.get('end'))
+    result = run_backtest(window, weights=config['weights'], cost_bps=config.get('cost_bps', 0), **params)
+    return {'config_id': config_id(config), **config, **result.metrics()}
+
+
+# --- Shared Memory ---
+def _share_arrays(arrays):
+    blocks = {}
+    specs = {}
+    for name, array in arrays.items():
+        block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[:] = array
+        blocks[name] = block
+        specs[name] = (block.name, array.shape, array.dtype.str)
+    return blocks, specs
+
+
+def _init_worker(specs, dates, tickers):
+    # Views onto the parent's shared blocks: nothing is copied into the worker
+    arrays = {}
+    for name, (block_name, shape, dtype) in specs.items():
+        block = shared_memory.SharedMemory(name=block_name)
+        _SHARED.setdefault('blocks', []).append(block)
+        arrays[name] = np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+    _SHARED['data'] = BacktestData(dates=dates, tickers=tickers, **arrays)
+
+
+def _evaluate_batch(configs):
+    return [evaluate(_SHARED['data'], config) for config in configs]
+
+
+# --- Checkpointing ---
+def load_checkpoint(checkpoint_path):
+    """
+    Loads the result rows written by previous (possibly interrupted) runs.
+    """
+    if not checkpoint_path.exists():
+        return []
+    with open(checkpoint_path, 'r') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def append_checkpoint(checkpoint_path, rows):
+    with open(checkpoint_path, 'a') as f:
+        for row in rows:
+            f.write(json.dumps(row, default=str) + '\n')
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def run_sweep(grid, labeled_data_path, model_path, sweep_dir=SWEEP_DIR, name='sweep', workers=None,
+              batch_size=BATCH_SIZE, fresh=False):
+    """
+    Evaluates every config of the grid and returns the results table sorted
+    by Sharpe ratio.
+
+    The model scores the full history once. Its matrices are placed in
+    shared memory and the configs are evaluated in batches on a process
+    pool. Every finished batch is appended to `{name}.checkpoint.jsonl`, so
+    an interrupted sweep resumes where it stopped (unless `fresh=True`).
+    The final table is saved to `{name}.csv`.
+    """
+    sweep_dir.mkdir(parents=True, exist_ok=True)
+    checkpoint_path = sweep_dir / f"{name}.checkpoint.jsonl"
+    results_path = sweep_dir / f"{name}.csv"
+    if fresh and checkpoint_path.exists():
+        checkpoint_path.unlink()
+
+    configs = expand_grid(grid)
+    rows = load_checkpoint(checkpoint_path)
+    done = {row['config_id'] for row in rows}
+    todo = [config for config in configs if config_id(config) not in done]
+    print(f"Sweep '{name}': {len(configs)} configs, {len(configs) - len(todo)} already in the checkpoint.")
+
+    if todo:
+        print("Loading model and scoring the full history once...")
+        data = load_backtest_data(labeled_data_path, model_path, start=None)
+        batches = [todo[i:i + batch_size] for i in range(0, len(todo), batch_size)]
+
+        if workers == 1:
+            for batch in batches:
+                new_rows = [evaluate(data, config) for config in batch]
+                append_checkpoint(checkpoint_path, new_rows)
+                rows.extend(new_rows)
+        else:
+            blocks, specs = _share_arrays({'close': data.close, 'returns': data.returns, 'proba': data.proba})
+            try:
+                with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                         initargs=(specs, data.dates, data.tickers)) as pool:
+                    futures = [pool.submit(_evaluate_batch, batch) for batch in batches]
+                    for i, future in enumerate(as_completed(futures), start=1):
+                        new_rows = future.result()
+                        append_checkpoint(checkpoint_path, new_rows)
+                        rows.extend(new_rows)
+                        if i % 20 == 0 or i == len(futures):
+                            print(f"{i}/{len(futures)} batches done.")
+            finally:
+                for block in blocks.values():
+                    block.close()
+                    block.unlink()
+
+    # Only report the configs of this grid, even if the checkpoint holds more
+    wanted = {config_id(config) for config in configs}
+    results = pd.DataFrame([row for row in rows if row['config_id'] in wanted])
+    results = results.drop_duplicates('config_id').sort_values('sharpe', ascending=False).reset_index(drop=True)
+    results.to_csv(results_path, index=False)
+    print(f"Sweep results saved to {results_path}.")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Evaluate a grid of backtest configurations.")
+    parser.add_argument('--grid', type=Path, default=None, help="JSON file with the parameter grid")
+    parser.add_argument('--name', default='sweep', help="name of the checkpoint and results files")
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--fresh', action='store_true', help="ignore the checkpoint of a previous run")
+    args = parser.parse_args()
+
+    grid = DEFAULT_GRID
+    if args.grid:
+        with open(args.grid, 'r') as f:
+            grid = json.load(f)
+
+    results = run_sweep(grid, LABELED_DATA_PATH, MODEL_PATH, name=args.name, workers=args.workers,
+                        fresh=args.fresh)
+    print("--- Top configurations by Sharpe ratio: ---")
+    print(results.head(10).to_string(index=False))
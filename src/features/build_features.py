@@ -1,57 +1,136 @@
+import argparse
 import pandas as pd
-import pandas_ta as ta
+from functools import partial
 from pathlib import Path
 
+from src.features.indicator_engine import compute_indicators_sharded, long_to_panel, panel_to_frame
+from src.features.incremental_features import (STATE_PATH, is_initialised, save_state, unpack_state,
+                                               update_features, verify_against_full_rebuild)
+from src.ingestion.price_ingest import PRICE_FIELDS, SAVE_PATH as PRICE_STORE_PATH, load_prices
+from src.pipeline.profiling import profiled, record_rows
+from src.storage.parquet_store import write_dataset
+
 # --- File Paths ---
-RAW_DATA_PATH = Path(__file__).parent.parent.parent / "data/raw/full_stock_data.csv"
-FEATURES_PATH = Path(__file__).parent.parent.parent / "data/processed/technical_features.csv"
+RAW_DATA_PATH = PRICE_STORE_PATH
+FEATURES_PATH = Path(__file__).parent.parent.parent / "data/processed/technical_features"
+
+
+def load_raw_prices(raw_data_path, start=None):
+    """
+    Loads long-format (Date, Ticker, OHLCV) rows from the price store,
+    optionally only the rows from `start` on.
+    """
+    return load_prices(raw_data_path, start=start)[['Date', 'Ticker'] + PRICE_FIELDS]
+
+
+def compute_features(prices, workers=None):
+    """
+    Generates technical analysis features for every stock over its full history
+    in one pass over the (dates x tickers) panel. Returns a long frame with one
+    row per (Date, Ticker) and the indicator state after the last row.
+    """
+    dates, tickers, panel = long_to_panel(prices, PRICE_FIELDS)
+    outputs, state = compute_indicators_sharded(panel, workers=workers)
+    features_df = panel_to_frame(dates, tickers, panel, outputs)
+    return features_df, unpack_state(tickers, state, dates.max())
 
-def generate_features(raw_data_path, features_path):
+
+def compute_features_pandas_ta(prices):
     """
-    Loads the raw OHLCV data and generates technical analysis features for each stock.
-    Saves the combined features into a single CSV file.
+    Reference implementation: generates the same features one ticker at a
+    time with pandas_ta. Only used to check the panel engine.
     """
-    print("Loading raw data...")
-    # We need to read the header from the first two rows to handle the multi-level columns
-    df = pd.read_csv(raw_data_path, header=[0, 1], index_col=0, parse_dates=True)
-    
-    print("Generating technical features...")
+    import pandas_ta as ta  # noqa: F401 (registers the .ta accessor)
+
+    # Every ticker sees the dates of the whole universe, like the panel does
+    dates = pd.DatetimeIndex(sorted(prices['Date'].unique()))
     all_features = []
-    
-    # Loop through each ticker in the columns
-    tickers = df.columns.levels[0]
-    for ticker in tickers:
-        # Select the data for the current ticker
-        stock_df = df[ticker].copy()
-        
-        # --- Calculate Technical Indicators using pandas_ta ---
-        # Relative Strength Index (RSI)
+    for ticker, rows in prices.groupby(prices['Ticker'].astype(str)):
+        stock_df = rows.set_index('Date')[PRICE_FIELDS].reindex(dates)
         stock_df.ta.rsi(length=14, append=True)
-        
-        # Moving Average Convergence Divergence (MACD)
         stock_df.ta.macd(fast=12, slow=26, signal=9, append=True)
-        
-        # Bollinger Bands
         stock_df.ta.bbands(length=20, std=2, append=True)
-        
-        # Add the ticker name as a column for easier identification
         stock_df['Ticker'] = ticker
-        
         all_features.append(stock_df)
-        
-    # Combine the features for all stocks into a single DataFrame
-    features_df = pd.concat(all_features)
-    
-    # Clean up any resulting NaN values
-    features_df.dropna(inplace=True)
-    
-    # Save the features to the processed data folder
-    features_path.parent.mkdir(parents=True, exist_ok=True)
-    features_df.to_csv(features_path)
-    
+
+    features_df = pd.concat(all_features).dropna()
+    features_df['Volume'] = features_df['Volume'].astype('int64')
+    features_df.index.name = 'Date'
+    features_df.columns.name = None
+    return features_df.reset_index()
+
+
+def check_against_pandas_ta(features_df, prices, rtol=1e-6, atol=1e-8):
+    """
+    Checks that the panel engine matches pandas_ta within tolerance.
+    """
+    expected = compute_features_pandas_ta(prices)
+    actual = features_df.copy()
+    for frame in (actual, expected):
+        frame['Ticker'] = frame['Ticker'].astype(str)
+    actual = actual.sort_values(['Ticker', 'Date']).reset_index(drop=True)
+    expected = expected.sort_values(['Ticker', 'Date']).reset_index(drop=True)[actual.columns]
+
+    pd.testing.assert_frame_equal(actual, expected, check_exact=False, rtol=rtol, atol=atol)
+    print(f"Checked: panel engine matches pandas_ta (rtol={rtol}, {len(actual)} rows).")
+
+
+@profiled()
+def generate_features(raw_data_path, features_path, incremental=False, verify=False,
+                      state_path=STATE_PATH, workers=None, check_pandas_ta=False):
+    """
+    Loads the raw OHLCV data from the price store and generates technical analysis features for each stock.
+    Saves the combined features as a Parquet dataset partitioned by ticker.
+
+    With `incremental=True` only the bars after each ticker's watermark are
+    computed and appended, continuing the indicators from their saved state.
+    With `verify=True` the resulting dataset is checked against a full rebuild.
+    `workers` shards large universes across a process pool.
+    """
+    prices = None
+    if incremental and is_initialised(features_path, state_path):
+        print("Updating technical features incrementally...")
+        # Only the rows after the oldest watermark are read from the price store
+        features_df = update_features(partial(load_raw_prices, raw_data_path), features_path, state_path)
+    else:
+        if incremental:
+            print("No saved feature state found. Running a full build first.")
+        print("Loading raw data...")
+        prices = load_raw_prices(raw_data_path)
+        print("Generating technical features...")
+        features_df, state = compute_features(prices, workers=workers)
+
+        # Save the features to the processed data folder
+        write_dataset(features_df, features_path)
+        save_state(state, state_path)
+
+        if check_pandas_ta:
+            check_against_pandas_ta(features_df, prices)
+
+    if verify:
+        print("Verifying against a full rebuild...")
+        if prices is None:
+            prices = load_raw_prices(raw_data_path)
+        verify_against_full_rebuild(compute_features(prices, workers=workers)[0], features_path)
+
+    record_rows(len(features_df))
     print(f"Features saved successfully to {features_path}!")
-    print("--- Sample of generated features for one stock: ---")
+    print("--- Sample of generated features: ---")
     print(features_df.head())
 
+
 if __name__ == "__main__":
-    generate_features(raw_data_path=RAW_DATA_PATH, features_path=FEATURES_PATH)
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Build technical features from raw OHLCV data.")
+    parser.add_argument('--incremental', action='store_true',
+                        help="only compute bars after each ticker's watermark")
+    parser.add_argument('--verify', action='store_true',
+                        help="check the stored features against a full rebuild")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="shard tickers across this many processes")
+    parser.add_argument('--check-pandas-ta', action='store_true',
+                        help="compare a full build against the per-ticker pandas_ta implementation")
+    args = parser.parse_args()
+
+    generate_features(raw_data_path=RAW_DATA_PATH, features_path=FEATURES_PATH,
+                      incremental=args.incremental, verify=args.verify,
+                      workers=args.workers, check_pandas_ta=args.check_pandas_ta)
@@ -1,73 +1,100 @@
+import argparse
 import pandas as pd
-import json
 from pathlib import Path
-from transformers import pipeline
-import time
+
+from src.features.sentiment_cache import CACHE_PATH, SentimentCache
+from src.features.sentiment_engine import BATCH_SIZE, MAX_LENGTH, SentimentEngine, compare_with_fp32
+from src.ingestion.news_store import NEWS_STORE_DIR, load_articles
+from src.pipeline.profiling import profiled, record_fields, record_rows
+from src.storage.parquet_store import write_dataset
 
 # --- File Paths ---
-NEWS_DATA_DIR = Path(__file__).parent.parent.parent / "data/raw/news"
-FEATURES_PATH = Path(__file__).parent.parent.parent / "data/processed/sentiment_features.csv"
+NEWS_DATA_DIR = NEWS_STORE_DIR
+FEATURES_PATH = Path(__file__).parent.parent.parent / "data/processed/sentiment_features"
 
 # Define the tickers we're processing
 TICKERS = ['RELIANCE.NS', 'TCS.NS', 'HDFCBANK.NS', 'INFY.NS', 'ICICIBANK.NS']
 
-def generate_sentiment_scores(news_dir, tickers, features_path):
+# --- Model ---
+MODEL_ID = "ProsusAI/finbert"
+# Part of the cache key: pin this to a commit hash to make cached scores reproducible
+MODEL_REVISION = "main"
+
+@profiled()
+def generate_sentiment_scores(news_dir, tickers, features_path, cache_path=CACHE_PATH,
+                              batch_size=BATCH_SIZE, max_length=MAX_LENGTH, num_threads=None,
+                              quantize=False, compare_int8=False):
     """
-    Loads raw news data from JSON files, runs sentiment analysis on headlines,
-    aggregates a daily sentiment score, and saves the result to a CSV file.
+    Loads raw news articles from the news store, runs sentiment analysis on headlines,
+    aggregates a daily sentiment score, and saves the result as a Parquet dataset.
+
+    Headline scores are cached on disk, so only headlines that were never
+    scored by this model revision go through FinBERT. The remaining headlines
+    of all tickers are pooled and scored in length-bucketed batches
+    (optionally with an int8 dynamically quantized model).
     """
-    print("Loading FinBERT sentiment analysis model...")
-    # This will download the model from Hugging Face the first time it's run
-    sentiment_pipeline = pipeline("sentiment-analysis", model="ProsusAI/finbert")
-    
-    all_sentiments = []
+    # int8 scores differ slightly from fp32 ones, so they are cached separately
+    cache_model_id = f"{MODEL_ID}:int8" if quantize else MODEL_ID
+    cache = SentimentCache(cache_path, cache_model_id, MODEL_REVISION)
 
+    # --- Collect headlines for every ticker ---
+    ticker_articles = {}
     for ticker in tickers:
-        news_file = news_dir / f"{ticker}_news.json"
-        if not news_file.exists():
-            print(f"News file for {ticker} not found. Skipping.")
-            continue
-            
-        print(f"Processing sentiment for {ticker}...")
-        with open(news_file, 'r') as f:
-            news_data = json.load(f)
-        
-        articles = news_data.get('articles', [])
+        articles = [article for article in load_articles(news_dir, ticker) if article.get('title')]
         if not articles:
             print(f"No articles found for {ticker}. Skipping.")
             continue
-        
-        # Prepare data for the pipeline
-        headlines = [article['title'] for article in articles if article['title']]
-        publish_dates = [article['publishedAt'] for article in articles if article['title']]
-        
-        # Run sentiment analysis in batches for efficiency
-        sentiment_results = sentiment_pipeline(headlines)
-        
-        # Process results
-        # Convert labels to numerical values: positive=1, neutral=0, negative=-1
-        score_map = {'positive': 1, 'neutral': 0, 'negative': -1}
-        
+        ticker_articles[ticker] = articles
+
+    # --- Score only the headlines the cache hasn't seen ---
+    headlines = list(dict.fromkeys(article['title'] for articles in ticker_articles.values()
+                                   for article in articles))
+    scores = cache.get_many(headlines)
+    missing = [headline for headline in headlines if headline not in scores]
+    print(f"Sentiment cache: {len(headlines) - len(missing)} hits, {len(missing)} misses.")
+    record_rows(len(headlines))
+    record_fields(cache_hits=len(headlines) - len(missing), cache_misses=len(missing))
+
+    if missing:
+        print("Loading FinBERT sentiment analysis model...")
+        # This will download the model from Hugging Face the first time it's run
+        engine = SentimentEngine(MODEL_ID, MODEL_REVISION, batch_size=batch_size, max_length=max_length,
+                                 num_threads=num_threads, quantize=quantize)
+
+        new_scores = dict(zip(missing, engine.score(missing)))
+        print(f"Scored {len(missing)} new headlines at {engine.last_throughput:.1f} headlines/sec.")
+        cache.put_many(new_scores)
+        scores.update(new_scores)
+
+    if compare_int8 and headlines:
+        compare_with_fp32(headlines, MODEL_ID, MODEL_REVISION, batch_size=batch_size,
+                          max_length=max_length, num_threads=num_threads)
+
+    evicted = cache.evict()
+    print(f"Cache stats: {cache.stats()} ({evicted} entries evicted)")
+    cache.close()
+
+    # Convert labels to numerical values: positive=1, neutral=0, negative=-1
+    score_map = {'positive': 1, 'neutral': 0, 'negative': -1}
+
+    all_sentiments = []
+    for ticker, articles in ticker_articles.items():
         processed_articles = []
-        for i, result in enumerate(sentiment_results):
-            numeric_sentiment = score_map[result['label']] * result['score']
+        for article in articles:
+            result = scores[article['title']]
             processed_articles.append({
-                'publishedAt': publish_dates[i],
-                'sentiment_score': numeric_sentiment
+                'publishedAt': article['publishedAt'],
+                'sentiment_score': score_map[result['label']] * result['score']
             })
-        
-        if not processed_articles:
-            print(f"No valid articles to process for {ticker}. Skipping.")
-            continue
 
         # Create a DataFrame and aggregate scores by day
         sentiment_df = pd.DataFrame(processed_articles)
         sentiment_df['Date'] = pd.to_datetime(sentiment_df['publishedAt']).dt.date
         daily_sentiment = sentiment_df.groupby('Date')['sentiment_score'].mean().reset_index()
         daily_sentiment['Ticker'] = ticker
-        
+
         all_sentiments.append(daily_sentiment)
-        print(f"Finished processing {len(headlines)} headlines for {ticker}.")
+        print(f"Finished processing {len(articles)} headlines for {ticker}.")
 
     if not all_sentiments:
         print("No sentiment data was generated. Exiting.")
@@ -76,14 +103,25 @@ def generate_sentiment_scores(news_dir, tickers, features_path):
     # Combine all tickers into a single DataFrame and save
     final_df = pd.concat(all_sentiments)
     final_df['Date'] = pd.to_datetime(final_df['Date']) # Ensure Date is datetime object
-    
-    features_path.parent.mkdir(parents=True, exist_ok=True)
-    final_df.to_csv(features_path, index=False)
-    
+
+    write_dataset(final_df, features_path)
+
     print(f"\nSentiment features saved successfully to {features_path}!")
     print("--- Sample of generated sentiment features: ---")
     print(final_df.head())
 
 
 if __name__ == "__main__":
-    generate_sentiment_scores(news_dir=NEWS_DATA_DIR, tickers=TICKERS, features_path=FEATURES_PATH)
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Score news headlines and build daily sentiment features.")
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    parser.add_argument('--max-length', type=int, default=MAX_LENGTH, help="truncate headlines to this many tokens")
+    parser.add_argument('--threads', type=int, default=None, help="torch intra-op threads")
+    parser.add_argument('--int8', action='store_true', help="use a dynamically quantized int8 model")
+    parser.add_argument('--compare-int8', action='store_true',
+                        help="report int8 vs fp32 throughput and agreement on this run's headlines")
+    args = parser.parse_args()
+
+    generate_sentiment_scores(news_dir=NEWS_DATA_DIR, tickers=TICKERS, features_path=FEATURES_PATH,
+                              batch_size=args.batch_size, max_length=args.max_length,
+                              num_threads=args.threads, quantize=args.int8,
+                              compare_int8=args.compare_int8)
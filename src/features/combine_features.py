@@ -1,43 +1,103 @@
+import argparse
 import pandas as pd
 from pathlib import Path
 
+from src.features.create_labels import BATCH_ROWS, HORIZON_DAYS, LABEL_HORIZONS, LABELED_DATA_PATH, label_frame
+from src.storage.parquet_store import (append_dataset, dataset_exists, partition_batches, partition_fragments,
+                                       read_partition, reset_dataset)
+from src.pipeline.profiling import profiled, record_rows
+
 # --- File Paths ---
-TECH_FEATURES_PATH = Path(__file__).parent.parent.parent / "data/processed/technical_features.csv"
-SENTIMENT_FEATURES_PATH = Path(__file__).parent.parent.parent / "data/processed/sentiment_features.csv"
-FINAL_FEATURES_PATH = Path(__file__).parent.parent.parent / "data/processed/final_features.csv"
+TECH_FEATURES_PATH = Path(__file__).parent.parent.parent / "data/processed/technical_features"
+SENTIMENT_FEATURES_PATH = Path(__file__).parent.parent.parent / "data/processed/sentiment_features"
+FINAL_FEATURES_PATH = Path(__file__).parent.parent.parent / "data/processed/final_features"
+
+# How many calendar days a sentiment score is carried forward to later
+# trading days. None only matches news from the same day.
+STALENESS_DAYS = None
 
-def combine_features(tech_path, sentiment_path, final_path):
+def join_sentiment(tech_features, sentiment_features, staleness_days=STALENESS_DAYS):
     """
-    Combines technical and sentiment features into a single master feature set.
+    Joins sentiment scores onto technical features with a sorted as-of join
+    per ticker: each trading day takes the latest score of its ticker dated
+    on or before it, if it is at most `staleness_days` old. Returns rows
+    sorted by (Ticker, Date).
     """
-    print("Loading technical and sentiment features...")
-    tech_features = pd.read_csv(tech_path, parse_dates=['Date'])
-    sentiment_features = pd.read_csv(sentiment_path, parse_dates=['Date'])
-    
-    print("Merging feature sets...")
-    # Perform a 'left' merge. This keeps all rows from the technical features DataFrame
-    # and adds sentiment scores where the 'Date' and 'Ticker' match.
-    final_df = pd.merge(tech_features, sentiment_features, on=['Date', 'Ticker'], how='left')
-    
+    # Both sides carry their own Ticker categories, so join on the plain string values
+    tech_features = tech_features.assign(Ticker=tech_features['Ticker'].astype(str))
+    sentiment = sentiment_features[['Date', 'Ticker', 'sentiment_score']]
+    sentiment = sentiment.assign(Ticker=sentiment['Ticker'].astype(str)).sort_values('Date', kind='stable')
+    final_df = pd.merge_asof(tech_features.sort_values('Date', kind='stable'), sentiment, on='Date', by='Ticker',
+                             direction='backward', tolerance=pd.Timedelta(days=staleness_days or 0))
+    final_df = final_df.sort_values(['Ticker', 'Date'], kind='stable').reset_index(drop=True)
+
     # --- Handle Missing Sentiment Data ---
-    # For dates where we have no news, the sentiment_score will be NaN (Not a Number).
+    # For dates without recent enough news, the sentiment_score will be NaN (Not a Number).
     # We will fill these missing values with 0, assuming a neutral sentiment for those days.
-    final_df['sentiment_score'].fillna(0, inplace=True)
-    
-    # Sort data just to be sure
-    final_df.sort_values(by=['Ticker', 'Date'], inplace=True)
-    
-    # Save the final master feature set
-    final_path.parent.mkdir(parents=True, exist_ok=True)
-    final_df.to_csv(final_path, index=False)
-    
-    print(f"Final combined features saved to {final_path}")
-    print("--- Sample of final features: ---")
-    print(final_df.head())
-    print("\n--- A look at a recent date to confirm sentiment scores are present: ---")
-    print(final_df.tail())
+    final_df['sentiment_score'] = final_df['sentiment_score'].fillna(0)
+    return final_df
+
+@profiled()
+def combine_features(tech_path, sentiment_path, final_path, staleness_days=STALENESS_DAYS,
+                     labeled_path=None, horizon=HORIZON_DAYS, horizons=LABEL_HORIZONS, batch_rows=BATCH_ROWS):
+    """
+    Combines technical and sentiment features into a single master feature set.
+
+    Works on batches of whole ticker partitions of about `batch_rows` rows
+    (read, join, write), so memory stays bounded whatever the universe size.
+    With a `labeled_path`, the labels are generated in the same pass
+    instead of reloading the combined features afterwards.
+    """
+    # Both datasets are opened once; each batch then reads only its own files
+    tech_dataset, tech_partitions = partition_fragments(tech_path)
+    has_sentiment = dataset_exists(sentiment_path)
+    if has_sentiment:
+        sentiment_dataset, sentiment_partitions = partition_fragments(sentiment_path)
+    else:
+        print(f"No sentiment features found at {sentiment_path}; using a neutral score.")
+    print(f"Combining technical and sentiment features for {len(tech_partitions)} tickers...")
+
+    reset_dataset(final_path)
+    if labeled_path is not None:
+        reset_dataset(labeled_path)
+
+    rows = labeled_rows = 0
+    for tickers, fragments in partition_batches(tech_partitions, batch_rows):
+        tech_features = read_partition(tech_dataset, fragments)
+        if has_sentiment:
+            sentiment_fragments = [fragment for ticker in tickers for fragment in sentiment_partitions.get(ticker, [])]
+            sentiment_features = read_partition(sentiment_dataset, sentiment_fragments, columns=['sentiment_score'])
+        else:
+            sentiment_features = pd.DataFrame({'Date': pd.Series(dtype='datetime64[ns]'),
+                                               'Ticker': pd.Series(dtype='object'),
+                                               'sentiment_score': pd.Series(dtype='float32')})
+        final_df = join_sentiment(tech_features, sentiment_features, staleness_days)
+        append_dataset(final_df, final_path)
+        rows += len(final_df)
+
+        if labeled_path is not None:
+            labeled_df = label_frame(final_df, horizon, horizons)
+            append_dataset(labeled_df, labeled_path)
+            labeled_rows += len(labeled_df)
+
+    record_rows(rows)
+    print(f"Final combined features ({rows} rows) saved to {final_path}")
+    if labeled_path is not None:
+        print(f"Labeled data ({labeled_rows} rows) saved to {labeled_path}")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Combine technical and sentiment features.")
+    parser.add_argument('--staleness-days', type=int, default=STALENESS_DAYS,
+                        help="carry sentiment forward for up to this many days instead of only same-day news")
+    parser.add_argument('--label', action='store_true',
+                        help="also generate the labeled dataset in the same pass")
+    parser.add_argument('--horizons', type=int, nargs='+', default=LABEL_HORIZONS,
+                        help="label horizons in trading days (with --label)")
+    args = parser.parse_args()
+
     combine_features(tech_path=TECH_FEATURES_PATH,
                      sentiment_path=SENTIMENT_FEATURES_PATH,
-                     final_path=FINAL_FEATURES_PATH)
\ No newline at end of file
+                     final_path=FINAL_FEATURES_PATH,
+                     staleness_days=args.staleness_days,
+                     labeled_path=LABELED_DATA_PATH if args.label else None,
+                     horizons=args.horizons)
@@ -1,46 +1,91 @@
+import argparse
+import numpy as np
 import pandas as pd
 from pathlib import Path
 
+from src.pipeline.profiling import profiled, record_rows
+from src.storage.parquet_store import (append_dataset, partition_batches, partition_fragments, read_partition,
+                                       reset_dataset)
+
 # --- Configuration ---
 HORIZON_DAYS = 5  # We are predicting 5 days into the future
-FEATURES_PATH = Path(__file__).parent.parent.parent / "data/processed/final_features.csv"
-LABELED_DATA_PATH = Path(__file__).parent.parent.parent / "data/processed/labeled_features.csv"
+# Every horizon gets its own forward return and label; HORIZON_DAYS stays the
+# model's target and keeps the plain 'future_return' / 'target' names
+LABEL_HORIZONS = [1, 5, 10, 20]
+FEATURES_PATH = Path(__file__).parent.parent.parent / "data/processed/final_features"
+LABELED_DATA_PATH = Path(__file__).parent.parent.parent / "data/processed/labeled_features"
+# Rows read and labeled per step; whole tickers are batched up to about this size
+BATCH_ROWS = 500_000
 
-def generate_labels(features_path, labeled_path, horizon):
+def label_frame(df, horizon=HORIZON_DAYS, horizons=LABEL_HORIZONS):
     """
-    Creates the target label for our model.
-    The label is 1 if the stock price increases over the horizon, and 0 otherwise.
+    Adds forward returns and UP labels for all horizons to rows sorted by
+    (Ticker, Date), in one vectorized pass over a (rows x horizons) matrix
+    of future prices. A future price is only taken from the same ticker.
+
+    The `horizon` label is stored as 'future_return' / 'target' and rows
+    without it are dropped, as before. The other horizons are stored as
+    'future_return_{h}d' / 'target_{h}d' and are NaN where the horizon runs
+    past the end of the data.
     """
-    print(f"Loading features from {features_path}...")
-    df = pd.read_csv(features_path, parse_dates=['Date'])
-
-    print(f"Generating labels for a {horizon}-day horizon...")
-    
-    # --- The Core Logic ---
-    # We group by each stock, so the shift operation doesn't look at the wrong stock's future price.
-    # .shift(-horizon) pulls the value from 'horizon' rows in the future up to the current row.
-    future_price = df.groupby('Ticker')['Close'].shift(-horizon)
-    
-    # Calculate the future return
-    df['future_return'] = (future_price - df['Close']) / df['Close']
-    
-    # Create the binary target label: 1 for up, 0 for down/same
-    df['target'] = (df['future_return'] > 0).astype(int)
-    
-    # --- Clean up ---
-    # The last 'horizon' rows for each stock will have no future price, so their labels are NaN.
-    # We drop these rows as we cannot use them for training.
-    df.dropna(subset=['future_return'], inplace=True)
-    
-    labeled_path.parent.mkdir(parents=True, exist_ok=True)
-    df.to_csv(labeled_path, index=False)
-    
-    print(f"Labeled data saved successfully to {labeled_path}")
-    print("--- Sample of labeled data (notice the new 'future_return' and 'target' columns): ---")
-    print(df[['Date', 'Ticker', 'Close', 'future_return', 'target']].head())
-    
+    horizons = sorted(set(horizons) | {horizon})
+    close = df['Close'].to_numpy()
+    n_rows = len(close)
+
+    # Index one past the last row of each row's ticker
+    codes = pd.factorize(df['Ticker'])[0]
+    starts = np.flatnonzero(np.diff(codes, prepend=-1))
+    ticker_end = np.repeat(np.append(starts[1:], n_rows), np.diff(np.append(starts, n_rows)))
+
+    # future[i, k] is the Close horizons[k] rows after row i
+    ahead = np.arange(n_rows)[:, None] + np.asarray(horizons)[None, :]
+    known = ahead < ticker_end[:, None]
+    future = np.where(known, close[np.minimum(ahead, max(n_rows - 1, 0))], np.nan)
+    future_return = (future - close[:, None]) / close[:, None]
+
+    df = df.copy()
+    for k, h in enumerate(horizons):
+        if h == horizon:
+            df['future_return'] = future_return[:, k]
+            # Create the binary target label: 1 for up, 0 for down/same
+            df['target'] = (future_return[:, k] > 0).astype(int)
+        else:
+            df[f'future_return_{h}d'] = future_return[:, k]
+            df[f'target_{h}d'] = np.where(known[:, k], future_return[:, k] > 0, np.nan)
+
+    # The last 'horizon' rows have no future price, so we cannot use them for training
+    return df[known[:, horizons.index(horizon)]]
+
+@profiled()
+def generate_labels(features_path, labeled_path, horizon, horizons=LABEL_HORIZONS, batch_rows=BATCH_ROWS):
+    """
+    Creates the target labels for our model.
+    A label is 1 if the stock price increases over its horizon, and 0 otherwise.
+    Whole ticker partitions are read, labeled and written in batches of
+    about `batch_rows` rows, so memory stays bounded whatever the universe size.
+    """
+    dataset, partitions = partition_fragments(features_path)
+    print(f"Generating labels for {len(partitions)} tickers, horizons {sorted(set(horizons) | {horizon})} "
+          f"(model target: {horizon} days)...")
+    reset_dataset(labeled_path)
+
+    rows = 0
+    for _, fragments in partition_batches(partitions, batch_rows):
+        df = label_frame(read_partition(dataset, fragments), horizon, horizons)
+        append_dataset(df, labeled_path)
+        rows += len(df)
+
+    record_rows(rows)
+    print(f"Labeled data ({rows} rows) saved successfully to {labeled_path}")
+
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate forward-return labels for the final features.")
+    parser.add_argument('--horizons', type=int, nargs='+', default=LABEL_HORIZONS,
+                        help="label horizons in trading days")
+    args = parser.parse_args()
+
     generate_labels(features_path=FEATURES_PATH,
                     labeled_path=LABELED_DATA_PATH,
-                    horizon=HORIZON_DAYS)
\ No newline at end of file
+                    horizon=HORIZON_DAYS,
+                    horizons=args.horizons)
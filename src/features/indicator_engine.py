@@ -0,0 +1,141 @@
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+
+from src.features.indicators import INDICATORS
+
+# --- Engine Configuration ---
+DEFAULT_INDICATORS = ['rsi', 'macd', 'bbands']
+# Tickers per process when a universe is sharded across a process pool
+SHARD_SIZE = 250
+
+
+def required_tail_bars(names=DEFAULT_INDICATORS):
+    """
+    Number of raw rows that have to be carried between incremental runs.
+    """
+    return max([1] + [INDICATORS[name]['tail_bars'] for name in names])
+
+
+def warmup_bars(names=DEFAULT_INDICATORS):
+    """
+    Number of rows before every requested indicator produces a value.
+    """
+    return max([0] + [INDICATORS[name]['warmup_bars'] for name in names])
+
+
+def compute_indicators(panel, state=None, names=DEFAULT_INDICATORS):
+    """
+    Computes the requested indicators for every ticker in one pass.
+
+    `panel` maps an input field (e.g. 'Close') to a (dates x tickers) array.
+    With `state=None` the panel is treated as the full history of every
+    ticker. Otherwise `state` must be the state returned by a previous call
+    over the rows immediately before the panel, and only the new rows are
+    computed. Returns a dict of output panels and the new state.
+    """
+    fields = sorted({field for name in names for field in INDICATORS[name]['inputs']})
+    values = {field: np.asarray(panel[field], dtype=np.float64) for field in fields}
+    n_rows, n_cols = values[fields[0]].shape
+    tail_bars = required_tail_bars(names)
+
+    if state is None:
+        tails = {field: np.full((tail_bars, n_cols), np.nan) for field in fields}
+        indicator_states = {name: None for name in names}
+        bars = np.zeros(n_cols, dtype=np.int64)
+    else:
+        tails = state['tails']
+        indicator_states = state['indicators']
+        bars = state['bars']
+
+    outputs = {}
+    new_states = {}
+    for name in names:
+        spec = INDICATORS[name]
+        result, new_states[name] = spec['func']({field: values[field] for field in spec['inputs']},
+                                                {field: tails[field] for field in spec['inputs']},
+                                                indicator_states[name])
+        outputs.update(result)
+
+    new_state = {
+        'bars': bars + n_rows,
+        'tails': {field: np.vstack([tails[field], values[field]])[-tail_bars:] for field in fields},
+        'indicators': new_states,
+    }
+    return outputs, new_state
+
+
+def _select_columns(tree, cols):
+    # State trees hold per-ticker vectors (1-D) and per-ticker tails (2-D)
+    if isinstance(tree, dict):
+        return {key: _select_columns(value, cols) for key, value in tree.items()}
+    return tree[cols] if tree.ndim == 1 else tree[:, cols]
+
+
+def _concat_columns(trees):
+    first = trees[0]
+    if isinstance(first, dict):
+        return {key: _concat_columns([tree[key] for tree in trees]) for key in first}
+    return np.concatenate(trees, axis=first.ndim - 1)
+
+
+def compute_indicators_sharded(panel, state=None, names=DEFAULT_INDICATORS, workers=None,
+                               shard_size=SHARD_SIZE):
+    """
+    Same as `compute_indicators`, but splits the tickers into column shards
+    computed on a process pool. Every indicator is column-independent, so the
+    result is identical to a single-process run.
+    """
+    n_cols = next(iter(panel.values())).shape[1]
+    if not workers or workers <= 1 or n_cols <= shard_size:
+        return compute_indicators(panel, state, names)
+
+    shards = [slice(start, start + shard_size) for start in range(0, n_cols, shard_size)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(compute_indicators,
+                               {field: values[:, cols] for field, values in panel.items()},
+                               None if state is None else _select_columns(state, cols),
+                               names)
+                   for cols in shards]
+        results = [future.result() for future in futures]
+
+    outputs = {name: np.hstack([result[0][name] for result in results]) for name in results[0][0]}
+    return outputs, _concat_columns([result[1] for result in results])
+
+
+def long_to_panel(prices, fields=None):
+    """
+    Scatters long (Date, Ticker, field...) price rows into one
+    (dates x tickers) array per field. Dates missing for a ticker are NaN.
+    Returns the dates, the tickers and the panel.
+    """
+    fields = fields or [col for col in prices.columns if col not in ('Date', 'Ticker')]
+    dates = pd.DatetimeIndex(np.unique(prices['Date'].to_numpy()))
+    tickers = sorted(prices['Ticker'].astype(str).unique())
+    rows = dates.get_indexer(prices['Date'])
+    cols = pd.Index(tickers).get_indexer(prices['Ticker'].astype(str))
+
+    panel = {}
+    for field in fields:
+        values = np.full((len(dates), len(tickers)), np.nan)
+        values[rows, cols] = prices[field].to_numpy(dtype=np.float64)
+        panel[field] = values
+    return dates, tickers, panel
+
+
+def panel_to_frame(dates, tickers, panel, outputs):
+    """
+    Flattens raw and indicator panels into the long feature frame
+    (one row per Date and Ticker, ticker-major order). Rows with any
+    missing value are dropped.
+    """
+    n_rows = len(dates)
+    data = {'Date': np.tile(np.asarray(dates), len(tickers))}
+    for name, values in list(panel.items()) + list(outputs.items()):
+        data[name] = values.ravel(order='F')
+    data['Ticker'] = pd.Categorical.from_codes(np.repeat(np.arange(len(tickers)), n_rows), tickers)
+
+    features_df = pd.DataFrame(data).dropna()
+    if 'Volume' in features_df.columns:
+        features_df['Volume'] = features_df['Volume'].astype('int64')
+    return features_df.reset_index(drop=True)
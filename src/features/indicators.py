@@ -0,0 +1,226 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# --- Indicator Parameters ---
+# These match the pandas_ta settings the features were originally built with
+RSI_LENGTH = 14
+MACD_FAST = 12
+MACD_SLOW = 26
+MACD_SIGNAL = 9
+BB_LENGTH = 20
+BB_STD = 2.0
+
+# --- Indicator Registry ---
+# Every indicator is a function `func(inputs, tails, state)` working on whole
+# (dates x tickers) panels:
+#   inputs - dict of input field -> panel of the rows to compute
+#   tails  - dict of input field -> the `tail_bars` rows preceding `inputs`
+#            (all NaN when computing a full history)
+#   state  - whatever the indicator returned for the previous rows, or None
+#            for a full history
+# It returns a dict of output column -> panel and its new state.
+INDICATORS = {}
+
+
+def register_indicator(name, inputs=('Close',), tail_bars=0, warmup_bars=0):
+    """
+    Decorator that adds an indicator to the registry.
+
+    `tail_bars` is the number of raw rows the indicator needs to look back
+    past its state and `warmup_bars` the number of rows before its output is
+    fully valid.
+    """
+    def decorator(func):
+        INDICATORS[name] = {
+            'func': func,
+            'inputs': tuple(inputs),
+            'tail_bars': tail_bars,
+            'warmup_bars': warmup_bars,
+        }
+        return func
+    return decorator
+
+
+def new_ewm_state(n_cols):
+    """
+    Returns the initial state of an EWM recursion over `n_cols` columns.
+    """
+    return {
+        'weighted': np.full(n_cols, np.nan),
+        'old_wt': np.ones(n_cols),
+        'nobs': np.zeros(n_cols, dtype=np.int64),
+    }
+
+
+def ewm_mean(values, alpha, state=None):
+    """
+    NaN-aware exponentially weighted mean of a (dates x columns) panel.
+
+    Replicates pandas' `ewm(alpha=alpha, adjust=False).mean()` step by step
+    (including how NaN gaps decay the previous weight), so continuing from a
+    saved `state` gives exactly the values a run over the full history would.
+    Returns the output panel and the state after the last row.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    n_rows, n_cols = values.shape
+    if state is None:
+        state = new_ewm_state(n_cols)
+    weighted = state['weighted'].copy()
+    old_wt = state['old_wt'].copy()
+    nobs = state['nobs'].copy()
+
+    factor = 1.0 - alpha
+    out = np.empty_like(values)
+    for i in range(n_rows):
+        cur = values[i]
+        is_obs = cur == cur
+        has_weight = weighted == weighted
+
+        old_wt = np.where(has_weight, old_wt * factor, old_wt)
+        update = has_weight & is_obs & (weighted != cur)
+        with np.errstate(invalid='ignore'):
+            blended = (old_wt * weighted + alpha * cur) / (old_wt + alpha)
+        weighted = np.where(update, blended, weighted)
+        old_wt = np.where(has_weight & is_obs, 1.0, old_wt)
+        weighted = np.where(~has_weight & is_obs, cur, weighted)
+
+        nobs += is_obs
+        out[i] = np.where(nobs >= 1, weighted, np.nan)
+
+    return out, {'weighted': weighted, 'old_wt': old_wt, 'nobs': nobs}
+
+
+def seed_with_sma(values, length, first_rows=None):
+    """
+    Applies pandas_ta's `presma` seeding: the first `length` values starting at
+    `first_rows` (row 0 by default) are replaced by NaNs followed by their
+    simple mean, so the EMA starts from an SMA instead of the first value.
+    """
+    values = np.array(values, dtype=np.float64)
+    n_rows, n_cols = values.shape
+    if first_rows is None:
+        first_rows = np.zeros(n_cols, dtype=np.int64)
+
+    for col in range(n_cols):
+        start = first_rows[col]
+        if start < 0 or start + length > n_rows:
+            values[:, col] = np.nan
+            continue
+        window = values[start:start + length, col]
+        observed = window[~np.isnan(window)]
+        values[:start + length - 1, col] = np.nan
+        values[start + length - 1, col] = observed.mean() if observed.size else np.nan
+    return values
+
+
+def ema(values, length, state=None):
+    """
+    pandas_ta EMA (SMA-seeded, adjust=False) of a panel. When continuing from
+    `state` the series is already seeded, so no SMA is applied.
+    """
+    if state is None:
+        values = seed_with_sma(values, length)
+    return ewm_mean(values, 2.0 / (length + 1), state)
+
+
+def rolling_mean_std(values, length, tail=None):
+    """
+    Rolling mean and sample standard deviation (ddof=1) over `length` rows.
+
+    `tail` holds the `length - 1` rows preceding `values` (all NaN for a full
+    build). Each window is summed in a fixed order so that the result of a
+    window never depends on how many rows are processed in the same call.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if tail is None:
+        tail = np.full((length - 1, values.shape[1]), np.nan)
+    extended = np.vstack([tail, values])
+    windows = sliding_window_view(extended, length, axis=0)
+
+    total = np.zeros(windows.shape[:2])
+    for k in range(length):
+        total += windows[..., k]
+    mean = total / length
+
+    squares = np.zeros(windows.shape[:2])
+    for k in range(length):
+        squares += (windows[..., k] - mean) ** 2
+    std = np.sqrt(squares / (length - 1))
+    return mean, std
+
+
+@register_indicator('rsi', tail_bars=1, warmup_bars=RSI_LENGTH)
+def rsi(inputs, tails, state):
+    """
+    Relative Strength Index with Wilder's smoothing (an EWM with alpha = 1 / length).
+    """
+    close = inputs['Close']
+    state = state or {'gain': None, 'loss': None}
+
+    previous = np.vstack([tails['Close'][-1:], close[:-1]])
+    change = close - previous
+    gain = np.where(change < 0, 0.0, change)
+    loss = np.where(change > 0, 0.0, change)
+    gain_avg, gain_state = ewm_mean(gain, 1.0 / RSI_LENGTH, state['gain'])
+    loss_avg, loss_state = ewm_mean(loss, 1.0 / RSI_LENGTH, state['loss'])
+    with np.errstate(invalid='ignore', divide='ignore'):
+        values = 100 * gain_avg / (gain_avg + np.abs(loss_avg))
+
+    return {f"RSI_{RSI_LENGTH}": values}, {'gain': gain_state, 'loss': loss_state}
+
+
+@register_indicator('macd', warmup_bars=MACD_SLOW + MACD_SIGNAL - 1)
+def macd(inputs, tails, state):
+    """
+    Moving Average Convergence Divergence: line, histogram and signal.
+    """
+    close = inputs['Close']
+    full_history = state is None
+    state = state or {'fast': None, 'slow': None, 'signal': None}
+
+    fast, fast_state = ema(close, MACD_FAST, state['fast'])
+    slow, slow_state = ema(close, MACD_SLOW, state['slow'])
+    line = fast - slow
+    if full_history:
+        # The signal line is seeded from the first valid MACD value of each ticker
+        valid = ~np.isnan(line)
+        first_valid = np.where(valid.any(axis=0), valid.argmax(axis=0), -1)
+        signal, signal_state = ewm_mean(seed_with_sma(line, MACD_SIGNAL, first_valid),
+                                        2.0 / (MACD_SIGNAL + 1))
+    else:
+        signal, signal_state = ewm_mean(line, 2.0 / (MACD_SIGNAL + 1), state['signal'])
+
+    suffix = f"{MACD_FAST}_{MACD_SLOW}_{MACD_SIGNAL}"
+    outputs = {
+        f"MACD_{suffix}": line,
+        f"MACDh_{suffix}": line - signal,
+        f"MACDs_{suffix}": signal,
+    }
+    return outputs, {'fast': fast_state, 'slow': slow_state, 'signal': signal_state}
+
+
+@register_indicator('bbands', tail_bars=BB_LENGTH - 1, warmup_bars=BB_LENGTH)
+def bbands(inputs, tails, state):
+    """
+    Bollinger Bands: lower, mid, upper, bandwidth and %B.
+    Rolling windows are stateless, the preceding closes come from `tails`.
+    """
+    close = inputs['Close']
+    mid, std = rolling_mean_std(close, BB_LENGTH, tails['Close'][-(BB_LENGTH - 1):])
+    lower = mid - BB_STD * std
+    upper = mid + BB_STD * std
+    band_range = upper - lower
+    band_range = np.where(band_range == 0, np.finfo(float).eps, band_range)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        bandwidth = 100 * band_range / mid
+        percent = (close - lower) / band_range
+
+    suffix = f"{BB_LENGTH}_{BB_STD}_{BB_STD}"
+    outputs = {
+        f"BBL_{suffix}": lower,
+        f"BBM_{suffix}": mid,
+        f"BBU_{suffix}": upper,
+        f"BBB_{suffix}": bandwidth,
+        f"BBP_{suffix}": percent,
+    }
+    return outputs, {}
@@ -0,0 +1,136 @@
+import hashlib
+import sqlite3
+import time
+import unicodedata
+from pathlib import Path
+
+# --- Configuration ---
+CACHE_PATH = Path(__file__).parent.parent.parent / "data/processed/sentiment_cache.sqlite"
+MAX_ENTRIES = 500_000
+MAX_AGE_DAYS = 365
+
+# SQLite limits the number of bound parameters per statement
+QUERY_BATCH = 500
+
+
+def normalize_headline(headline):
+    """
+    Normalizes a headline so trivially different copies (unicode forms,
+    repeated or trailing whitespace) share a cache entry.
+    """
+    return ' '.join(unicodedata.normalize('NFKC', headline).split())
+
+
+def cache_key(headline, model_id, revision):
+    """
+    Cache key of a headline for a given model id and revision.
+    """
+    payload = f"{model_id}@{revision}\n{normalize_headline(headline)}"
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class SentimentCache:
+    """
+    Persistent headline-level cache of sentiment predictions (label and score),
+    stored in SQLite and keyed by headline, model id and model revision.
+    Entries are evicted by age and, beyond `max_entries`, least recently used first.
+    """
+
+    def __init__(self, path, model_id, revision, max_entries=MAX_ENTRIES, max_age_days=MAX_AGE_DAYS):
+        self.path = Path(path)
+        self.model_id = model_id
+        self.revision = revision
+        self.max_entries = max_entries
+        self.max_age_days = max_age_days
+        self.hits = 0
+        self.misses = 0
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(self.path)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS sentiment (
+                key TEXT PRIMARY KEY,
+                label TEXT NOT NULL,
+                score REAL NOT NULL,
+                created_at REAL NOT NULL,
+                last_used REAL NOT NULL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS sentiment_last_used ON sentiment (last_used)")
+        self.conn.commit()
+
+    def get_many(self, headlines):
+        """
+        Looks up a list of headlines. Returns a dict of headline -> {'label', 'score'}
+        for the cached ones; every other headline counts as a miss.
+        """
+        keys = {}
+        for headline in headlines:
+            keys.setdefault(cache_key(headline, self.model_id, self.revision), []).append(headline)
+
+        found = {}
+        key_list = list(keys)
+        for start in range(0, len(key_list), QUERY_BATCH):
+            batch = key_list[start:start + QUERY_BATCH]
+            placeholders = ','.join('?' * len(batch))
+            rows = self.conn.execute(
+                f"SELECT key, label, score FROM sentiment WHERE key IN ({placeholders})", batch)
+            for key, label, score in rows:
+                for headline in keys[key]:
+                    found[headline] = {'label': label, 'score': score}
+
+            hit_keys = [key for key in batch if keys[key][0] in found]
+            self.conn.executemany("UPDATE sentiment SET last_used = ? WHERE key = ?",
+                                  [(time.time(), key) for key in hit_keys])
+        self.conn.commit()
+
+        self.hits += sum(1 for headline in headlines if headline in found)
+        self.misses += sum(1 for headline in headlines if headline not in found)
+        return found
+
+    def put_many(self, results):
+        """
+        Stores a dict of headline -> {'label', 'score'}.
+        """
+        now = time.time()
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO sentiment (key, label, score, created_at, last_used) VALUES (?, ?, ?, ?, ?)",
+            [(cache_key(headline, self.model_id, self.revision), result['label'], float(result['score']), now, now)
+             for headline, result in results.items()])
+        self.conn.commit()
+
+    def evict(self):
+        """
+        Drops entries older than `max_age_days`, then the least recently used
+        entries beyond `max_entries`. Returns the number of evicted entries.
+        """
+        evicted = 0
+        if self.max_age_days is not None:
+            cutoff = time.time() - self.max_age_days * 86400
+            evicted += self.conn.execute("DELETE FROM sentiment WHERE created_at < ?", (cutoff,)).rowcount
+        if self.max_entries is not None:
+            excess = len(self) - self.max_entries
+            if excess > 0:
+                evicted += self.conn.execute(
+                    "DELETE FROM sentiment WHERE key IN "
+                    "(SELECT key FROM sentiment ORDER BY last_used ASC LIMIT ?)", (excess,)).rowcount
+        self.conn.commit()
+        return evicted
+
+    def stats(self):
+        """
+        Returns the hit/miss counters of this session and the cache size.
+        """
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'entries': len(self),
+        }
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM sentiment").fetchone()[0]
+
+    def close(self):
+        self.conn.close()
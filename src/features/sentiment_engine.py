@@ -0,0 +1,102 @@
+import time
+import numpy as np
+import torch
+from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+# --- Inference Configuration ---
+BATCH_SIZE = 64
+# Headlines are short; anything longer is truncated instead of padding every batch to 512
+MAX_LENGTH = 128
+
+
+class SentimentEngine:
+    """
+    Batched CPU inference for a sequence-classification sentiment model.
+
+    Headlines are sorted by token length and cut into batches of similar
+    length, so each batch is only padded to its own longest headline. The
+    model runs under `torch.inference_mode`, and `quantize=True` swaps its
+    Linear layers for dynamically quantized int8 ones.
+    """
+
+    def __init__(self, model_id, revision='main', batch_size=BATCH_SIZE, max_length=MAX_LENGTH,
+                 num_threads=None, quantize=False):
+        if num_threads:
+            torch.set_num_threads(num_threads)
+
+        self.batch_size = batch_size
+        self.max_length = max_length
+        self.quantize = quantize
+        self.tokenizer = AutoTokenizer.from_pretrained(model_id, revision=revision)
+        model = AutoModelForSequenceClassification.from_pretrained(model_id, revision=revision)
+        model.eval()
+        if quantize:
+            model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        self.model = model
+        self.id2label = {int(i): label.lower() for i, label in model.config.id2label.items()}
+
+        # Throughput of the last `score` call, in headlines per second
+        self.last_throughput = None
+
+    def score(self, headlines):
+        """
+        Scores a list of headlines. Returns one {'label', 'score'} dict per
+        headline, in input order, like the transformers sentiment pipeline.
+        """
+        if not headlines:
+            return []
+
+        start = time.perf_counter()
+        headlines = list(headlines)
+        encoded = self.tokenizer(headlines, truncation=True, max_length=self.max_length)
+        lengths = np.array([len(ids) for ids in encoded['input_ids']])
+        order = np.argsort(lengths, kind='stable')
+
+        labels = np.empty(len(headlines), dtype=np.int64)
+        scores = np.empty(len(headlines), dtype=np.float64)
+        with torch.inference_mode():
+            for batch_start in range(0, len(order), self.batch_size):
+                idx = order[batch_start:batch_start + self.batch_size]
+                # Pads the encodings from above instead of tokenizing the headlines again
+                batch = self.tokenizer.pad([{key: encoded[key][i] for key in encoded.keys()} for i in idx],
+                                           padding='longest', return_tensors='pt')
+                probabilities = torch.softmax(self.model(**batch).logits, dim=-1)
+                best = probabilities.max(dim=-1)
+                labels[idx] = best.indices.numpy()
+                scores[idx] = best.values.numpy()
+
+        self.last_throughput = len(headlines) / (time.perf_counter() - start)
+        return [{'label': self.id2label[label], 'score': float(score)}
+                for label, score in zip(labels, scores)]
+
+
+def compare_with_fp32(headlines, model_id, revision='main', **engine_kwargs):
+    """
+    Scores the same headlines with the fp32 and the int8 engine and reports
+    throughput of both, label agreement and the mean absolute difference
+    of the signed sentiment score.
+    """
+    score_map = {'positive': 1, 'neutral': 0, 'negative': -1}
+    results = {}
+    throughput = {}
+    for name, quantize in [('fp32', False), ('int8', True)]:
+        engine = SentimentEngine(model_id, revision, quantize=quantize, **engine_kwargs)
+        results[name] = engine.score(headlines)
+        throughput[name] = engine.last_throughput
+
+    fp32, int8 = results['fp32'], results['int8']
+    agreement = np.mean([a['label'] == b['label'] for a, b in zip(fp32, int8)])
+    score_diff = np.mean([abs(score_map[a['label']] * a['score'] - score_map[b['label']] * b['score'])
+                          for a, b in zip(fp32, int8)])
+
+    report = {
+        'headlines': len(headlines),
+        'fp32_headlines_per_sec': throughput['fp32'],
+        'int8_headlines_per_sec': throughput['int8'],
+        'label_agreement': float(agreement),
+        'mean_abs_score_diff': float(score_diff),
+    }
+    print("--- fp32 vs int8 sentiment inference ---")
+    for key, value in report.items():
+        print(f"{key}: {value:.4f}" if isinstance(value, float) else f"{key}: {value}")
+    return report
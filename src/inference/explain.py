@@ -0,0 +1,149 @@
+import argparse
+from pathlib import Path
+
+import numpy as np
+import orjson
+import pandas as pd
+
+from src.backtest.engine import TEST_START
+from src.features.create_labels import BATCH_ROWS
+from src.inference.predictor import Predictor
+from src.pipeline.profiling import profiled, record_rows
+from src.storage.parquet_store import (append_dataset, partition_batches, partition_fragments, read_partition,
+                                       reset_dataset)
+
+# --- File Paths ---
+BASE_DIR = Path(__file__).parent.parent.parent
+MODEL_PATH = BASE_DIR / "models/xgb_model.joblib"
+DATA_PATH = BASE_DIR / "data/processed/labeled_features"
+CONTRIBUTIONS_PATH = BASE_DIR / "data/processed/contributions"
+
+# --- Explanation Configuration ---
+TOP_K = 5
+MAX_K = 50
+# Columns holding the contribution of each feature, e.g. contrib_RSI_14
+CONTRIB_PREFIX = 'contrib_'
+# The model's base value (log-odds before any feature is looked at)
+BASE_VALUE_COLUMN = 'base_value'
+
+
+def contribution_columns(features):
+    return [f'{CONTRIB_PREFIX}{feature}' for feature in features]
+
+
+def contribution_frame(df, predictor, X=None):
+    """
+    Contributions of every row of `df` as columns (one per feature plus the
+    base value), next to the UP probability they add up to. `X` is the
+    feature matrix of `df` if it was built already.
+    """
+    X = predictor.matrix(df) if X is None else X
+    contributions = predictor.contributions_matrix(X)
+    frame = pd.DataFrame(contributions[:, :-1], columns=contribution_columns(predictor.features), index=df.index)
+    frame[BASE_VALUE_COLUMN] = contributions[:, -1]
+    # The contributions add up to the margin, the log-odds of the UP class
+    frame['probability_up'] = 1 / (1 + np.exp(-contributions.sum(axis=1, dtype=np.float64)))
+    return frame
+
+
+class Explanations:
+    """
+    Contributions of the latest row of every ticker, computed in one batch
+    when the snapshot is built and kept as NumPy arrays, so that a request
+    only ranks the features of one row.
+    """
+
+    def __init__(self, frame, features, version=None):
+        self.features = np.asarray(features)
+        self.version = version
+        self.rows = {ticker: i for i, ticker in enumerate(frame['Ticker'].astype(str))}
+        self.dates = frame['Date'].to_numpy(dtype='datetime64[D]').astype(str)
+        self.prediction = frame['prediction'].to_numpy()
+        self.confidence = frame['confidence'].to_numpy(dtype=np.float64)
+        self.probability_up = np.where(self.prediction == 1, self.confidence, 1 - self.confidence)
+        self.values = frame[list(features)].to_numpy(dtype=np.float64)
+        self.contributions = frame[contribution_columns(features)].to_numpy(dtype=np.float64)
+        self.base_value = frame[BASE_VALUE_COLUMN].to_numpy(dtype=np.float64)
+
+    @classmethod
+    def from_frame(cls, frame, version=None):
+        """
+        Explanations of a snapshot frame, or None if it has no contribution columns.
+        """
+        features = [col[len(CONTRIB_PREFIX):] for col in frame.columns if col.startswith(CONTRIB_PREFIX)]
+        if not features:
+            return None
+        return cls(frame, features, version)
+
+    def explain(self, ticker, k=TOP_K):
+        """
+        The `k` features that moved the prediction of `ticker` the most
+        (largest absolute contribution first), or None if the ticker is
+        unknown. 'other' is the sum of the remaining contributions, so
+        base_value + the top-k contributions + other = margin.
+        """
+        row = self.rows.get(ticker)
+        if row is None:
+            return None
+        contributions = self.contributions[row]
+        top = np.argsort(-np.abs(contributions), kind='stable')[:k]
+        margin = self.base_value[row] + contributions.sum()
+        return {
+            'ticker': ticker,
+            'date': str(self.dates[row]),
+            'prediction': int(self.prediction[row]),
+            'confidence': float(self.confidence[row]),
+            # The model's own probability (the one /predict serves), not a re-derived one
+            'probability_up': float(self.probability_up[row]),
+            'base_value': float(self.base_value[row]),
+            'margin': float(margin),
+            'contributions': [{'feature': str(self.features[i]), 'value': float(self.values[row, i]),
+                               'contribution': float(contributions[i])} for i in top],
+            'other': float(contributions.sum() - contributions[top].sum()),
+        }
+
+    def render(self, explanation):
+        """
+        JSON payload of an explanation from `explain`.
+        """
+        return orjson.dumps({'version': self.version, **explanation})
+
+
+@profiled()
+def write_contributions(data_path=DATA_PATH, model_path=MODEL_PATH, contributions_path=CONTRIBUTIONS_PATH,
+                        start=TEST_START, end=None, batch_rows=BATCH_ROWS):
+    """
+    Offline batch mode: computes the contributions of every row between
+    `start` and `end` (by default the backtest period) and writes them to
+    the feature store, partitioned by ticker like the other stages.
+    """
+    predictor = Predictor.from_path(model_path)
+    dataset, partitions = partition_fragments(data_path)
+    print(f"Computing feature contributions for {len(partitions)} tickers from {start}...")
+
+    reset_dataset(contributions_path)
+    rows = 0
+    for tickers, fragments in partition_batches(partitions, batch_rows):
+        df = read_partition(dataset, fragments, columns=predictor.features)
+        mask = df['Date'] >= pd.Timestamp(start)
+        if end is not None:
+            mask &= df['Date'] <= pd.Timestamp(end)
+        df = df[mask]
+        if df.empty:
+            continue
+        frame = pd.concat([df[['Date', 'Ticker']], contribution_frame(df, predictor)], axis=1)
+        append_dataset(frame, contributions_path)
+        rows += len(frame)
+
+    record_rows(rows)
+    print(f"Contributions ({rows} rows) saved to {contributions_path}")
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write per-feature model contributions to the feature store.")
+    parser.add_argument('--start', default=TEST_START, help="first date (default: start of the backtest period)")
+    parser.add_argument('--end', default=None, help="last date (default: the latest row)")
+    args = parser.parse_args()
+
+    write_contributions(start=args.start, end=args.end)
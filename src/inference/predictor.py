@@ -0,0 +1,100 @@
+import joblib
+import numpy as np
+import xgboost as xgb
+
+# --- Feature Schema ---
+# Columns of the labeled dataset that are not model inputs: keys, labels
+# and the raw prices the model was not trained on. The authoritative list
+# of inputs is the booster's own feature names.
+NON_FEATURE_COLUMNS = ['Date', 'Ticker', 'future_return', 'target',
+                       'Open', 'High', 'Low', 'Adj Close', 'Volume', 'year']
+# Labels of the other horizons (future_return_10d, target_10d, ...) are not inputs either
+LABEL_PREFIXES = ('future_return', 'target')
+
+# Rows scored per inplace_predict call; bounds the memory of one batch
+CHUNK_ROWS = 262_144
+
+
+def feature_columns(columns):
+    """
+    Candidate model inputs among `columns`, in their order (for training).
+    """
+    return [col for col in columns if col not in NON_FEATURE_COLUMNS and not col.startswith(LABEL_PREFIXES)]
+
+
+class Predictor:
+    """
+    Scores feature rows with a trained XGBoost classifier.
+
+    The feature order is taken from the booster and every frame is checked
+    against it. Rows are converted once into a contiguous float32 matrix and
+    scored with one `inplace_predict` pass per chunk, which yields both the
+    class and its probability (instead of separate predict and
+    predict_proba calls that walk the trees twice).
+    """
+
+    def __init__(self, model, chunk_rows=CHUNK_ROWS):
+        self.model = model
+        self.booster = model.get_booster()
+        self.features = self.booster.feature_names
+        if not self.features:
+            raise ValueError("The model was trained without feature names; cannot validate inputs")
+        self.classes = np.asarray(getattr(model, 'classes_', [0, 1]))
+        self.chunk_rows = chunk_rows
+
+    @classmethod
+    def from_path(cls, model_path, chunk_rows=CHUNK_ROWS):
+        return cls(joblib.load(model_path), chunk_rows)
+
+    def matrix(self, df):
+        """
+        Selects the model's features from a frame, in the booster's order,
+        as a C-contiguous float32 matrix.
+        """
+        missing = [col for col in self.features if col not in df.columns]
+        if missing:
+            raise ValueError(f"Missing model features: {missing}")
+        return np.ascontiguousarray(df[self.features].to_numpy(dtype=np.float32))
+
+    def predict_proba_matrix(self, X):
+        """
+        Class probabilities (rows x classes) of a float32 feature matrix.
+        """
+        out = np.empty((len(X), len(self.classes)), dtype=np.float32)
+        for start in range(0, len(X), self.chunk_rows):
+            scores = self.booster.inplace_predict(X[start:start + self.chunk_rows], validate_features=False)
+            if scores.ndim == 1:
+                # binary:logistic returns P(class 1) only
+                scores = np.column_stack([1 - scores, scores])
+            out[start:start + len(scores)] = scores
+        return out
+
+    def predict_matrix(self, X):
+        """
+        Scores a float32 feature matrix. Returns the predicted class, the
+        probability of the UP class and the confidence (probability of the
+        predicted class) of every row.
+        """
+        proba = self.predict_proba_matrix(X)
+        best = proba.argmax(axis=1)
+        return self.classes[best], proba[:, -1], proba[np.arange(len(proba)), best]
+
+    def predict(self, df):
+        """
+        Same as `predict_matrix`, for a frame holding the feature columns.
+        """
+        return self.predict_matrix(self.matrix(df))
+
+    def contributions_matrix(self, X):
+        """
+        Per-feature contributions (TreeSHAP, XGBoost's native `pred_contribs`)
+        of a float32 feature matrix: rows x (features + 1), in log-odds of
+        the UP class, with the bias (the model's base value) last. Each row
+        sums to the row's margin.
+        """
+        out = np.empty((len(X), len(self.features) + 1), dtype=np.float32)
+        for start in range(0, len(X), self.chunk_rows):
+            chunk = xgb.DMatrix(X[start:start + self.chunk_rows], feature_names=self.features)
+            contributions = self.booster.predict(chunk, pred_contribs=True, validate_features=False)
+            out[start:start + len(contributions)] = contributions
+        return out
@@ -1,10 +1,13 @@
 import os
-import json
-from pathlib import Path
-from newsapi import NewsApiClient
+import time
+import asyncio
+import httpx
 from dotenv import load_dotenv
 from datetime import datetime, timedelta # Import datetime libraries
 
+from src.ingestion.news_store import (NEWS_STORE_DIR, append_articles, last_published_at, load_articles,
+                                      migrate_legacy)
+
 # --- Configuration ---
 load_dotenv()
 
@@ -19,45 +22,149 @@ SEARCH_QUERIES = {
 # --- FIX: Automatically calculate the start date to be 29 days ago ---
 # This ensures we are always within the free plan's 1-month limit.
 START_DATE = (datetime.today() - timedelta(days=29)).strftime('%Y-%m-%d')
-END_DATE = datetime.today().strftime('%Y-%m-%d') 
+END_DATE = datetime.today().strftime('%Y-%m-%d')
+
+SAVE_DIR = NEWS_STORE_DIR
+
+# --- HTTP / Rate Limits ---
+NEWSAPI_URL = "https://newsapi.org/v2/everything"
+PAGE_SIZE = 100          # NewsAPI maximum
+MAX_CONCURRENCY = 4      # Queries in flight at the same time
+RATE_PER_SECOND = 1.0    # Sustained request rate allowed by the plan
+RATE_BURST = 4           # Requests that may be sent back to back
+MAX_RETRIES = 3
+RETRY_BACKOFF = 1.0      # Seconds before the first retry, doubled on each further one
+REQUEST_TIMEOUT = 30
+
+
+class TokenBucket:
+    """
+    Async token-bucket rate limiter shared by all requests of a run.
+    """
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.capacity = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+async def fetch_page(client, limiter, base_url, params):
+    """
+    Fetches one page of results, retrying rate-limited and server errors,
+    connection errors and timeouts with backoff.
+    """
+    for attempt in range(MAX_RETRIES + 1):
+        await limiter.acquire()
+        try:
+            response = await client.get(base_url, params=params)
+        except httpx.TransportError:
+            # Connection errors and timeouts (httpx.TimeoutException is a TransportError)
+            if attempt == MAX_RETRIES:
+                raise
+            await asyncio.sleep(RETRY_BACKOFF * 2 ** attempt)
+            continue
+        if response.status_code == 429 or response.status_code >= 500:
+            if attempt == MAX_RETRIES:
+                response.raise_for_status()
+            await asyncio.sleep(RETRY_BACKOFF * 2 ** attempt)
+            continue
+        return response.json()
 
-SAVE_DIR = Path(__file__).parent.parent.parent / "data/raw/news"
 
+async def fetch_ticker_news(client, limiter, semaphore, base_url, api_key, ticker, query,
+                            start_date, end_date, save_dir):
+    """
+    Pages through every article for one query, starting from the last stored
+    `publishedAt` for the ticker, and appends the unseen ones to its store.
+
+    Pages arrive newest first, so nothing is stored unless every page was
+    fetched: storing the newest pages of a failed run would move the resume
+    point past the older articles it missed.
+    """
+    async with semaphore:
+        migrate_legacy(save_dir, ticker)
+        stored = load_articles(save_dir, ticker)
+        known_urls = {article['url'] for article in stored if article.get('url')}
+        # Resume from the newest stored article; the URL de-duplication absorbs the overlap
+        last_seen = last_published_at(stored)
+        from_param = max(start_date, last_seen.rstrip('Z')) if last_seen else start_date
+        print(f"Fetching news for {query} ({ticker}) from {from_param}...")
+
+        params = {'q': query, 'from': from_param, 'to': end_date, 'language': 'en',
+                  'sortBy': 'publishedAt', 'pageSize': PAGE_SIZE, 'apiKey': api_key}
+        articles = []
+        page = 1
+        try:
+            while True:
+                data = await fetch_page(client, limiter, base_url, {**params, 'page': page})
+                if data.get('status') != 'ok':
+                    # e.g. 'maximumResultsReached' once the plan's result cap is hit
+                    if page == 1:
+                        print(f"NewsAPI error for '{query}': {data.get('code')} - {data.get('message')}")
+                    break
+
+                page_articles = data.get('articles', [])
+                articles.extend(page_articles)
+                if not page_articles or len(articles) >= data.get('totalResults', 0):
+                    break
+                page += 1
+        except (httpx.HTTPError, ValueError) as e:
+            # Nothing is stored, so the next run fetches the whole window again
+            print(f"Fetching news for '{query}' failed after {len(articles)} articles; nothing stored: {e}")
+            return 0
+
+        written = append_articles(save_dir, ticker, articles, known_urls)
+        print(f"Fetched {len(articles)} articles for {ticker}, {written} new.")
+        return written
 
-def fetch_news(api_key, queries, start_date, end_date, save_dir):
+
+async def fetch_news_async(api_key, queries, start_date, end_date, save_dir, base_url=NEWSAPI_URL,
+                           max_concurrency=MAX_CONCURRENCY, rate=RATE_PER_SECOND, burst=RATE_BURST):
+    """
+    Fetches news for all queries concurrently over a pooled HTTP client,
+    bounded by `max_concurrency` and a token-bucket rate limiter.
+    Returns the number of new articles per ticker.
     """
-    Fetches news articles for a list of queries from NewsAPI and saves them as JSON files.
+    limiter = TokenBucket(rate, burst)
+    semaphore = asyncio.Semaphore(max_concurrency)
+    limits = httpx.Limits(max_connections=max_concurrency, max_keepalive_connections=max_concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=REQUEST_TIMEOUT) as client:
+        tasks = [fetch_ticker_news(client, limiter, semaphore, base_url, api_key, ticker, query,
+                                   start_date, end_date, save_dir)
+                 for ticker, query in queries.items()]
+        results = await asyncio.gather(*tasks)
+    return dict(zip(queries, results))
+
+
+def fetch_news(api_key, queries, start_date, end_date, save_dir, base_url=NEWSAPI_URL):
+    """
+    Fetches news articles for a list of queries from NewsAPI and appends the
+    new ones to each ticker's append-only store.
     """
     if not api_key:
         print("Error: NEWSAPI_KEY not found. Please add it to your .env file.")
         return
-        
-    newsapi = NewsApiClient(api_key=api_key)
-    save_dir.mkdir(parents=True, exist_ok=True)
-    
-    for ticker, query in queries.items():
-        print(f"Fetching news for {query} ({ticker})...")
-        try:
-            all_articles = newsapi.get_everything(q=query,
-                                                  from_param=start_date,
-                                                  to=end_date,
-                                                  language='en',
-                                                  sort_by='publishedAt')
-            
-            file_path = save_dir / f"{ticker}_news.json"
-            with open(file_path, 'w') as f:
-                json.dump(all_articles, f, indent=4)
-                
-            print(f"Successfully fetched {all_articles['totalResults']} articles and saved to {file_path}")
-        
-        except Exception as e:
-            print(f"An error occurred for query '{query}': {e}")
+
+    return asyncio.run(fetch_news_async(api_key, queries, start_date, end_date, save_dir, base_url))
 
 
 if __name__ == "__main__":
     api_key = os.getenv("NEWSAPI_KEY")
-    fetch_news(api_key=api_key, 
+    fetch_news(api_key=api_key,
                queries=SEARCH_QUERIES,
                start_date=START_DATE,
                end_date=END_DATE,
-               save_dir=SAVE_DIR)
\ No newline at end of file
+               save_dir=SAVE_DIR)
@@ -0,0 +1,71 @@
+import json
+from pathlib import Path
+
+# --- File Paths ---
+NEWS_STORE_DIR = Path(__file__).parent.parent.parent / "data/raw/news"
+
+
+def store_path(store_dir, ticker):
+    return store_dir / f"{ticker}.jsonl"
+
+
+def legacy_path(store_dir, ticker):
+    # Full-window JSON blobs written by the old synchronous ingestion
+    return store_dir / f"{ticker}_news.json"
+
+
+def load_articles(store_dir, ticker):
+    """
+    Loads every stored article for a ticker, oldest first. Falls back to the
+    legacy `{ticker}_news.json` blob if the ticker has no append-only store yet.
+    """
+    path = store_path(store_dir, ticker)
+    if path.exists():
+        with open(path, 'r') as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    legacy = legacy_path(store_dir, ticker)
+    if legacy.exists():
+        with open(legacy, 'r') as f:
+            articles = json.load(f).get('articles', [])
+        return sorted(articles, key=lambda article: article.get('publishedAt') or '')
+    return []
+
+
+def migrate_legacy(store_dir, ticker):
+    """
+    Copies the articles of a legacy `{ticker}_news.json` blob into the
+    append-only store, once. Returns the number of articles migrated.
+    """
+    if store_path(store_dir, ticker).exists() or not legacy_path(store_dir, ticker).exists():
+        return 0
+    return append_articles(store_dir, ticker, load_articles(store_dir, ticker), set())
+
+
+def last_published_at(articles):
+    """
+    Returns the latest `publishedAt` timestamp among stored articles, or None.
+    """
+    timestamps = [article['publishedAt'] for article in articles if article.get('publishedAt')]
+    return max(timestamps) if timestamps else None
+
+
+def append_articles(store_dir, ticker, articles, known_urls):
+    """
+    Appends the articles whose URL hasn't been stored yet. `known_urls` is
+    updated in place. Returns the number of articles written.
+    """
+    new_articles = []
+    for article in sorted(articles, key=lambda article: article.get('publishedAt') or ''):
+        url = article.get('url')
+        if not url or url in known_urls:
+            continue
+        known_urls.add(url)
+        new_articles.append(article)
+
+    if new_articles:
+        store_dir.mkdir(parents=True, exist_ok=True)
+        with open(store_path(store_dir, ticker), 'a') as f:
+            for article in new_articles:
+                f.write(json.dumps(article) + '\n')
+    return len(new_articles)
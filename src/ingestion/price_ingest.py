@@ -1,36 +1,204 @@
-import yfinance as yf
+import argparse
 import pandas as pd
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
+from tenacity import retry, stop_after_attempt, wait_exponential
+
+from src.storage.parquet_store import append_dataset, max_date_by_ticker, read_dataset
 
 # --- Configuration ---
 TICKERS = ['RELIANCE.NS', 'TCS.NS', 'HDFCBANK.NS', 'INFY.NS', 'ICICIBANK.NS']
 START_DATE = '2020-01-01'
 END_DATE = pd.Timestamp.today().strftime('%Y-%m-%d')
-# Save to a new file to keep our original close prices file
-SAVE_PATH = Path(__file__).parent.parent.parent / "data/raw/full_stock_data.csv"
+
+# --- Storage ---
+# Long-format (Date, Ticker, OHLCV) dataset partitioned by ticker and year,
+# so downstream stages can read a date range of a few tickers without
+# touching the rest of the universe.
+SAVE_PATH = Path(__file__).parent.parent.parent / "data/raw/prices"
+PRICE_PARTITION_COLS = ['Ticker', 'year']
+PRICE_FIELDS = ['Open', 'High', 'Low', 'Close', 'Adj Close', 'Volume']
+# Wide multi-index CSV written by earlier versions of this script
+LEGACY_CSV_PATH = Path(__file__).parent.parent.parent / "data/raw/full_stock_data.csv"
+
+# --- Download Settings ---
+CHUNK_SIZE = 50          # Tickers per provider request
+MAX_WORKERS = 4          # Chunks downloaded at the same time
+MAX_ATTEMPTS = 4         # Attempts per chunk before giving up
+
+
+class PriceProvider(ABC):
+    """
+    Source of daily OHLCV bars. `fetch` returns a long frame with Date,
+    Ticker and the PRICE_FIELDS columns for `start <= Date < end`.
+    """
+
+    @abstractmethod
+    def fetch(self, tickers, start, end):
+        """
+        Daily bars of `tickers` for `start <= Date < end`, in long format.
+        """
 
 
-def fetch_ohlcv_data(tickers, start, end, save_path):
+class YFinanceProvider(PriceProvider):
     """
-    Downloads full OHLCV data for a list of stock tickers
-    from Yahoo Finance and saves it to a CSV file.
+    Downloads bars from Yahoo Finance.
     """
-    print(f"Downloading full OHLCV data for {tickers}...")
-    
-    # Download the full dataset. auto_adjust=False is needed to get all columns.
-    # We will also group by ticker for a cleaner column structure.
-    full_data = yf.download(tickers, start=start, end=end, auto_adjust=False, group_by='ticker')
-    
-    # Clean the data by dropping rows where all values are missing
-    full_data.dropna(axis='index', how='all', inplace=True)
 
-    save_path.parent.mkdir(parents=True, exist_ok=True)
-    full_data.to_csv(save_path)
-    
-    print(f"Full data saved successfully to {save_path}!")
-    print("--- First 5 rows of the data: ---")
-    print(full_data.head())
+    def fetch(self, tickers, start, end):
+        import yfinance as yf
+
+        # auto_adjust=False is needed to get all columns. threads=False because
+        # chunks are already downloaded concurrently.
+        data = yf.download(tickers, start=start, end=end, auto_adjust=False, group_by='ticker',
+                           progress=False, threads=False)
+        return wide_to_long(data)
+
+
+class FixtureProvider(PriceProvider):
+    """
+    Serves bars from a local long-format file (CSV or Parquet), for tests and
+    benchmarks that must not depend on the network.
+    """
+
+    def __init__(self, path):
+        path = Path(path)
+        if path.suffix == '.csv':
+            prices = pd.read_csv(path, parse_dates=['Date'])
+        else:
+            prices = pd.read_parquet(path)
+        prices['Ticker'] = prices['Ticker'].astype(str)
+        self.prices = prices
+
+    def fetch(self, tickers, start, end):
+        prices = self.prices
+        mask = (prices['Ticker'].isin(tickers) & (prices['Date'] >= pd.Timestamp(start))
+                & (prices['Date'] < pd.Timestamp(end)))
+        return prices.loc[mask, ['Date', 'Ticker'] + PRICE_FIELDS].reset_index(drop=True)
+
+
+def wide_to_long(df):
+    """
+    Converts a wide (ticker, field) price frame, as returned by yfinance or
+    stored in the legacy CSV, into long (Date, Ticker, OHLCV) rows.
+    Rows without any price for a ticker are dropped.
+    """
+    if df.empty:
+        return pd.DataFrame(columns=['Date', 'Ticker'] + PRICE_FIELDS)
+    df = df.copy()
+    df.index.name = 'Date'
+    df.columns.names = ['Ticker', 'Price']
+    long_df = df.stack(level='Ticker', future_stack=True).dropna(how='all').reset_index()
+    long_df.columns.name = None
+    long_df['Date'] = pd.to_datetime(long_df['Date'])
+    return long_df[['Date', 'Ticker'] + PRICE_FIELDS]
+
+
+def plan_chunks(tickers, watermarks, start, end, chunk_size=CHUNK_SIZE):
+    """
+    Splits the universe into download chunks. Each ticker resumes the day
+    after its last ingested date; tickers sharing a resume date are fetched
+    together. Returns a list of (tickers, start) pairs.
+    """
+    by_start = {}
+    for ticker in tickers:
+        watermark = watermarks.get(ticker)
+        ticker_start = pd.Timestamp(start) if watermark is None else watermark + pd.Timedelta(days=1)
+        if ticker_start < pd.Timestamp(end):
+            by_start.setdefault(ticker_start, []).append(ticker)
+
+    chunks = []
+    for chunk_start, group in sorted(by_start.items()):
+        for i in range(0, len(group), chunk_size):
+            chunks.append((group[i:i + chunk_size], chunk_start))
+    return chunks
+
+
+@retry(stop=stop_after_attempt(MAX_ATTEMPTS), wait=wait_exponential(multiplier=1, max=30), reraise=True)
+def fetch_chunk(provider, tickers, start, end):
+    """
+    Fetches one chunk, retrying with exponential backoff.
+    """
+    return provider.fetch(tickers, start.strftime('%Y-%m-%d'), end)
+
+
+def fetch_ohlcv_data(tickers, start, end, save_path, provider=None, chunk_size=CHUNK_SIZE,
+                     max_workers=MAX_WORKERS):
+    """
+    Downloads the OHLCV bars missing from the price store and appends them.
+
+    The last ingested date of every ticker is read from the store itself, so
+    a run only fetches the range after it (and a ticker new to the universe
+    its full history). Chunks are downloaded concurrently and written as
+    soon as they arrive, so a failed chunk doesn't lose the others.
+    Returns the number of rows added per ticker.
+    """
+    provider = provider or YFinanceProvider()
+    watermarks = max_date_by_ticker(save_path, PRICE_PARTITION_COLS)
+    chunks = plan_chunks(tickers, watermarks, start, end, chunk_size)
+    if not chunks:
+        print("Price store is already up to date.")
+        return {}
+
+    print(f"Downloading OHLCV data for {sum(len(c[0]) for c in chunks)} tickers in {len(chunks)} chunks...")
+    added = {}
+    failed = []
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {pool.submit(fetch_chunk, provider, chunk_tickers, chunk_start, end): chunk_tickers
+                   for chunk_tickers, chunk_start in chunks}
+        for future in as_completed(futures):
+            chunk_tickers = futures[future]
+            try:
+                prices = future.result()
+            except Exception as e:
+                print(f"Chunk {chunk_tickers[0]}..{chunk_tickers[-1]} failed: {e}")
+                failed.extend(chunk_tickers)
+                continue
+
+            # Guard against providers returning bars we already have
+            prices = prices[prices['Date'] > prices['Ticker'].map(watermarks).fillna(pd.Timestamp.min)]
+            # Raw prices keep full float64 precision
+            append_dataset(prices, save_path, PRICE_PARTITION_COLS, compact=False)
+            added.update(prices.groupby('Ticker').size().to_dict())
+
+    print(f"Added {sum(added.values())} rows for {len(added)} tickers to {save_path}.")
+    if failed:
+        print(f"{len(failed)} tickers failed and will be retried on the next run: {failed}")
+    return added
+
+
+def load_prices(save_path=SAVE_PATH, start=None, end=None, tickers=None):
+    """
+    Reads long-format OHLCV rows from the price store. Only the partitions
+    and row groups matching the ticker and date filters are read.
+    """
+    return read_dataset(save_path, start=start, end=end, tickers=tickers,
+                        partition_cols=PRICE_PARTITION_COLS)
+
+
+def migrate_legacy_csv(csv_path=LEGACY_CSV_PATH, save_path=SAVE_PATH):
+    """
+    Imports the wide `full_stock_data.csv` into the price store, once.
+    """
+    if max_date_by_ticker(save_path, PRICE_PARTITION_COLS) or not Path(csv_path).exists():
+        return 0
+    wide = pd.read_csv(csv_path, header=[0, 1], index_col=0, parse_dates=True)
+    prices = wide_to_long(wide)
+    append_dataset(prices, save_path, PRICE_PARTITION_COLS, compact=False)
+    print(f"Migrated {len(prices)} rows from {csv_path} to {save_path}.")
+    return len(prices)
 
 
 if __name__ == '__main__':
-    fetch_ohlcv_data(tickers=TICKERS, start=START_DATE, end=END_DATE, save_path=SAVE_PATH)
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Download missing OHLCV bars into the price store.")
+    parser.add_argument('--fixture', type=Path, default=None,
+                        help="serve prices from a local long-format file instead of Yahoo Finance")
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+    parser.add_argument('--workers', type=int, default=MAX_WORKERS)
+    args = parser.parse_args()
+
+    migrate_legacy_csv()
+    provider = FixtureProvider(args.fixture) if args.fixture else YFinanceProvider()
+    fetch_ohlcv_data(tickers=TICKERS, start=START_DATE, end=END_DATE, save_path=SAVE_PATH,
+                     provider=provider, chunk_size=args.chunk_size, max_workers=args.workers)
@@ -0,0 +1,286 @@
+import hashlib
+import importlib
+import inspect
+import json
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from src.pipeline.profiling import StageProfile
+
+# --- File Paths ---
+BASE_DIR = Path(__file__).parent.parent.parent
+STATE_PATH = BASE_DIR / "data/processed/pipeline_state.json"
+
+# Only the repo's own modules are fingerprinted as stage code
+CODE_PACKAGE = 'src'
+HASH_BLOCK_SIZE = 1 << 20
+
+
+@dataclass
+class Stage:
+    """
+    One pipeline step: `func(**kwargs)` reads the `inputs` paths and writes
+    the `outputs` paths. Stages that pull from external sources (APIs)
+    cannot be fingerprinted and set `always_run`; their outputs are still
+    hashed, so downstream stages only rerun if the pull changed something.
+    """
+    name: str
+    func: object
+    kwargs: dict = field(default_factory=dict)
+    inputs: list = field(default_factory=list)
+    outputs: list = field(default_factory=list)
+    always_run: bool = False
+
+
+def _hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def path_fingerprint(path, file_hashes):
+    """
+    Content hash of a file or of every file under a directory, or None if
+    the path does not exist. File hashes are memoised in `file_hashes` by
+    (size, mtime), so unchanged files are not read again.
+    """
+    path = Path(path)
+    if not path.exists():
+        return None
+    files = [path] if path.is_file() else sorted(p for p in path.rglob('*') if p.is_file())
+    digest = hashlib.sha256()
+    for file in files:
+        stat = file.stat()
+        key = str(file.resolve())
+        cached = file_hashes.get(key)
+        if cached is None or cached[:2] != [stat.st_size, stat.st_mtime_ns]:
+            cached = [stat.st_size, stat.st_mtime_ns, _hash_file(file)]
+            file_hashes[key] = cached
+        name = file.name if file == path else file.relative_to(path).as_posix()
+        digest.update(f"{name}\0{cached[2]}\n".encode('utf-8'))
+    return digest.hexdigest()
+
+
+def code_modules(func):
+    """
+    The repo modules a stage function depends on: its own module and
+    every `src` module it references, transitively.
+    """
+    seen = set()
+    stack = [func.__module__]
+    while stack:
+        name = stack.pop()
+        if name in seen or not name.startswith(CODE_PACKAGE + '.'):
+            continue
+        seen.add(name)
+        module = importlib.import_module(name)
+        for value in vars(module).values():
+            source = value.__name__ if inspect.ismodule(value) else getattr(value, '__module__', None)
+            if isinstance(source, str):
+                stack.append(source)
+    return sorted(seen)
+
+
+def _run_stage(stage, profile=None):
+    # Runs in a worker thread, so the stage's section is the thread's outermost one
+    with StageProfile(stage.name, profile, stage=True):
+        return stage.func(**stage.kwargs)
+
+
+def _overlaps(a, b):
+    a, b = Path(a).resolve(), Path(b).resolve()
+    return a == b or a in b.parents or b in a.parents
+
+
+class Pipeline:
+    """
+    Runs stages as a DAG. Dependencies come from the declared paths: a
+    stage depends on every stage that writes one of its inputs.
+
+    A stage is skipped when the fingerprint of its code (its module and the
+    repo modules it uses), arguments and input contents matches the last
+    successful run and its outputs are unchanged since. Stages whose
+    dependencies are done run concurrently on a thread pool.
+    """
+
+    def __init__(self, stages, state_path=STATE_PATH):
+        self.stages = {stage.name: stage for stage in stages}
+        if len(self.stages) != len(stages):
+            raise ValueError("Stage names must be unique")
+        self.state_path = Path(state_path)
+        self.deps = {
+            stage.name: {other.name for other in stages if other is not stage
+                         and any(_overlaps(i, o) for i in stage.inputs for o in other.outputs)}
+            for stage in stages
+        }
+        self.order = self._topological_order()
+        self.state = self._load_state()
+
+    def _topological_order(self):
+        order, visiting, done = [], set(), set()
+
+        def visit(name):
+            if name in done:
+                return
+            if name in visiting:
+                raise ValueError(f"Pipeline has a cycle through stage '{name}'")
+            visiting.add(name)
+            for dep in sorted(self.deps[name]):
+                visit(dep)
+            visiting.discard(name)
+            done.add(name)
+            order.append(name)
+
+        for name in self.stages:
+            visit(name)
+        return order
+
+    def _load_state(self):
+        if self.state_path.exists():
+            with open(self.state_path, 'r') as f:
+                return json.load(f)
+        return {'stages': {}, 'files': {}}
+
+    def _save_state(self):
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.state_path.with_suffix('.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(self.state, f, indent=2, default=str)
+        tmp_path.replace(self.state_path)
+
+    def _ancestors(self, name):
+        found, stack = set(), [name]
+        while stack:
+            for dep in self.deps[stack.pop()]:
+                if dep not in found:
+                    found.add(dep)
+                    stack.append(dep)
+        return found
+
+    def select(self, start=None, until=None):
+        """
+        Stages of a partial run, in dependency order: `start` and everything
+        downstream of it, up to `until` and everything upstream of it.
+        """
+        for name in (start, until):
+            if name is not None and name not in self.stages:
+                raise ValueError(f"Unknown stage '{name}'. Stages: {', '.join(self.order)}")
+        selected = set(self.order)
+        if start is not None:
+            selected = {name for name in self.order if name == start or start in self._ancestors(name)}
+        if until is not None:
+            selected &= self._ancestors(until) | {until}
+        return [name for name in self.order if name in selected]
+
+    def fingerprint(self, stage):
+        files = self.state['files']
+        digest = hashlib.sha256()
+        for module in code_modules(stage.func):
+            source = Path(inspect.getsourcefile(importlib.import_module(module)))
+            digest.update(f"{module}\0{path_fingerprint(source, files)}\n".encode('utf-8'))
+        digest.update(f"{stage.func.__qualname__}\0{json.dumps(stage.kwargs, sort_keys=True, default=str)}\n"
+                      .encode('utf-8'))
+        for path in stage.inputs:
+            digest.update(f"{path}\0{path_fingerprint(path, files)}\n".encode('utf-8'))
+        return digest.hexdigest()[:16]
+
+    def outputs_fingerprint(self, stage):
+        files = self.state['files']
+        return [path_fingerprint(path, files) for path in stage.outputs]
+
+    def is_up_to_date(self, stage, fingerprint):
+        last = self.state['stages'].get(stage.name)
+        if stage.always_run or last is None or last.get('fingerprint') != fingerprint:
+            return False
+        outputs = self.outputs_fingerprint(stage)
+        return None not in outputs and outputs == last.get('outputs')
+
+    def run(self, start=None, until=None, force=False, workers=None, dry_run=False, profile=None):
+        """
+        Runs the selected stages and returns one report row per stage.
+        Stages downstream of a failure are not run. Every stage that runs
+        is measured with a `StageProfile` (and profiled with `profile`).
+        """
+        selected = self.select(start, until)
+        pending = list(selected)
+        done, failed = set(), set()
+        report = {}
+        run_start = time.perf_counter()
+
+        def ready(name):
+            return all(dep in done or dep in failed or dep not in selected for dep in self.deps[name])
+
+        with ThreadPoolExecutor(max_workers=workers or max(1, len(selected))) as pool:
+            running = {}
+            while pending or running:
+                for name in [name for name in pending if ready(name)]:
+                    pending.remove(name)
+                    stage = self.stages[name]
+                    if self.deps[name] & failed:
+                        failed.add(name)
+                        report[name] = {'stage': name, 'status': 'blocked', 'seconds': 0.0}
+                        continue
+                    fingerprint = self.fingerprint(stage)
+                    # In a dry run, stages after one that would run would see new inputs
+                    upstream_runs = dry_run and any(report.get(dep, {}).get('status') == 'would run'
+                                                    for dep in self.deps[name])
+                    if not force and not upstream_runs and self.is_up_to_date(stage, fingerprint):
+                        done.add(name)
+                        report[name] = {'stage': name, 'status': 'up to date', 'seconds': 0.0}
+                        continue
+                    if dry_run:
+                        done.add(name)
+                        report[name] = {'stage': name, 'status': 'would run', 'seconds': 0.0}
+                        continue
+                    print(f"[pipeline] Starting {name}...")
+                    started = time.perf_counter()
+                    running[pool.submit(_run_stage, stage, profile)] = (name, fingerprint, started)
+
+                if not running:
+                    continue
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    name, fingerprint, started = running.pop(future)
+                    seconds = time.perf_counter() - started
+                    row = {'stage': name, 'seconds': seconds, 'started_at': started - run_start}
+                    try:
+                        future.result()
+                    except Exception as e:
+                        print(f"[pipeline] {name} failed: {e!r}")
+                        failed.add(name)
+                        report[name] = {**row, 'status': 'failed', 'error': repr(e)}
+                        continue
+                    done.add(name)
+                    report[name] = {**row, 'status': 'ran'}
+                    self.state['stages'][name] = {
+                        'fingerprint': fingerprint,
+                        'outputs': self.outputs_fingerprint(self.stages[name]),
+                        'seconds': seconds,
+                        'finished_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                    }
+                    self._save_state()
+
+        rows = [report[name] for name in selected]
+        self.state['last_run'] = {'finished_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                                  'seconds': time.perf_counter() - run_start, 'stages': rows}
+        if not dry_run:
+            self._save_state()
+        return rows
+
+
+def print_report(rows, total_seconds=None):
+    """
+    Prints the per-stage timing report of a run.
+    """
+    print("\n--- Pipeline Report ---")
+    print(f"{'stage':<22} {'status':<11} {'start (s)':>10} {'time (s)':>10}")
+    for row in rows:
+        started = f"{row['started_at']:.2f}" if 'started_at' in row else '-'
+        print(f"{row['stage']:<22} {row['status']:<11} {started:>10} {row['seconds']:>10.2f}")
+    if total_seconds is not None:
+        busy = sum(row['seconds'] for row in rows)
+        print(f"Wall time: {total_seconds:.2f} s (stage time: {busy:.2f} s)")
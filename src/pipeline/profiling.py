@@ -0,0 +1,277 @@
+import cProfile
+import contextvars
+import functools
+import json
+import os
+import resource
+import shutil
+import signal
+import subprocess
+import threading
+import time
+import uuid
+from pathlib import Path
+
+# --- File Paths ---
+BASE_DIR = Path(__file__).parent.parent.parent
+RUN_LOG_PATH = BASE_DIR / "data/processed/run_log.jsonl"
+PROFILE_DIR = BASE_DIR / "data/processed/profiles"
+
+# --- Profiling Configuration ---
+# Set per process, e.g. RUN_LOG_PATH=/tmp/run.jsonl PIPELINE_PROFILE=cprofile
+RUN_LOG_ENV = 'RUN_LOG_PATH'
+PROFILE_ENV = 'PIPELINE_PROFILE'
+PROFILE_DIR_ENV = 'PROFILE_DIR'
+# 'cprofile' writes a pstats .prof file (snakeviz, gprof2dot, python -m pstats);
+# 'py-spy' samples the process with py-spy into a speedscope JSON file
+PROFILERS = ['cprofile', 'py-spy']
+# Ties together the records of one process (e.g. every stage of a pipeline run)
+RUN_ID = os.getenv('PIPELINE_RUN_ID') or uuid.uuid4().hex[:12]
+
+_current = contextvars.ContextVar('profiled_section', default=None)
+_log_lock = threading.Lock()
+# Sections running right now (any thread); the peak RSS is only reset when
+# nothing else is being measured, and only one profiler runs at a time
+_state_lock = threading.Lock()
+_active = 0
+_profiling = False
+
+
+def current_rss_mb():
+    return _proc_status_mb('VmRSS:')
+
+
+def peak_rss_mb():
+    """
+    Peak resident memory of this process. VmHWM belongs to the current
+    address space, whereas ru_maxrss also counts the parent's peak before
+    the fork, so it is only the fallback where /proc is missing.
+    """
+    peak = _proc_status_mb('VmHWM:')
+    if peak is None:
+        # ru_maxrss is reported in kilobytes on Linux
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return peak
+
+
+def _proc_status_mb(field):
+    try:
+        with open('/proc/self/status', 'r') as f:
+            for line in f:
+                if line.startswith(field):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def reset_peak_rss():
+    """
+    Resets the process's peak RSS to its current RSS (Linux 4.0+).
+    Returns False where that is not supported.
+    """
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def record_rows(rows):
+    """
+    Adds `rows` to the row count of the innermost profiled section of this
+    thread. Does nothing outside of one, so pipeline functions can always call it.
+    """
+    section = _current.get()
+    if section is not None:
+        section.rows += int(rows)
+
+
+def record_fields(**fields):
+    """
+    Adds extra fields (e.g. cache hits) to the record of the innermost
+    profiled section of this thread. Does nothing outside of one.
+    """
+    section = _current.get()
+    if section is not None:
+        section.fields.update(fields)
+
+
+def run_log_path(log_path=None):
+    """
+    The run log in use: `log_path`, else RUN_LOG_PATH from the environment,
+    else the default.
+    """
+    return Path(log_path or os.getenv(RUN_LOG_ENV) or RUN_LOG_PATH)
+
+
+def write_record(record, log_path=None):
+    """
+    Appends one JSON record to the run log.
+    """
+    log_path = run_log_path(log_path)
+    line = json.dumps(record, default=str)
+    with _log_lock:
+        log_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(log_path, 'a') as f:
+            f.write(line + '\n')
+
+
+class StageProfile:
+    """
+    Context manager measuring one section of a batch job: wall time, CPU
+    time, peak RSS and the rows it processed (see `record_rows`). On exit it
+    appends a record to the JSONL run log, also when the section fails.
+
+    CPU time is the whole process's, so it includes the native threads of
+    XGBoost or BLAS. The peak RSS is the section's own when it runs alone;
+    while other sections run concurrently it is the process's peak.
+
+    With `profile` ('cprofile' or 'py-spy'; default: the PIPELINE_PROFILE
+    environment variable) the section is also profiled and the dump path is
+    added to the record. Nested sections are not profiled again.
+    """
+
+    def __init__(self, name, profile=None, log_path=None, **fields):
+        profile = profile if profile is not None else os.getenv(PROFILE_ENV) or None
+        if profile is not None and profile not in PROFILERS:
+            raise ValueError(f"Unknown profiler '{profile}', expected one of {PROFILERS}")
+        self.name = name
+        self.profile = profile
+        self.log_path = log_path
+        self.fields = fields
+        self.rows = 0
+        self.record = None
+
+    def __enter__(self):
+        global _active
+        self.parent = _current.get()
+        self._token = _current.set(self)
+        ancestors, section = [], self.parent
+        while section is not None:
+            ancestors.append(section)
+            section = section.parent
+        with _state_lock:
+            # The reset below would lose the enclosing sections' peak so far
+            peak = peak_rss_mb()
+            for ancestor in ancestors:
+                ancestor._peak = max(ancestor._peak, peak)
+            # Only this thread's enclosing sections are running
+            alone = _active == len(ancestors)
+            self.peak_scope = 'section' if alone and reset_peak_rss() else 'process'
+            _active += 1
+        self._peak = current_rss_mb() or 0.0
+        self.dump_path = self._start_profiler()
+        self.started_at = time.strftime('%Y-%m-%dT%H:%M:%S')
+        self._cpu_start, self._wall_start = time.process_time(), time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        global _active
+        wall_seconds = time.perf_counter() - self._wall_start
+        cpu_seconds = time.process_time() - self._cpu_start
+        self._stop_profiler()
+        with _state_lock:
+            _active -= 1
+            peak = max(self._peak, peak_rss_mb())
+        _current.reset(self._token)
+        if self.parent is not None:
+            self.parent._peak = max(self.parent._peak, peak)
+            self.parent.rows += self.rows
+
+        self.record = {
+            'run_id': RUN_ID,
+            'pid': os.getpid(),
+            'name': self.name,
+            'parent': self.parent.name if self.parent is not None else None,
+            'started_at': self.started_at,
+            'status': 'failed' if exc_type is not None else 'ok',
+            'wall_seconds': wall_seconds,
+            'cpu_seconds': cpu_seconds,
+            'peak_rss_mb': peak,
+            'peak_rss_scope': self.peak_scope,
+            'rows': self.rows,
+            'rows_per_sec': self.rows / wall_seconds if self.rows and wall_seconds else None,
+            'profile': str(self.dump_path) if self.dump_path else None,
+            **self.fields,
+        }
+        if exc_type is not None:
+            self.record['error'] = repr(exc)
+        write_record(self.record, self.log_path)
+        return False
+
+    # --- Profilers ---
+    def _start_profiler(self):
+        global _profiling
+        self._profiler = self._sampler = None
+        if self.profile is None:
+            return None
+        with _state_lock:
+            if _profiling:
+                return None
+            _profiling = True
+
+        profile_dir = Path(os.getenv(PROFILE_DIR_ENV) or PROFILE_DIR)
+        profile_dir.mkdir(parents=True, exist_ok=True)
+        stem = f"{self.name}-{time.strftime('%Y%m%d-%H%M%S')}-{RUN_ID}"
+        if self.profile == 'cprofile':
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+            return profile_dir / f"{stem}.prof"
+
+        if shutil.which('py-spy') is None:
+            print("py-spy is not installed (pip install py-spy); profiling skipped.")
+            with _state_lock:
+                _profiling = False
+            return None
+        dump_path = profile_dir / f"{stem}.speedscope.json"
+        self._sampler = subprocess.Popen(['py-spy', 'record', '--pid', str(os.getpid()), '--format', 'speedscope',
+                                          '--output', str(dump_path), '--subprocesses', '--nonblocking'],
+                                         stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        return dump_path
+
+    def _stop_profiler(self):
+        global _profiling
+        if self._profiler is None and self._sampler is None:
+            return
+        if self._profiler is not None:
+            self._profiler.disable()
+            self._profiler.dump_stats(self.dump_path)
+        else:
+            # py-spy writes its output when interrupted
+            self._sampler.send_signal(signal.SIGINT)
+            self._sampler.wait()
+        with _state_lock:
+            _profiling = False
+
+
+def profiled(name=None, rows=None, profile=None, log_path=None):
+    """
+    Decorator running every call of a function inside a `StageProfile`
+    named after it. `rows`, if given, maps the return value to the number
+    of rows processed (e.g. `rows=len`); otherwise the function can report
+    them with `record_rows`.
+    """
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with StageProfile(name or func.__qualname__, profile, log_path) as section:
+                result = func(*args, **kwargs)
+                if rows is not None:
+                    section.rows += int(rows(result))
+                return result
+        return wrapper
+    return decorate
+
+
+def read_run_log(log_path=None, run_id=None):
+    """
+    Records of the run log, optionally only those of one run.
+    """
+    log_path = run_log_path(log_path)
+    if not log_path.exists():
+        return []
+    with open(log_path, 'r') as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    return [record for record in records if run_id is None or record.get('run_id') == run_id]
@@ -0,0 +1,101 @@
+import argparse
+import os
+import time
+from pathlib import Path
+
+from src.api.snapshot import SNAPSHOT_PATH, build_snapshot
+from src.backtest.run_advanced_backtest import PLOT_SAVE_PATH as ADVANCED_PLOT_PATH, run_advanced_backtest
+from src.backtest.run_backtest import PLOT_SAVE_PATH as BACKTEST_PLOT_PATH, run_backtest
+from src.features.build_features import FEATURES_PATH as TECH_FEATURES_PATH, RAW_DATA_PATH, generate_features
+from src.features.build_sentiment_features import (FEATURES_PATH as SENTIMENT_FEATURES_PATH, NEWS_DATA_DIR,
+                                                   TICKERS as NEWS_TICKERS, generate_sentiment_scores)
+from src.features.combine_features import FINAL_FEATURES_PATH, combine_features
+from src.features.create_labels import LABELED_DATA_PATH
+from src.features.incremental_features import STATE_PATH as FEATURE_STATE_PATH
+from src.inference.explain import CONTRIBUTIONS_PATH, write_contributions
+from src.ingestion.news_ingest import END_DATE as NEWS_END_DATE, SEARCH_QUERIES, START_DATE as NEWS_START_DATE, fetch_news
+from src.ingestion.price_ingest import (END_DATE, START_DATE, TICKERS, FixtureProvider, fetch_ohlcv_data)
+from src.pipeline.dag import STATE_PATH, Pipeline, Stage, print_report
+from src.pipeline.profiling import PROFILERS, RUN_ID, run_log_path
+from src.training.train import MODEL_PATH, train_model
+
+
+def build_stages(price_fixture=None):
+    """
+    The ingestion -> features -> labels -> training -> backtest pipeline.
+    Prices/technical features and news/sentiment are independent branches
+    until they are combined.
+    """
+    return [
+        Stage('ingest_prices', fetch_ohlcv_data,
+              {'tickers': TICKERS, 'start': START_DATE, 'end': END_DATE, 'save_path': RAW_DATA_PATH,
+               'provider': FixtureProvider(price_fixture) if price_fixture else None},
+              outputs=[RAW_DATA_PATH], always_run=True),
+        Stage('ingest_news', fetch_news,
+              {'api_key': os.getenv("NEWSAPI_KEY"), 'queries': SEARCH_QUERIES, 'start_date': NEWS_START_DATE,
+               'end_date': NEWS_END_DATE, 'save_dir': NEWS_DATA_DIR},
+              outputs=[NEWS_DATA_DIR], always_run=True),
+        Stage('technical_features', generate_features,
+              {'raw_data_path': RAW_DATA_PATH, 'features_path': TECH_FEATURES_PATH, 'incremental': True},
+              inputs=[RAW_DATA_PATH], outputs=[TECH_FEATURES_PATH, FEATURE_STATE_PATH]),
+        Stage('sentiment_features', generate_sentiment_scores,
+              {'news_dir': NEWS_DATA_DIR, 'tickers': NEWS_TICKERS, 'features_path': SENTIMENT_FEATURES_PATH},
+              inputs=[NEWS_DATA_DIR], outputs=[SENTIMENT_FEATURES_PATH]),
+        Stage('combine_and_label', combine_features,
+              {'tech_path': TECH_FEATURES_PATH, 'sentiment_path': SENTIMENT_FEATURES_PATH,
+               'final_path': FINAL_FEATURES_PATH, 'labeled_path': LABELED_DATA_PATH},
+              inputs=[TECH_FEATURES_PATH, SENTIMENT_FEATURES_PATH], outputs=[FINAL_FEATURES_PATH, LABELED_DATA_PATH]),
+        Stage('train', train_model,
+              {'labeled_data_path': LABELED_DATA_PATH, 'model_path': MODEL_PATH},
+              inputs=[LABELED_DATA_PATH], outputs=[MODEL_PATH, MODEL_PATH.with_suffix('.json')]),
+        Stage('backtest', run_backtest,
+              {'labeled_data_path': LABELED_DATA_PATH, 'model_path': MODEL_PATH, 'plot_save_path': BACKTEST_PLOT_PATH},
+              inputs=[LABELED_DATA_PATH, MODEL_PATH], outputs=[BACKTEST_PLOT_PATH]),
+        Stage('advanced_backtest', run_advanced_backtest,
+              {'labeled_data_path': LABELED_DATA_PATH, 'model_path': MODEL_PATH, 'plot_save_path': ADVANCED_PLOT_PATH},
+              inputs=[LABELED_DATA_PATH, MODEL_PATH], outputs=[ADVANCED_PLOT_PATH]),
+        Stage('snapshot', build_snapshot,
+              {'data_path': LABELED_DATA_PATH, 'model_path': MODEL_PATH, 'snapshot_path': SNAPSHOT_PATH},
+              inputs=[LABELED_DATA_PATH, MODEL_PATH], outputs=[SNAPSHOT_PATH]),
+        Stage('contributions', write_contributions,
+              {'data_path': LABELED_DATA_PATH, 'model_path': MODEL_PATH, 'contributions_path': CONTRIBUTIONS_PATH},
+              inputs=[LABELED_DATA_PATH, MODEL_PATH], outputs=[CONTRIBUTIONS_PATH]),
+    ]
+
+
+def run_pipeline(start=None, until=None, force=False, workers=None, dry_run=False, price_fixture=None,
+                 state_path=STATE_PATH, profile=None):
+    """
+    Runs the pipeline (or the part of it between `start` and `until`),
+    skipping the stages whose code, arguments and inputs are unchanged
+    since their last successful run, and prints a per-stage timing report.
+    Wall time, CPU time, peak RSS and rows of every stage go to the JSONL
+    run log; with `profile` each stage also writes a profiler dump.
+    """
+    pipeline = Pipeline(build_stages(price_fixture), state_path)
+    run_start = time.perf_counter()
+    rows = pipeline.run(start=start, until=until, force=force, workers=workers, dry_run=dry_run, profile=profile)
+    print_report(rows, time.perf_counter() - run_start)
+    if not dry_run:
+        print(f"Run {RUN_ID} logged to {run_log_path()}")
+    failed = [row['stage'] for row in rows if row['status'] in ('failed', 'blocked')]
+    if failed:
+        raise SystemExit(f"Pipeline stages did not complete: {', '.join(failed)}")
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the data and model pipeline, skipping up-to-date stages.")
+    parser.add_argument('--from', dest='start', default=None, help="run this stage and everything downstream")
+    parser.add_argument('--until', default=None, help="stop after this stage (and what it depends on)")
+    parser.add_argument('--force', action='store_true', help="rerun the selected stages even if up to date")
+    parser.add_argument('--workers', type=int, default=None, help="stages run at the same time")
+    parser.add_argument('--dry-run', action='store_true', help="only show which stages would run")
+    parser.add_argument('--price-fixture', type=Path, default=None,
+                        help="ingest prices from a local long-format file instead of Yahoo Finance")
+    parser.add_argument('--profile', choices=PROFILERS, default=None,
+                        help="also write a profiler dump of every stage that runs")
+    args = parser.parse_args()
+
+    run_pipeline(start=args.start, until=args.until, force=args.force, workers=args.workers,
+                 dry_run=args.dry_run, price_fixture=args.price_fixture, profile=args.profile)
@@ -0,0 +1,256 @@
+import cvxpy as cp
+import numpy as np
+from scipy.cluster.hierarchy import leaves_list, linkage
+from scipy.spatial.distance import squareform
+
+from src.features.create_labels import HORIZON_DAYS
+
+# --- Optimizer Configuration ---
+LOOKBACK_DAYS = 60        # Returns used for the covariance estimate
+HALFLIFE_DAYS = 20        # EWMA half-life of the covariance estimate
+SHRINKAGE = 0.2           # Weight of the diagonal target in the shrunk covariance
+# Information coefficient: how much of one daily standard deviation a
+# fully confident view (probability 0 or 1) is worth in expected return
+VIEW_IC = 0.05
+RISK_AVERSION = 2.0
+TURNOVER_PENALTY = 0.0002 # Objective cost per unit of weight traded
+MAX_WEIGHT = 0.4          # Position cap per ticker
+# Views and risk are expressed over the model's horizon: a position is held
+# for about that long, while its turnover cost is paid once. Over a single
+# day the views are too small to ever pay for getting into a position.
+HOLDING_DAYS = HORIZON_DAYS
+# Weights below this fraction of the invested total are solver dust
+DUST_FRACTION = 1e-4
+
+
+def confidence_views(proba, volatility, ic=VIEW_IC):
+    """
+    Turns UP probabilities into expected daily returns: a ticker's view is
+    its edge (2p - 1) scaled by its volatility and the information coefficient.
+    Missing probabilities are a neutral view.
+    """
+    edge = np.nan_to_num(2 * np.asarray(proba, dtype=np.float64) - 1)
+    return ic * edge * volatility
+
+
+def covariance_factor(returns, halflife=HALFLIFE_DAYS, shrinkage=SHRINKAGE):
+    """
+    Low-rank factor of the shrunk EWMA covariance of a (days x tickers)
+    return window: Sigma = X'X + diag(d^2), with X (days x tickers) the
+    weighted, centered returns and d the diagonal shrinkage term.
+    Missing returns count as zero; a ticker without any history gets the
+    average variance so the matrix stays positive definite.
+    """
+    returns = np.asarray(returns, dtype=np.float64)
+    valid = ~np.isnan(returns)
+    returns = np.where(valid, returns, 0.0)
+    decay = 0.5 ** (1 / halflife)
+    weights = decay ** np.arange(len(returns) - 1, -1, -1)
+    weights /= weights.sum()
+
+    centered = returns - weights @ returns
+    factor = np.sqrt(weights)[:, None] * centered
+    variances = np.einsum('ij,ij->j', factor, factor)
+    observed = valid.any(axis=0) & (variances > 0)
+    fallback = variances[observed].mean() if observed.any() else 1e-4
+    factor[:, ~observed] = 0.0
+
+    # Off the diagonal only (1 - shrinkage) of the sample covariance is kept;
+    # the diagonal keeps the full variance
+    diagonal = np.where(observed, np.sqrt(shrinkage * variances), np.sqrt(fallback))
+    return np.sqrt(1 - shrinkage) * factor, diagonal
+
+
+def estimate_covariance(returns, halflife=HALFLIFE_DAYS, shrinkage=SHRINKAGE):
+    """
+    EWMA covariance of a (days x tickers) return window, shrunk towards its
+    diagonal (see `covariance_factor`).
+    """
+    factor, diagonal = covariance_factor(returns, halflife, shrinkage)
+    return factor.T @ factor + np.diag(diagonal ** 2)
+
+
+class MeanVarianceOptimizer:
+    """
+    Long-only mean-variance allocation with a turnover penalty and position caps:
+
+        maximize  mu'w - risk_aversion * w'Sigma w - turnover_penalty * |w - w_prev|_1
+        s.t.      0 <= w <= cap,  sum(w) <= 1  (sum(w) == 1 if fully invested)
+
+    The problem is built once with cvxpy Parameters for mu, the covariance
+    factor, the previous weights and the caps (DPP), so cvxpy compiles it
+    only on the first solve and OSQP is warm-started from the previous
+    day's solution on every later one. Compiling costs several solves on
+    large universes, so with `dpp=False` (for one-off solves) the
+    parameter values are substituted each time instead. Tickers with a cap
+    of 0 (e.g. not trading that day) are excluded; unspent weight stays in
+    cash, unless `fully_invested` (then only what the caps can't absorb does).
+    """
+
+    def __init__(self, n_assets, risk_aversion=RISK_AVERSION, turnover_penalty=TURNOVER_PENALTY,
+                 max_weight=MAX_WEIGHT, lookback=LOOKBACK_DAYS, dpp=True, fully_invested=False):
+        self.n_assets = n_assets
+        self.max_weight = max_weight
+        self.dpp = dpp
+        self.mu = cp.Parameter(n_assets)
+        # w'Sigma w = ||X w||^2 + ||d * w||^2 with the low-rank factor of `covariance_factor`:
+        # (lookback + 1) x n_assets parameters instead of the n_assets^2 of a Cholesky factor
+        self.factor = cp.Parameter((lookback, n_assets))
+        self.diagonal = cp.Parameter(n_assets, nonneg=True)
+        self.prev_weights = cp.Parameter(n_assets)
+        self.caps = cp.Parameter(n_assets, nonneg=True)
+        # Lower bound of the invested total: 0, or what the caps allow of 1 if fully invested
+        self.fully_invested = fully_invested
+        self.budget = cp.Parameter(nonneg=True)
+        self.weights = cp.Variable(n_assets)
+
+        objective = (self.mu @ self.weights
+                     - risk_aversion * (cp.sum_squares(self.factor @ self.weights)
+                                        + cp.sum_squares(cp.multiply(self.diagonal, self.weights)))
+                     - turnover_penalty * cp.norm1(self.weights - self.prev_weights))
+        constraints = [self.weights >= 0, self.weights <= self.caps, cp.sum(self.weights) <= 1,
+                       cp.sum(self.weights) >= self.budget]
+        self.problem = cp.Problem(cp.Maximize(objective), constraints)
+        self.solves = 0
+
+    def solve(self, mu, factor, diagonal, prev_weights=None, available=None):
+        """
+        Returns the optimal weights for one rebalance, given the covariance
+        as returned by `covariance_factor`. Falls back to the previous
+        weights if the solver fails.
+        """
+        prev_weights = np.zeros(self.n_assets) if prev_weights is None else prev_weights
+        available = np.ones(self.n_assets, dtype=bool) if available is None else available
+
+        self.mu.value = np.where(available, mu, 0.0)
+        self.factor.value = factor
+        self.diagonal.value = diagonal
+        self.prev_weights.value = prev_weights
+        self.caps.value = np.where(available, self.max_weight, 0.0)
+        self.budget.value = min(1.0, self.caps.value.sum()) if self.fully_invested else 0.0
+        self.problem.solve(solver=cp.OSQP, warm_start=True, ignore_dpp=not self.dpp)
+        self.solves += 1
+
+        if self.weights.value is None or self.problem.status not in ('optimal', 'optimal_inaccurate'):
+            return prev_weights
+        weights = np.clip(self.weights.value, 0.0, self.max_weight) * available
+        # Drop solver dust so it doesn't show up as turnover
+        weights[weights < DUST_FRACTION * weights.sum()] = 0.0
+        return weights
+
+
+def hrp_weights(cov, max_weight=MAX_WEIGHT):
+    """
+    Hierarchical risk parity: clusters tickers on correlation distance,
+    orders them along the dendrogram and splits the budget by recursive
+    bisection in inverse proportion to each half's variance. Weights above
+    `max_weight` are capped and the excess spread over the others.
+    """
+    n_assets = len(cov)
+    if n_assets == 1:
+        return np.ones(1)
+    std = np.sqrt(np.diag(cov))
+    corr = np.clip(cov / np.outer(std, std), -1.0, 1.0)
+    distance = np.sqrt(np.clip((1 - corr) / 2, 0.0, None))
+    np.fill_diagonal(distance, 0.0)
+    order = leaves_list(linkage(squareform(distance, checks=False), method='single'))
+
+    weights = np.ones(n_assets)
+    clusters = [order]
+    while clusters:
+        clusters = [half for cluster in clusters if len(cluster) > 1
+                    for half in (cluster[:len(cluster) // 2], cluster[len(cluster) // 2:])]
+        for left, right in zip(clusters[::2], clusters[1::2]):
+            left_var, right_var = _cluster_variance(cov, left), _cluster_variance(cov, right)
+            alpha = 1 - left_var / (left_var + right_var)
+            weights[left] *= alpha
+            weights[right] *= 1 - alpha
+    return cap_weights(weights, max_weight)
+
+
+def _cluster_variance(cov, members):
+    sub = cov[np.ix_(members, members)]
+    inverse_var = 1 / np.diag(sub)
+    w = inverse_var / inverse_var.sum()
+    return w @ sub @ w
+
+
+def cap_weights(weights, max_weight):
+    """
+    Caps weights at `max_weight`, redistributing the excess proportionally
+    over the uncapped ones. Keeps the total unless every weight is capped.
+    """
+    weights = np.asarray(weights, dtype=np.float64).copy()
+    for _ in range(len(weights)):
+        over = weights > max_weight + 1e-12
+        if not over.any():
+            break
+        excess = (weights[over] - max_weight).sum()
+        weights[over] = max_weight
+        under = weights < max_weight
+        if not under.any() or weights[under].sum() <= 0:
+            break
+        weights[under] += excess * weights[under] / weights[under].sum()
+    return weights
+
+
+def optimized_weights(returns, proba, method='mean_variance', lookback=LOOKBACK_DAYS, halflife=HALFLIFE_DAYS,
+                      shrinkage=SHRINKAGE, ic=VIEW_IC, risk_aversion=RISK_AVERSION,
+                      turnover_penalty=TURNOVER_PENALTY, max_weight=MAX_WEIGHT, threshold=0.5,
+                      holding_days=HOLDING_DAYS, fully_invested=False):
+    """
+    Target weights for every day of a (days x tickers) panel. The weights
+    of day t only use the returns up to day t-1 and the probabilities of
+    day t-1. 'mean_variance' solves the optimizer above each day; 'hrp'
+    allocates risk parity weights over the tickers whose previous-day
+    probability exceeds `threshold`. Days without `lookback` returns of
+    history are left in cash. The mean-variance views and covariance are
+    scaled to `holding_days`.
+    """
+    n_days, n_assets = returns.shape
+    weights = np.zeros((n_days, n_assets))
+    # Compiling the parametrized problem only pays off over several solves
+    optimizer = (MeanVarianceOptimizer(n_assets, risk_aversion, turnover_penalty, max_weight, lookback,
+                                       dpp=n_days - lookback > 2, fully_invested=fully_invested)
+                 if method == 'mean_variance' else None)
+
+    prev = np.zeros(n_assets)
+    for t in range(lookback + 1, n_days):
+        window = returns[t - lookback:t]
+        available = ~np.isnan(returns[t]) & ~np.isnan(proba[t - 1]) & (~np.isnan(window)).any(axis=0)
+        if not available.any():
+            continue
+        factor, diagonal = covariance_factor(window, halflife, shrinkage)
+
+        if method == 'mean_variance':
+            volatility = np.sqrt(np.einsum('ij,ij->j', factor, factor) + diagonal ** 2)
+            mu = confidence_views(proba[t - 1], volatility, ic)
+            prev = optimizer.solve(holding_days * mu, np.sqrt(holding_days) * factor,
+                                   np.sqrt(holding_days) * diagonal, prev, available)
+        elif method == 'hrp':
+            cov = factor.T @ factor + np.diag(diagonal ** 2)
+            selected = available & (proba[t - 1] > threshold)
+            prev = np.zeros(n_assets)
+            if selected.any():
+                prev[selected] = hrp_weights(cov[np.ix_(selected, selected)], max_weight)
+        else:
+            raise ValueError(f"Unknown optimization method: {method}")
+        weights[t] = prev
+    return weights
+
+
+def target_weights(returns, proba, method='mean_variance', **params):
+    """
+    Target weights for the next session, from the (days x tickers) return
+    history and the latest probabilities: the live counterpart of
+    `optimized_weights`, run for one extra day.
+    """
+    returns = np.asarray(returns, dtype=np.float64)
+    proba = np.asarray(proba, dtype=np.float64)
+    panel_proba = np.full((len(returns) + 1, returns.shape[1]), np.nan)
+    panel_proba[-2] = proba
+    # Every ticker with a probability today is assumed to trade tomorrow
+    next_day = np.where(np.isnan(proba), np.nan, 0.0)
+    panel_returns = np.vstack([returns, next_day])
+    lookback = min(params.pop('lookback', LOOKBACK_DAYS), len(returns) - 1)
+    return optimized_weights(panel_returns, panel_proba, method, lookback=lookback, **params)[-1]
@@ -0,0 +1,234 @@
+import bisect
+from collections import deque
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+from src.portfolio.optimizer import HALFLIFE_DAYS
+
+# --- Risk Configuration ---
+TRADING_DAYS = 252
+RISK_WINDOW = 63          # Trading days of the rolling Sharpe, VaR and turnover (about a quarter)
+VAR_LEVEL = 0.95          # Confidence level of the daily VaR figures
+
+
+class EWMACovariance:
+    """
+    Exponentially weighted mean and covariance of daily asset returns,
+    updated in place with one O(N^2) rank-one update per day. Missing
+    returns count as zero.
+    """
+
+    def __init__(self, n_assets, halflife=HALFLIFE_DAYS):
+        self.decay = 0.5 ** (1 / halflife)
+        self.mean = np.zeros(n_assets)
+        self.cov = np.zeros((n_assets, n_assets))
+        self.count = 0
+
+    def update(self, returns):
+        returns = np.nan_to_num(np.asarray(returns, dtype=np.float64))
+        if self.count == 0:
+            self.mean[:] = returns
+        else:
+            diff = returns - self.mean
+            self.mean += (1 - self.decay) * diff
+            self.cov *= self.decay
+            self.cov += self.decay * (1 - self.decay) * np.outer(diff, diff)
+        self.count += 1
+        return self.cov
+
+    def update_many(self, returns):
+        """
+        Same result as calling `update` for every row of a (days x assets)
+        array, but the covariance is accumulated in one matrix product
+        instead of one rank-one update per day.
+        """
+        returns = np.nan_to_num(np.atleast_2d(np.asarray(returns, dtype=np.float64)))
+        if self.count == 0 and len(returns):
+            self.update(returns[0])
+            returns = returns[1:]
+        if not len(returns):
+            return self.cov
+
+        # The deviations from the running mean are still found day by day (O(N) each)
+        diffs = np.empty_like(returns)
+        for day, row in enumerate(returns):
+            diffs[day] = row - self.mean
+            self.mean += (1 - self.decay) * diffs[day]
+        n_days = len(returns)
+        scale = self.decay * (1 - self.decay) * self.decay ** np.arange(n_days - 1, -1, -1)
+        self.cov *= self.decay ** n_days
+        self.cov += (diffs * scale[:, None]).T @ diffs
+        self.count += n_days
+        return self.cov
+
+
+class RollingCovariance:
+    """
+    Covariance of the last `window` daily asset returns, kept as running
+    sums: each day adds the new return's outer product and subtracts the
+    one leaving the window, so an update is O(N^2) whatever the history.
+    """
+
+    def __init__(self, n_assets, window=RISK_WINDOW):
+        self.window = window
+        self.buffer = np.zeros((window, n_assets))
+        self.sum = np.zeros(n_assets)
+        self.sum_products = np.zeros((n_assets, n_assets))
+        self.count = 0
+
+    def update(self, returns):
+        returns = np.nan_to_num(np.asarray(returns, dtype=np.float64))
+        slot = self.count % self.window
+        if self.count >= self.window:
+            old = self.buffer[slot]
+            self.sum -= old
+            self.sum_products -= np.outer(old, old)
+        self.buffer[slot] = returns
+        self.sum += returns
+        self.sum_products += np.outer(returns, returns)
+        self.count += 1
+        return self.cov
+
+    @property
+    def cov(self):
+        n = min(self.count, self.window)
+        if n < 2:
+            return np.zeros_like(self.sum_products)
+        return (self.sum_products - np.outer(self.sum, self.sum) / n) / (n - 1)
+
+
+class RollingStats:
+    """
+    Mean, standard deviation and quantiles of the last `window` values of
+    a scalar series. Sums are updated in O(1) and the sorted window by
+    bisection, so the cost per value does not grow with the history.
+    """
+
+    def __init__(self, window=RISK_WINDOW):
+        self.window = window
+        self.values = deque()
+        self.sorted = []
+        self.sum = 0.0
+        self.sum_squares = 0.0
+
+    def update(self, value):
+        value = float(value)
+        if len(self.values) == self.window:
+            old = self.values.popleft()
+            self.sum -= old
+            self.sum_squares -= old * old
+            del self.sorted[bisect.bisect_left(self.sorted, old)]
+        self.values.append(value)
+        bisect.insort(self.sorted, value)
+        self.sum += value
+        self.sum_squares += value * value
+
+    @property
+    def mean(self):
+        return self.sum / len(self.values) if self.values else np.nan
+
+    @property
+    def std(self):
+        n = len(self.values)
+        if n < 2:
+            return np.nan
+        return np.sqrt(max(self.sum_squares - self.sum * self.sum / n, 0.0) / (n - 1))
+
+    def quantile(self, q):
+        """
+        Linearly interpolated quantile, as numpy's default method.
+        """
+        if not self.sorted:
+            return np.nan
+        position = q * (len(self.sorted) - 1)
+        lo = int(position)
+        hi = min(lo + 1, len(self.sorted) - 1)
+        return self.sorted[lo] + (self.sorted[hi] - self.sorted[lo]) * (position - lo)
+
+
+def parametric_risk(cov, weights, level=VAR_LEVEL):
+    """
+    Daily volatility and Gaussian VaR (as a positive loss) of a weight
+    vector under a covariance matrix.
+    """
+    weights = np.nan_to_num(np.asarray(weights, dtype=np.float64))
+    volatility = float(np.sqrt(max(weights @ cov @ weights, 0.0)))
+    return volatility, NormalDist().inv_cdf(level) * volatility
+
+
+class RiskEngine:
+    """
+    Streaming risk metrics of a portfolio. Each `update` takes one day's
+    asset returns and the weights held over that day, and costs O(N^2)
+    for the covariance plus O(window) for the rolling statistics,
+    independent of how many days came before:
+
+    - parametric VaR: ex-ante, from the covariance estimated up to the
+      previous day and the weights held today
+    - historical VaR, rolling Sharpe and volatility over the last `window` days
+    - running max drawdown and rolling average turnover
+    """
+
+    def __init__(self, n_assets, halflife=HALFLIFE_DAYS, window=RISK_WINDOW, level=VAR_LEVEL,
+                 covariance='ewma'):
+        if covariance == 'ewma':
+            self.covariance = EWMACovariance(n_assets, halflife)
+        elif covariance == 'rolling':
+            self.covariance = RollingCovariance(n_assets, window)
+        else:
+            raise ValueError(f"Unknown covariance estimator: {covariance}")
+        self.level = level
+        self.returns = RollingStats(window)
+        self.turnover = RollingStats(window)
+        self.prev_weights = np.zeros(n_assets)
+        self.equity = 1.0
+        self.peak = 1.0
+        self.max_drawdown = 0.0
+
+    def update(self, asset_returns, weights, portfolio_return=None):
+        """
+        Adds one day. `portfolio_return` defaults to the weighted asset
+        returns; pass it to include costs. Returns the day's metrics.
+        """
+        weights = np.nan_to_num(np.asarray(weights, dtype=np.float64))
+        asset_returns = np.asarray(asset_returns, dtype=np.float64)
+        if portfolio_return is None:
+            portfolio_return = float(weights @ np.nan_to_num(asset_returns))
+
+        # Ex-ante figures use the covariance as it stood before today's returns
+        volatility, parametric_var = parametric_risk(self.covariance.cov, weights, self.level)
+        self.covariance.update(asset_returns)
+
+        self.turnover.update(np.abs(weights - self.prev_weights).sum())
+        self.prev_weights = weights
+        self.returns.update(portfolio_return)
+        self.equity *= 1 + portfolio_return
+        self.peak = max(self.peak, self.equity)
+        drawdown = 1 - self.equity / self.peak
+        self.max_drawdown = max(self.max_drawdown, drawdown)
+        return self.metrics(parametric_var=parametric_var, ex_ante_volatility=volatility, drawdown=drawdown)
+
+    def metrics(self, **extra):
+        std = self.returns.std
+        return {
+            'rolling_sharpe': self.returns.mean / std * np.sqrt(TRADING_DAYS) if std and np.isfinite(std) else np.nan,
+            'rolling_volatility': std * np.sqrt(TRADING_DAYS),
+            'historical_var': -self.returns.quantile(1 - self.level),
+            'max_drawdown': self.max_drawdown,
+            'rolling_turnover': self.turnover.mean,
+            **extra,
+        }
+
+
+def risk_report(asset_returns, weights, portfolio_returns=None, dates=None, **params):
+    """
+    Runs the risk engine over a (days x tickers) backtest and returns one
+    row of metrics per day.
+    """
+    engine = RiskEngine(asset_returns.shape[1], **params)
+    rows = [engine.update(asset_returns[t], weights[t],
+                          None if portfolio_returns is None else portfolio_returns[t])
+            for t in range(len(asset_returns))]
+    return pd.DataFrame(rows, index=dates)
@@ -0,0 +1,46 @@
+import pandas as pd
+from pathlib import Path
+
+from src.storage.parquet_store import write_dataset, read_dataset
+
+# --- File Paths ---
+PROCESSED_DIR = Path(__file__).parent.parent.parent / "data/processed"
+
+# Legacy CSV outputs of each stage and the dataset each one is migrated to
+CSV_TO_DATASET = {
+    'technical_features.csv': 'technical_features',
+    'sentiment_features.csv': 'sentiment_features',
+    'final_features.csv': 'final_features',
+    'labeled_features.csv': 'labeled_features',
+}
+
+
+def migrate_csv_outputs(processed_dir, remove_csv=False):
+    """
+    One-time migration of the legacy per-stage CSV files to partitioned
+    Parquet datasets. CSVs that don't exist are skipped.
+    """
+    for csv_name, dataset_name in CSV_TO_DATASET.items():
+        csv_path = processed_dir / csv_name
+        dataset_path = processed_dir / dataset_name
+        if not csv_path.exists():
+            print(f"{csv_path} not found. Skipping.")
+            continue
+
+        print(f"Migrating {csv_path} -> {dataset_path}...")
+        df = pd.read_csv(csv_path, parse_dates=['Date'])
+        write_dataset(df, dataset_path)
+
+        # Sanity check: the dataset must hold exactly the same rows as the CSV
+        migrated = read_dataset(dataset_path, columns=['Date'])
+        if len(migrated) != len(df):
+            raise ValueError(f"Row count mismatch after migrating {csv_name}: "
+                             f"{len(df)} rows in CSV, {len(migrated)} in dataset")
+        print(f"Migrated {len(df)} rows.")
+
+        if remove_csv:
+            csv_path.unlink()
+
+
+if __name__ == "__main__":
+    migrate_csv_outputs(processed_dir=PROCESSED_DIR)
@@ -0,0 +1,248 @@
+import shutil
+import uuid
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.fs as pafs
+
+# --- Storage Layout ---
+# Every processed stage is stored as a hive-partitioned Parquet dataset
+# (e.g. data/processed/labeled_features/Ticker=TCS.NS/part-0.parquet).
+PARTITION_COLS = ['Ticker']
+KEY_COLS = ['Ticker', 'Date']
+
+# Columns we never downcast, even though they are numeric
+INT_COLS = {'Volume'}
+# Prices and returns keep float64: they are reported, compounded and
+# compared across stages. Only the derived model features become float32.
+FLOAT64_COLS = {'Open', 'High', 'Low', 'Close', 'Adj Close'}
+FLOAT64_PREFIXES = ('future_return',)
+
+# Types of the partition columns encoded in the directory names
+PARTITIONING_FIELDS = {
+    'Ticker': pa.string(),
+    'year': pa.int16(),
+}
+
+# Memory-mapped reads avoid copying Parquet pages into Python-owned buffers
+LOCAL_FS = pafs.LocalFileSystem(use_mmap=True)
+
+
+def compact_dtypes(df):
+    """
+    Downcasts a feature frame to compact dtypes before it is written:
+    float64 -> float32 (except prices and returns), small integer labels
+    -> int8 and Ticker -> categorical.
+    """
+    df = df.copy()
+    for col in df.columns:
+        dtype = df[col].dtype
+        if col in INT_COLS:
+            continue
+        if col in FLOAT64_COLS or col.startswith(FLOAT64_PREFIXES):
+            if pd.api.types.is_float_dtype(dtype):
+                df[col] = df[col].astype(np.float64)
+        elif pd.api.types.is_float_dtype(dtype):
+            df[col] = df[col].astype(np.float32)
+        elif pd.api.types.is_integer_dtype(dtype) and not df[col].empty:
+            if df[col].min() >= np.iinfo(np.int8).min and df[col].max() <= np.iinfo(np.int8).max:
+                df[col] = df[col].astype(np.int8)
+    if 'Ticker' in df.columns:
+        df['Ticker'] = df['Ticker'].astype(str).astype('category')
+    return df
+
+
+def _partitioning(partition_cols):
+    schema = pa.schema([(col, PARTITIONING_FIELDS.get(col, pa.string())) for col in partition_cols])
+    return ds.partitioning(schema, flavor='hive')
+
+
+def _prepare_for_write(df, partition_cols, compact):
+    df = compact_dtypes(df) if compact else df.copy()
+    if 'year' in partition_cols:
+        df['year'] = df['Date'].dt.year.astype(np.int16)
+    # Partition values live in the directory names, so write them as plain strings
+    if 'Ticker' in df.columns:
+        df['Ticker'] = df['Ticker'].astype(str)
+    return pa.Table.from_pandas(df, preserve_index=False)
+
+
+def reset_dataset(path):
+    """
+    Deletes whatever is stored at `path` and leaves an empty dataset
+    directory, e.g. before a stage appends its output partition by partition.
+    """
+    path = Path(path)
+    if path.exists():
+        shutil.rmtree(path)
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def write_dataset(df, path, partition_cols=PARTITION_COLS, compact=True):
+    """
+    Writes a DataFrame as a partitioned Parquet dataset, replacing whatever
+    was stored at `path` before. `compact=False` keeps the original dtypes.
+    """
+    path = reset_dataset(path)
+    table = _prepare_for_write(df.sort_values(KEY_COLS), partition_cols, compact)
+    ds.write_dataset(table, path, format='parquet',
+                     partitioning=_partitioning(partition_cols),
+                     basename_template='part-{i}.parquet',
+                     existing_data_behavior='overwrite_or_ignore')
+
+
+def append_dataset(df, path, partition_cols=PARTITION_COLS, compact=True):
+    """
+    Appends rows to an existing partitioned dataset by adding new files next
+    to the existing ones. Nothing already on disk is rewritten.
+    """
+    path = Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+    if df.empty:
+        return
+
+    table = _prepare_for_write(df.sort_values(KEY_COLS), partition_cols, compact)
+    ds.write_dataset(table, path, format='parquet',
+                     partitioning=_partitioning(partition_cols),
+                     basename_template=f'part-{uuid.uuid4().hex}-{{i}}.parquet',
+                     existing_data_behavior='overwrite_or_ignore')
+
+
+def open_dataset(path, partition_cols=PARTITION_COLS):
+    """
+    Opens a partitioned dataset lazily. Nothing is read until it is scanned.
+    """
+    return ds.dataset(str(Path(path).resolve()), format='parquet', filesystem=LOCAL_FS,
+                      partitioning=_partitioning(partition_cols))
+
+
+def build_filter(start=None, end=None, tickers=None):
+    """
+    Builds an Arrow filter expression on Date (inclusive bounds) and Ticker.
+    Date bounds are pushed down to Parquet row-group statistics and Ticker
+    filters prune whole partitions.
+    """
+    expr = None
+    if start is not None:
+        expr = ds.field('Date') >= pa.scalar(pd.Timestamp(start), type=pa.timestamp('ns'))
+    if end is not None:
+        cond = ds.field('Date') <= pa.scalar(pd.Timestamp(end), type=pa.timestamp('ns'))
+        expr = cond if expr is None else expr & cond
+    if tickers is not None:
+        cond = ds.field('Ticker').isin(list(tickers))
+        expr = cond if expr is None else expr & cond
+    return expr
+
+
+def read_dataset(path, columns=None, start=None, end=None, tickers=None,
+                 partition_cols=PARTITION_COLS):
+    """
+    Reads a partitioned dataset into a DataFrame sorted by (Ticker, Date).
+    Only the requested columns are decoded and only the row groups that can
+    match the Date/Ticker filter are touched.
+    """
+    dataset = open_dataset(path, partition_cols)
+    columns = _with_key_columns(dataset, columns)
+    return _to_frame(dataset.to_table(columns=columns, filter=build_filter(start, end, tickers)), columns)
+
+
+def _with_key_columns(dataset, columns):
+    if columns is None:
+        return None
+    return list(dict.fromkeys(list(columns) + [c for c in KEY_COLS if c in dataset.schema.names]))
+
+
+def _to_frame(table, columns):
+    df = table.to_pandas()
+    if 'year' in df.columns and (columns is None or 'year' not in columns):
+        df = df.drop(columns='year')
+
+    if 'Ticker' in df.columns:
+        df['Ticker'] = df['Ticker'].astype(pd.CategoricalDtype(sorted(df['Ticker'].unique())))
+
+    # Row order across partition files is not guaranteed, so always sort on the key
+    return df.sort_values(KEY_COLS, kind='stable').reset_index(drop=True)
+
+
+def dataset_exists(path):
+    """
+    Returns True if a dataset directory exists and contains at least one Parquet file.
+    """
+    path = Path(path)
+    return path.is_dir() and any(path.rglob('*.parquet'))
+
+
+def max_date_by_ticker(path, partition_cols=PARTITION_COLS):
+    """
+    Returns a dict of Ticker -> latest stored Date, reading only the Date column.
+    """
+    if not dataset_exists(path):
+        return {}
+    table = open_dataset(path, partition_cols).to_table(columns=['Ticker', 'Date'])
+    latest = table.group_by('Ticker').aggregate([('Date', 'max')]).to_pandas()
+    return dict(zip(latest['Ticker'], pd.to_datetime(latest['Date_max'])))
+
+
+def partition_fragments(path, column='Ticker', partition_cols=PARTITION_COLS):
+    """
+    Opens a dataset once and groups its files by the value of a partition
+    column. Returns (dataset, {value: [fragments]}). Stages that stream a
+    dataset partition by partition read through this map with
+    `read_partition`, instead of listing every partition directory again
+    for each one.
+    """
+    dataset = open_dataset(path, partition_cols)
+    fragments = {}
+    for fragment in dataset.get_fragments():
+        keys = ds.get_partition_keys(fragment.partition_expression)
+        if column in keys:
+            fragments.setdefault(keys[column], []).append(fragment)
+    return dataset, fragments
+
+
+def drop_partitions(path, values, column='Ticker', partition_cols=PARTITION_COLS):
+    """
+    Deletes every file of the partitions of `values` (e.g. tickers about to
+    be rewritten from scratch). Returns the number of files deleted.
+    """
+    if not dataset_exists(path):
+        return 0
+    _, partitions = partition_fragments(path, column, partition_cols)
+    deleted = 0
+    for value in values:
+        for fragment in partitions.get(value, []):
+            Path(fragment.path).unlink()
+            deleted += 1
+    return deleted
+
+
+def partition_batches(partitions, batch_rows):
+    """
+    Groups the partitions of `partition_fragments` into batches of whole
+    partitions holding about `batch_rows` rows each (row counts come from
+    the Parquet footers). Yields (values, fragments) in value order.
+    """
+    values, fragments, rows = [], [], 0
+    for value in sorted(partitions):
+        values.append(value)
+        fragments.extend(partitions[value])
+        rows += sum(fragment.count_rows() for fragment in partitions[value])
+        if rows >= batch_rows:
+            yield values, fragments
+            values, fragments, rows = [], [], 0
+    if values:
+        yield values, fragments
+
+
+def read_partition(dataset, fragments, columns=None):
+    """
+    Reads some files of an open dataset (e.g. one partition from
+    `partition_fragments`) into a DataFrame, like `read_dataset`.
+    """
+    columns = _with_key_columns(dataset, columns)
+    subset = ds.FileSystemDataset(list(fragments), dataset.schema, dataset.format, LOCAL_FS)
+    return _to_frame(subset.to_table(columns=columns), columns)
@@ -0,0 +1,192 @@
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import xgboost as xgb
+
+from src.backtest.engine import TEST_START
+from src.features.create_labels import HORIZON_DAYS
+from src.inference.predictor import feature_columns
+from src.pipeline.profiling import peak_rss_mb, profiled, record_rows
+from src.storage.parquet_store import build_filter, open_dataset
+
+# --- File Paths ---
+BASE_DIR = Path(__file__).parent.parent.parent
+LABELED_DATA_PATH = BASE_DIR / "data/processed/labeled_features"
+MODEL_PATH = BASE_DIR / "models/xgb_model.joblib"
+
+# --- Training Configuration ---
+TRAIN_PARAMS = {
+    'objective': 'binary:logistic',
+    'eval_metric': 'logloss',
+    'learning_rate': 0.1,
+    'max_depth': 5,
+    'tree_method': 'hist',
+    'max_bin': 256,
+}
+MAX_ROUNDS = 1000
+EARLY_STOPPING_ROUNDS = 50
+# The most recent dates before the backtest period are held out (in time
+# order) for early stopping; nothing from TEST_START on is ever seen
+VALID_FRACTION = 0.15
+# Rows handed to XGBoost per iterator step; bounds the memory of one batch
+BATCH_ROWS = 1_000_000
+
+
+class ParquetBatchIter(xgb.DataIter):
+    """
+    Streams (features, target) batches of a partitioned Parquet dataset into
+    XGBoost. Only the feature and target columns of the rows matching the
+    filter are decoded, one batch of about `batch_rows` rows at a time.
+    """
+
+    def __init__(self, dataset, features, filter_expr, batch_rows=BATCH_ROWS, cache_prefix=None):
+        self.dataset = dataset
+        self.features = features
+        self.filter_expr = filter_expr
+        self.batch_rows = batch_rows
+        self.rows = 0
+        self._batches = None
+        self._counting = True
+        super().__init__(cache_prefix=cache_prefix)
+
+    def _next_table(self):
+        parts = []
+        n_rows = 0
+        for batch in self._batches:
+            parts.append(batch)
+            n_rows += batch.num_rows
+            if n_rows >= self.batch_rows:
+                break
+        return pa.Table.from_batches(parts) if parts else None
+
+    def next(self, input_data):
+        if self._batches is None:
+            self._batches = iter(self.dataset.to_batches(columns=self.features + ['target'],
+                                                         filter=self.filter_expr))
+        table = self._next_table()
+        if table is None or table.num_rows == 0:
+            # XGBoost reads the data more than once; rows are only counted on the first pass
+            self._counting = False
+            return False
+
+        X = np.column_stack([table[col].to_numpy().astype(np.float32, copy=False) for col in self.features])
+        input_data(data=X, label=table['target'].to_numpy(), feature_names=self.features)
+        if self._counting:
+            self.rows += table.num_rows
+        return True
+
+    def reset(self):
+        self._batches = None
+
+
+def validation_split(dataset, cutoff=TEST_START, valid_fraction=VALID_FRACTION, embargo_days=HORIZON_DAYS):
+    """
+    Returns the last training date and the first and last validation dates.
+    Only dates before `cutoff` (the start of the backtest period) are used:
+    the last `valid_fraction` of them are validation, and the `embargo_days`
+    dates before the validation period and before `cutoff` are dropped,
+    since their labels look into the period that follows.
+    """
+    dates = pc.unique(dataset.to_table(columns=['Date'])['Date']).to_numpy()
+    dates = np.sort(dates)
+    dates = dates[:np.searchsorted(dates, np.datetime64(pd.Timestamp(cutoff)), side='left') - embargo_days]
+    valid_lo = int(len(dates) * (1 - valid_fraction))
+    if valid_lo - embargo_days < 1 or valid_lo >= len(dates):
+        raise ValueError(f"Not enough dates before {cutoff} for a training and a validation period")
+    return pd.Timestamp(dates[valid_lo - embargo_days - 1]), pd.Timestamp(dates[valid_lo]), pd.Timestamp(dates[-1])
+
+
+@profiled()
+def train_model(labeled_data_path, model_path, params=TRAIN_PARAMS, max_rounds=MAX_ROUNDS,
+                early_stopping_rounds=EARLY_STOPPING_ROUNDS, valid_fraction=VALID_FRACTION, cutoff=TEST_START,
+                batch_rows=BATCH_ROWS, external_memory=False, n_jobs=None):
+    """
+    Trains the model directly from the partitioned feature dataset.
+
+    The training rows are streamed batch by batch into a QuantileDMatrix
+    (or, with `external_memory=True`, an ExtMemQuantileDMatrix that keeps
+    its pages on disk), so the full frame never exists in pandas. Training
+    stops early on a time-ordered validation split. Both end before `cutoff`
+    (the backtest's TEST_START), so the backtest is out of sample. Saves the joblib model
+    the API and backtests load, and the native JSON booster next to it.
+    """
+    dataset = open_dataset(labeled_data_path)
+    features = feature_columns(dataset.schema.names)
+    train_end, valid_start, valid_end = validation_split(dataset, cutoff, valid_fraction)
+    print(f"Training on dates up to {train_end.date()}, validating from {valid_start.date()} "
+          f"to {valid_end.date()}.")
+
+    params = {**params, 'nthread': n_jobs} if n_jobs else dict(params)
+    start = time.perf_counter()
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache_prefix = str(Path(cache_dir) / 'train') if external_memory else None
+        train_iter = ParquetBatchIter(dataset, features, build_filter(end=train_end), batch_rows, cache_prefix)
+        valid_iter = ParquetBatchIter(dataset, features, build_filter(start=valid_start, end=valid_end), batch_rows)
+        if external_memory:
+            dtrain = xgb.ExtMemQuantileDMatrix(train_iter, max_bin=params['max_bin'])
+        else:
+            dtrain = xgb.QuantileDMatrix(train_iter, max_bin=params['max_bin'])
+        dvalid = xgb.QuantileDMatrix(valid_iter, ref=dtrain)
+        load_seconds = time.perf_counter() - start
+
+        booster = xgb.train(params, dtrain, num_boost_round=max_rounds,
+                            evals=[(dtrain, 'train'), (dvalid, 'valid')],
+                            early_stopping_rounds=early_stopping_rounds, verbose_eval=50)
+        # Free the matrices while their external-memory pages still exist
+        del dtrain, dvalid
+    train_seconds = time.perf_counter() - start - load_seconds
+
+    # Keep only the trees up to the best validation score
+    best_rounds = booster.best_iteration + 1
+    best_score = booster.best_score
+    booster = booster[:best_rounds]
+
+    json_path = Path(model_path).with_suffix('.json')
+    json_path.parent.mkdir(parents=True, exist_ok=True)
+    booster.save_model(json_path)
+    model = xgb.XGBClassifier()
+    model.load_model(json_path)
+    joblib.dump(model, model_path)
+
+    stats = {
+        'train_rows': train_iter.rows,
+        'valid_rows': valid_iter.rows,
+        'best_rounds': best_rounds,
+        'best_valid_logloss': float(best_score),
+        'load_seconds': load_seconds,
+        'train_seconds': train_seconds,
+        # End to end: streaming the rows in plus boosting
+        'rows_per_sec': train_iter.rows / (load_seconds + train_seconds),
+        'peak_rss_mb': peak_rss_mb(),
+    }
+    record_rows(train_iter.rows)
+    print("\n--- Training Summary ---")
+    for key, value in stats.items():
+        print(f"{key}: {value:.2f}" if isinstance(value, float) else f"{key}: {value}")
+    print(f"Model saved to {model_path} and {json_path}")
+    return model, stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the XGBoost model from the partitioned feature data.")
+    parser.add_argument('--model-path', type=Path, default=MODEL_PATH)
+    parser.add_argument('--max-rounds', type=int, default=MAX_ROUNDS)
+    parser.add_argument('--early-stopping', type=int, default=EARLY_STOPPING_ROUNDS)
+    parser.add_argument('--valid-fraction', type=float, default=VALID_FRACTION)
+    parser.add_argument('--cutoff', default=TEST_START, help="train and validate only on dates before this one")
+    parser.add_argument('--batch-rows', type=int, default=BATCH_ROWS)
+    parser.add_argument('--external-memory', action='store_true',
+                        help="keep the training matrix pages on disk instead of in memory")
+    parser.add_argument('--threads', type=int, default=None)
+    args = parser.parse_args()
+
+    train_model(LABELED_DATA_PATH, args.model_path, max_rounds=args.max_rounds,
+                early_stopping_rounds=args.early_stopping, valid_fraction=args.valid_fraction, cutoff=args.cutoff,
+                batch_rows=args.batch_rows, external_memory=args.external_memory, n_jobs=args.threads)
@@ -0,0 +1,193 @@
+import argparse
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+
+from src.features.create_labels import HORIZON_DAYS
+from src.inference.predictor import Predictor, feature_columns
+from src.storage.parquet_store import read_dataset, write_dataset
+
+# --- File Paths ---
+BASE_DIR = Path(__file__).parent.parent.parent
+LABELED_DATA_PATH = BASE_DIR / "data/processed/labeled_features"
+FOLD_CACHE_DIR = BASE_DIR / "models/folds"
+PREDICTIONS_PATH = BASE_DIR / "data/processed/walk_forward_predictions"
+
+# --- Model ---
+# Same hyperparameters as the model served from models/xgb_model.joblib
+MODEL_PARAMS = {
+    'objective': 'binary:logistic',
+    'eval_metric': 'logloss',
+    'learning_rate': 0.1,
+    'max_depth': 5,
+    'n_estimators': 100,
+    'tree_method': 'hist',
+    'random_state': 42,
+}
+
+# --- Walk-Forward Configuration ---
+N_FOLDS = 8
+TEST_DAYS = 63           # Trading days per test fold (about a quarter)
+TRAIN_DAYS = 504         # Train window length for rolling folds (about two years)
+# Labels look HORIZON_DAYS rows ahead, so the last HORIZON_DAYS dates before
+# a test fold would leak its prices into training
+EMBARGO_DAYS = HORIZON_DAYS
+THREADS_PER_FOLD = 2
+
+
+def make_folds(dates, n_folds=N_FOLDS, test_days=TEST_DAYS, window='expanding', train_days=TRAIN_DAYS,
+               embargo_days=EMBARGO_DAYS):
+    """
+    Splits the trading dates into walk-forward folds. The last
+    `n_folds * test_days` dates form consecutive test blocks. Each block
+    trains on the dates before it, minus an embargo of `embargo_days`,
+    either from the start of the history ('expanding') or over the last
+    `train_days` dates ('rolling').
+    Returns a list of (train_start, train_end, test_start, test_end) dates.
+    """
+    dates = pd.DatetimeIndex(sorted(pd.unique(dates)))
+    first_test = len(dates) - n_folds * test_days
+    if first_test - embargo_days <= 0:
+        raise ValueError(f"Not enough history for {n_folds} folds of {test_days} days")
+
+    folds = []
+    for k in range(n_folds):
+        test_lo = first_test + k * test_days
+        test_hi = test_lo + test_days - 1
+        train_hi = test_lo - embargo_days - 1
+        train_lo = 0 if window == 'expanding' else max(0, train_hi - train_days + 1)
+        folds.append((dates[train_lo], dates[train_hi], dates[test_lo], dates[test_hi]))
+    return folds
+
+
+def fold_key(X, y, params):
+    """
+    Cache key of a fold model: a hash of the training data and the parameters.
+    """
+    digest = hashlib.sha256()
+    digest.update(json.dumps({'params': params, 'columns': list(X.columns)}, sort_keys=True).encode('utf-8'))
+    digest.update(pd.util.hash_pandas_object(X, index=False).to_numpy().tobytes())
+    digest.update(np.ascontiguousarray(y).tobytes())
+    return digest.hexdigest()[:16]
+
+
+def fit_model(X, y, params=MODEL_PARAMS, n_jobs=None):
+    model = xgb.XGBClassifier(**params, n_jobs=n_jobs)
+    model.fit(X, y)
+    return model
+
+
+def _train_fold(X, y, params, n_jobs, cache_path):
+    # Runs in a worker process: fit one fold and save it to the cache
+    model = fit_model(X, y, params, n_jobs)
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = cache_path.with_name(f"{cache_path.stem}.{os.getpid()}.tmp.json")
+    model.save_model(tmp_path)
+    tmp_path.replace(cache_path)
+    return cache_path
+
+
+def load_fold_model(cache_path):
+    model = xgb.XGBClassifier()
+    model.load_model(cache_path)
+    return model
+
+
+def log_loss(y, proba):
+    proba = np.clip(proba, 1e-15, 1 - 1e-15)
+    return float(-np.mean(y * np.log(proba) + (1 - y) * np.log(1 - proba)))
+
+
+def walk_forward(df, folds, params=MODEL_PARAMS, cache_dir=FOLD_CACHE_DIR, workers=None,
+                 threads_per_fold=THREADS_PER_FOLD):
+    """
+    Trains one model per fold and predicts its test block.
+
+    Folds whose model is already cached (same training data and params) are
+    not retrained. The others are trained in parallel, each limited to
+    `threads_per_fold` threads. Returns the stitched out-of-sample
+    predictions (one row per test Date and Ticker) and a per-fold report.
+    """
+    features = feature_columns(df.columns)
+    jobs = []
+    for k, (train_start, train_end, test_start, test_end) in enumerate(folds):
+        train = df[(df['Date'] >= train_start) & (df['Date'] <= train_end)]
+        X, y = train[features], train['target'].to_numpy()
+        cache_path = cache_dir / f"fold-{fold_key(X, y, params)}.json"
+        jobs.append((k, X, y, cache_path))
+
+    to_train = [job for job in jobs if not job[3].exists()]
+    print(f"Walk-forward: {len(folds)} folds, {len(folds) - len(to_train)} cached, {len(to_train)} to train.")
+    if to_train:
+        workers = workers or max(1, min(len(to_train), (os.cpu_count() or 1) // threads_per_fold))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_train_fold, X, y, params, threads_per_fold, cache_path)
+                       for _, X, y, cache_path in to_train]
+            for future in futures:
+                future.result()
+
+    predictions = []
+    report = []
+    for (k, X, y, cache_path), (train_start, train_end, test_start, test_end) in zip(jobs, folds):
+        test = df[(df['Date'] >= test_start) & (df['Date'] <= test_end)]
+        prediction, proba, _ = Predictor(load_fold_model(cache_path)).predict(test)
+
+        fold_predictions = test[['Date', 'Ticker', 'Close', 'future_return', 'target']].copy()
+        fold_predictions['fold'] = k
+        fold_predictions['proba'] = proba
+        fold_predictions['prediction'] = prediction
+        predictions.append(fold_predictions)
+
+        report.append({
+            'fold': k, 'train_start': train_start.date(), 'train_end': train_end.date(),
+            'test_start': test_start.date(), 'test_end': test_end.date(),
+            'train_rows': len(X), 'test_rows': len(test),
+            'accuracy': float((fold_predictions['prediction'] == test['target']).mean()),
+            'logloss': log_loss(test['target'].to_numpy(), proba),
+            'model': cache_path.name,
+        })
+
+    return pd.concat(predictions, ignore_index=True), pd.DataFrame(report)
+
+
+def run_walk_forward(labeled_data_path, predictions_path, n_folds=N_FOLDS, test_days=TEST_DAYS,
+                     window='expanding', train_days=TRAIN_DAYS, workers=None,
+                     threads_per_fold=THREADS_PER_FOLD):
+    """
+    Runs the walk-forward evaluation on the labeled dataset and saves the
+    stitched out-of-sample predictions as a Parquet dataset.
+    """
+    print(f"Loading labeled data from {labeled_data_path}...")
+    df = read_dataset(labeled_data_path)
+    df['Ticker'] = df['Ticker'].astype(str)
+    folds = make_folds(df['Date'], n_folds, test_days, window, train_days)
+
+    predictions, report = walk_forward(df, folds, workers=workers, threads_per_fold=threads_per_fold)
+    write_dataset(predictions, predictions_path)
+
+    print("\n--- Walk-Forward Folds ---")
+    print(report.to_string(index=False))
+    print(f"\nOut-of-sample accuracy: {(predictions['prediction'] == predictions['target']).mean():.4f}")
+    print(f"Out-of-sample predictions saved to {predictions_path}")
+    return predictions, report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Walk-forward training and evaluation of the XGBoost model.")
+    parser.add_argument('--folds', type=int, default=N_FOLDS)
+    parser.add_argument('--test-days', type=int, default=TEST_DAYS)
+    parser.add_argument('--window', choices=['expanding', 'rolling'], default='expanding')
+    parser.add_argument('--train-days', type=int, default=TRAIN_DAYS, help="train window of rolling folds")
+    parser.add_argument('--workers', type=int, default=None, help="folds trained in parallel")
+    parser.add_argument('--threads-per-fold', type=int, default=THREADS_PER_FOLD)
+    args = parser.parse_args()
+
+    run_walk_forward(LABELED_DATA_PATH, PREDICTIONS_PATH, n_folds=args.folds, test_days=args.test_days,
+                     window=args.window, train_days=args.train_days, workers=args.workers,
+                     threads_per_fold=args.threads_per_fold)
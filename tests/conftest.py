@@ -0,0 +1,9 @@
+import pytest
+
+from src.pipeline.profiling import RUN_LOG_ENV
+
+
+@pytest.fixture(autouse=True)
+def isolated_run_log(tmp_path, monkeypatch):
+    # Profiled sections append to the run log; keep it out of data/processed
+    monkeypatch.setenv(RUN_LOG_ENV, str(tmp_path / 'run_log.jsonl'))
@@ -0,0 +1,126 @@
+import pytest
+
+from src.pipeline.dag import Pipeline, Stage
+
+CALLS = []
+
+
+def copy_upper(source, target):
+    CALLS.append(target.stem)
+    target.write_text(source.read_text().upper())
+
+
+def concat(sources, target, suffix=''):
+    CALLS.append(target.stem)
+    target.write_text(''.join(source.read_text() for source in sources) + suffix)
+
+
+def fail(target):
+    CALLS.append(target.stem)
+    raise RuntimeError("boom")
+
+
+@pytest.fixture
+def paths(tmp_path):
+    CALLS.clear()
+    raw = tmp_path / 'raw.txt'
+    raw.write_text('abc')
+    return {name: tmp_path / f'{name}.txt' for name in ['raw', 'clean', 'other', 'merged']}
+
+
+def build_stages(paths, suffix=''):
+    # raw -> clean -> merged <- other
+    return [
+        Stage('merge', concat, {'sources': [paths['clean'], paths['other']], 'target': paths['merged'],
+                                'suffix': suffix},
+              inputs=[paths['clean'], paths['other']], outputs=[paths['merged']]),
+        Stage('clean', copy_upper, {'source': paths['raw'], 'target': paths['clean']},
+              inputs=[paths['raw']], outputs=[paths['clean']]),
+        Stage('other', copy_upper, {'source': paths['raw'], 'target': paths['other']},
+              inputs=[paths['raw']], outputs=[paths['other']]),
+    ]
+
+
+def statuses(rows):
+    return {row['stage']: row['status'] for row in rows}
+
+
+def test_dependencies_come_from_paths(paths, tmp_path):
+    pipeline = Pipeline(build_stages(paths), tmp_path / 'state.json')
+    assert pipeline.deps == {'merge': {'clean', 'other'}, 'clean': set(), 'other': set()}
+    assert pipeline.order.index('merge') > max(pipeline.order.index('clean'), pipeline.order.index('other'))
+
+    pipeline.run(workers=2)
+    assert paths['merged'].read_text() == 'ABCABC'
+
+
+def test_unchanged_stages_are_skipped(paths, tmp_path):
+    state_path = tmp_path / 'state.json'
+    Pipeline(build_stages(paths), state_path).run()
+    CALLS.clear()
+
+    rows = Pipeline(build_stages(paths), state_path).run()
+    assert set(statuses(rows).values()) == {'up to date'}
+    assert CALLS == []
+
+
+def test_changes_rerun_the_stage_and_what_depends_on_it(paths, tmp_path):
+    state_path = tmp_path / 'state.json'
+    Pipeline(build_stages(paths), state_path).run()
+
+    # New arguments
+    rows = Pipeline(build_stages(paths, suffix='!'), state_path).run()
+    assert statuses(rows) == {'clean': 'up to date', 'other': 'up to date', 'merge': 'ran'}
+
+    # New input contents
+    paths['raw'].write_text('xyz')
+    rows = Pipeline(build_stages(paths, suffix='!'), state_path).run()
+    assert set(statuses(rows).values()) == {'ran'}
+    assert paths['merged'].read_text() == 'XYZXYZ!'
+
+    # An output deleted or edited since the last run
+    paths['other'].unlink()
+    rows = Pipeline(build_stages(paths, suffix='!'), state_path).run()
+    assert statuses(rows)['other'] == 'ran'
+    assert statuses(rows)['clean'] == 'up to date'
+
+
+def test_select_from_and_until(paths, tmp_path):
+    pipeline = Pipeline(build_stages(paths), tmp_path / 'state.json')
+    assert pipeline.select(start='clean') == [name for name in pipeline.order if name in {'clean', 'merge'}]
+    assert set(pipeline.select(until='merge')) == {'clean', 'other', 'merge'}
+    assert pipeline.select(until='other') == ['other']
+    assert pipeline.select(start='clean', until='clean') == ['clean']
+    with pytest.raises(ValueError):
+        pipeline.select(start='missing')
+
+    rows = pipeline.run(start='clean')
+    assert [row['stage'] for row in rows] == pipeline.select(start='clean')
+    assert not paths['other'].exists()
+
+
+def test_dry_run_reports_without_running(paths, tmp_path):
+    state_path = tmp_path / 'state.json'
+    Pipeline(build_stages(paths), state_path).run()
+    paths['raw'].write_text('new')
+    CALLS.clear()
+
+    rows = Pipeline(build_stages(paths), state_path).run(dry_run=True)
+    # merge's inputs would change once its upstream stages ran
+    assert set(statuses(rows).values()) == {'would run'}
+    assert CALLS == []
+
+
+def test_a_failure_blocks_downstream_stages(paths, tmp_path):
+    stages = build_stages(paths)
+    stages[1] = Stage('clean', fail, {'target': paths['clean']}, inputs=[paths['raw']], outputs=[paths['clean']])
+    rows = Pipeline(stages, tmp_path / 'state.json').run()
+    assert statuses(rows) == {'clean': 'failed', 'other': 'ran', 'merge': 'blocked'}
+    assert 'merged' not in CALLS
+
+
+def test_cycles_are_rejected(paths, tmp_path):
+    stages = [Stage('a', concat, inputs=[paths['clean']], outputs=[paths['other']]),
+              Stage('b', concat, inputs=[paths['other']], outputs=[paths['clean']])]
+    with pytest.raises(ValueError, match='cycle'):
+        Pipeline(stages, tmp_path / 'state.json')
@@ -0,0 +1,87 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.features import incremental_features
+from src.features.build_features import compute_features
+from src.features.incremental_features import load_state, save_state, update_features, verify_against_full_rebuild
+from src.ingestion.price_ingest import PRICE_FIELDS
+from src.storage.parquet_store import read_dataset, write_dataset
+
+TICKERS = ['AAA.NS', 'BBB.NS']
+
+
+def make_prices(n_days, seed=0):
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range('2024-01-01', periods=n_days)
+    frames = []
+    for ticker in TICKERS:
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n_days)))
+        frames.append(pd.DataFrame({'Date': dates, 'Ticker': ticker, 'Open': close, 'High': close * 1.01,
+                                    'Low': close * 0.99, 'Close': close, 'Adj Close': close,
+                                    'Volume': rng.integers(1_000, 10_000, n_days)}))
+    return pd.concat(frames, ignore_index=True)[['Date', 'Ticker'] + PRICE_FIELDS]
+
+
+def loader(prices):
+    def load_prices(start=None):
+        return prices if start is None else prices[prices['Date'] >= start]
+    return load_prices
+
+
+@pytest.fixture
+def store(tmp_path):
+    return tmp_path / 'technical_features', tmp_path / 'state.json'
+
+
+def full_build(prices, features_path, state_path):
+    features, state = compute_features(prices)
+    write_dataset(features, features_path)
+    save_state(state, state_path)
+
+
+def assert_unique_keys(features_path):
+    stored = read_dataset(features_path, columns=['Close'])
+    assert not stored.duplicated(['Date', 'Ticker']).any()
+    return stored
+
+
+def test_updates_continue_from_the_watermark(store):
+    features_path, state_path = store
+    prices = make_prices(90)
+    dates = prices['Date'].unique()
+    full_build(prices[prices['Date'] <= dates[59]], features_path, state_path)
+
+    for last in (69, 89):
+        history = prices[prices['Date'] <= dates[last]]
+        update_features(loader(history), features_path, state_path)
+        assert_unique_keys(features_path)
+        watermarks = {state['watermark'] for state in load_state(state_path).values()}
+        assert watermarks == {history['Date'].max().strftime('%Y-%m-%d')}
+
+    verify_against_full_rebuild(compute_features(prices)[0], features_path)
+
+
+def test_tickers_not_warmed_up_are_rewritten_not_appended(store, monkeypatch):
+    features_path, state_path = store
+    prices = make_prices(50)
+    dates = prices['Date'].unique()
+    full_build(prices[prices['Date'] <= dates[39]], features_path, state_path)
+    # Every ticker counts as not warmed up, so each update rebuilds it from its full history
+    monkeypatch.setattr(incremental_features, 'warmup_bars', lambda: 10_000)
+
+    for last in (44, 49):
+        update_features(loader(prices[prices['Date'] <= dates[last]]), features_path, state_path)
+        assert_unique_keys(features_path)
+
+    verify_against_full_rebuild(compute_features(prices)[0], features_path)
+
+
+def test_no_new_bars_is_a_no_op(store):
+    features_path, state_path = store
+    prices = make_prices(60)
+    full_build(prices, features_path, state_path)
+    before = read_dataset(features_path)
+
+    assert update_features(loader(prices), features_path, state_path).empty
+    pd.testing.assert_frame_equal(read_dataset(features_path), before)
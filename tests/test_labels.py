@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+
+from src.features.create_labels import label_frame
+
+
+def make_frame(closes):
+    """
+    Rows sorted by (Ticker, Date), one consecutive date range per ticker.
+    """
+    frames = [pd.DataFrame({'Date': pd.bdate_range('2025-01-01', periods=len(close)), 'Ticker': ticker,
+                            'Close': np.asarray(close, dtype=np.float64)})
+              for ticker, close in closes.items()]
+    return pd.concat(frames, ignore_index=True)
+
+
+def test_forward_returns_stay_within_each_ticker():
+    df = make_frame({'AAA': [10, 11, 12, 13, 14], 'BBB': [100, 90, 80, 70]})
+    labeled = label_frame(df, horizon=2, horizons=[1, 2])
+
+    # The last `horizon` rows of every ticker have no label and are dropped
+    assert labeled.groupby('Ticker')['Date'].count().to_dict() == {'AAA': 3, 'BBB': 2}
+    aaa = labeled[labeled['Ticker'] == 'AAA']
+    np.testing.assert_allclose(aaa['future_return'], [12 / 10 - 1, 13 / 11 - 1, 14 / 12 - 1])
+    bbb = labeled[labeled['Ticker'] == 'BBB']
+    np.testing.assert_allclose(bbb['future_return'], [80 / 100 - 1, 70 / 90 - 1])
+    assert aaa['target'].tolist() == [1, 1, 1]
+    assert bbb['target'].tolist() == [0, 0]
+
+
+def test_other_horizons_are_nan_past_the_ticker_end():
+    df = make_frame({'AAA': [10, 11, 12, 13], 'BBB': [20, 21, 22, 23]})
+    labeled = label_frame(df, horizon=1, horizons=[1, 3])
+
+    aaa = labeled[labeled['Ticker'] == 'AAA']
+    # Three rows ahead of AAA's second row would be BBB's first row
+    np.testing.assert_allclose(aaa['future_return_3d'], [13 / 10 - 1, np.nan, np.nan])
+    assert np.isnan(aaa['target_3d'].iloc[1:]).all()
+    assert aaa['target_3d'].iloc[0] == 1
+
+
+def test_a_ticker_shorter_than_the_horizon_has_no_rows():
+    df = make_frame({'AAA': [10, 11], 'BBB': [20, 21, 22, 23, 24, 25, 26]})
+    labeled = label_frame(df, horizon=5, horizons=[5])
+    assert labeled['Ticker'].unique().tolist() == ['BBB']
+    np.testing.assert_allclose(labeled['future_return'], [25 / 20 - 1, 26 / 21 - 1])
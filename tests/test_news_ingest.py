@@ -0,0 +1,130 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from src.ingestion import news_ingest
+from src.ingestion.news_store import load_articles
+
+TICKER = 'TCS.NS'
+QUERIES = {TICKER: 'Tata Consultancy Services'}
+N_ARTICLES = 250
+
+
+def make_articles(n):
+    # Newest first, like sortBy=publishedAt
+    return [{'url': f'https://news.example/{i}', 'title': f'Article {i}',
+             'publishedAt': f'2025-01-01T00:{i // 60:02d}:{i % 60:02d}Z'} for i in reversed(range(n))]
+
+
+class StubNewsAPI:
+    """
+    Local NewsAPI stand-in serving `articles` in pages. `failures` maps a
+    page number to how many more requests for it answer with a 500.
+    """
+
+    def __init__(self, articles):
+        self.articles = articles
+        self.failures = {}
+        self.requests = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                params = {key: values[0] for key, values in parse_qs(urlparse(self.path).query).items()}
+                stub.requests.append(params)
+                page, page_size = int(params['page']), int(params['pageSize'])
+                if stub.failures.get(page, 0) > 0:
+                    stub.failures[page] -= 1
+                    self.send_response(500)
+                    self.end_headers()
+                    return
+                # The 'from' parameter is inclusive, like NewsAPI's
+                matching = [a for a in stub.articles if a['publishedAt'].rstrip('Z') >= params['from']]
+                body = json.dumps({'status': 'ok', 'totalResults': len(matching),
+                                   'articles': matching[(page - 1) * page_size:page * page_size]}).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self.server.server_address[1]}/v2/everything'
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stub():
+    server = StubNewsAPI(make_articles(N_ARTICLES))
+    yield server
+    server.close()
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(news_ingest, 'RETRY_BACKOFF', 0.0)
+
+
+def run(stub, save_dir):
+    return news_ingest.fetch_news('key', QUERIES, '2025-01-01', '2025-01-31', save_dir, base_url=stub.url)
+
+
+def test_fetches_every_page(stub, tmp_path):
+    assert run(stub, tmp_path) == {TICKER: N_ARTICLES}
+    assert [r['page'] for r in stub.requests] == ['1', '2', '3']
+    stored = load_articles(tmp_path, TICKER)
+    assert len(stored) == N_ARTICLES
+    assert [a['publishedAt'] for a in stored] == sorted(a['publishedAt'] for a in stored)
+
+
+def test_failed_run_stores_nothing_and_next_run_fills_the_window(stub, tmp_path):
+    # Page 2 keeps failing through every retry
+    stub.failures[2] = news_ingest.MAX_RETRIES + 1
+    assert run(stub, tmp_path) == {TICKER: 0}
+    assert load_articles(tmp_path, TICKER) == []
+
+    assert run(stub, tmp_path) == {TICKER: N_ARTICLES}
+    assert len(load_articles(tmp_path, TICKER)) == N_ARTICLES
+
+
+def test_retries_server_errors(stub, tmp_path):
+    stub.failures[2] = news_ingest.MAX_RETRIES
+    assert run(stub, tmp_path) == {TICKER: N_ARTICLES}
+
+
+def test_incremental_run_resumes_from_last_published_at(stub, tmp_path):
+    run(stub, tmp_path)
+    stub.articles = make_articles(N_ARTICLES + 10)
+    stub.requests.clear()
+
+    assert run(stub, tmp_path) == {TICKER: 10}
+    assert stub.requests[0]['from'] == '2025-01-01T00:04:09'
+    assert len(load_articles(tmp_path, TICKER)) == N_ARTICLES + 10
+
+
+def test_retries_connection_errors(monkeypatch, tmp_path):
+    attempts = []
+    acquire = news_ingest.TokenBucket.acquire
+
+    async def counting_acquire(self):
+        attempts.append(1)
+        await acquire(self)
+
+    monkeypatch.setattr(news_ingest.TokenBucket, 'acquire', counting_acquire)
+    # Nothing listens on this port: every attempt fails with a ConnectError
+    result = news_ingest.fetch_news('key', QUERIES, '2025-01-01', '2025-01-31', tmp_path,
+                                    base_url='http://127.0.0.1:9/v2/everything')
+    assert result == {TICKER: 0}
+    assert len(attempts) == news_ingest.MAX_RETRIES + 1
+    assert load_articles(tmp_path, TICKER) == []
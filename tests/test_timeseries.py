@@ -0,0 +1,30 @@
+import numpy as np
+
+from src.api.dates import to_ns
+from src.api.timeseries import _window, downsample
+
+
+def test_short_series_are_returned_whole():
+    assert downsample(np.arange(10.0), 50).tolist() == list(range(10))
+
+
+def test_keeps_ends_and_extremes_within_the_budget():
+    values = np.sin(np.linspace(0, 20, 10_000))
+    values[1234] = 5.0
+    values[8765] = -5.0
+    keep = downsample(values, 100)
+    assert len(keep) <= 100
+    assert {0, 9_999, 1234, 8765} <= set(keep.tolist())
+
+
+def test_too_few_points_for_every_series_fall_back_to_striding():
+    values = np.random.default_rng(0).normal(size=(1_000, 3))
+    keep = downsample(values, 5)
+    assert keep.tolist() == [0, 249, 499, 749, 999]
+
+
+def test_window_bounds_are_inclusive():
+    dates = np.array(['2025-01-01', '2025-01-02', '2025-01-03'], dtype='datetime64[ns]').view(np.int64)
+    assert _window(dates, '2025-01-02', '2025-01-02') == slice(1, 2)
+    assert _window(dates, None, '2025-01-02') == slice(0, 2)
+    assert to_ns('2025-01-01') == dates[0]
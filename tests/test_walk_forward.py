@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.training import walk_forward as wf
+
+DATES = pd.bdate_range('2024-01-01', periods=60)
+
+
+def test_folds_leave_an_embargo_before_each_test_block():
+    folds = wf.make_folds(DATES, n_folds=3, test_days=10, embargo_days=5)
+    position = {date: i for i, date in enumerate(DATES)}
+    for train_start, train_end, test_start, test_end in folds:
+        assert train_start == DATES[0]
+        # Exactly embargo_days dates between the last training and the first test date
+        assert position[test_start] - position[train_end] - 1 == 5
+        assert position[test_end] - position[test_start] + 1 == 10
+
+
+def test_test_blocks_are_consecutive_and_end_at_the_last_date():
+    folds = wf.make_folds(DATES, n_folds=3, test_days=10, embargo_days=5)
+    tested = [date for _, _, start, end in folds for date in DATES[(DATES >= start) & (DATES <= end)]]
+    assert tested == list(DATES[-30:])
+
+
+def test_rolling_window_keeps_train_days():
+    folds = wf.make_folds(DATES, n_folds=3, test_days=10, window='rolling', train_days=15, embargo_days=5)
+    for train_start, train_end, _, _ in folds:
+        assert ((DATES >= train_start) & (DATES <= train_end)).sum() == 15
+
+
+def test_duplicate_dates_count_once():
+    # Several tickers share each date
+    folds = wf.make_folds(np.tile(DATES, 3), n_folds=3, test_days=10, embargo_days=5)
+    assert folds == wf.make_folds(DATES, n_folds=3, test_days=10, embargo_days=5)
+
+
+def test_not_enough_history_raises():
+    with pytest.raises(ValueError):
+        wf.make_folds(DATES, n_folds=5, test_days=11, embargo_days=5)
+
+
+def test_walk_forward_trains_before_the_embargo_and_reuses_cached_folds(tmp_path):
+    rng = np.random.default_rng(0)
+    frames = []
+    for ticker in ['AAA', 'BBB']:
+        frames.append(pd.DataFrame({
+            'Date': DATES, 'Ticker': ticker,
+            'Close': 100 + rng.normal(size=len(DATES)).cumsum(),
+            'RSI_14': rng.uniform(0, 100, len(DATES)),
+            'future_return': rng.normal(scale=0.01, size=len(DATES)),
+        }))
+    df = pd.concat(frames, ignore_index=True)
+    df['target'] = (df['future_return'] > 0).astype(int)
+    params = {**wf.MODEL_PARAMS, 'n_estimators': 5}
+    folds = wf.make_folds(df['Date'], n_folds=2, test_days=10, embargo_days=5)
+
+    predictions, report = wf.walk_forward(df, folds, params=params, cache_dir=tmp_path, workers=1,
+                                          threads_per_fold=1)
+    assert len(predictions) == 2 * 2 * 10
+    assert not predictions.duplicated(['Date', 'Ticker']).any()
+    for row in report.itertuples():
+        assert row.train_end < row.test_start
+        # Two tickers on every training date up to the embargo
+        train_dates = DATES[(DATES >= pd.Timestamp(row.train_start)) & (DATES <= pd.Timestamp(row.train_end))]
+        assert row.train_rows == 2 * len(train_dates)
+
+    models = sorted(tmp_path.glob('fold-*.json'))
+    assert len(models) == 2
+    mtimes = [path.stat().st_mtime_ns for path in models]
+    again, _ = wf.walk_forward(df, folds, params=params, cache_dir=tmp_path, workers=1, threads_per_fold=1)
+    assert [path.stat().st_mtime_ns for path in models] == mtimes
+    pd.testing.assert_frame_equal(again, predictions)